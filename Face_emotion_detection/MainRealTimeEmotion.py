@@ -1,11 +1,9 @@
 import os
 import warnings
 import cv2
-import numpy as np
 import tkinter as tk
 from tkinter import messagebox
 from PIL import Image, ImageTk
-import threading
 import time
 import sys
 
@@ -17,10 +15,19 @@ import config
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = config.TF_CPP_MIN_LOG_LEVEL
 warnings.filterwarnings('ignore', category=UserWarning)
 
-from tensorflow import keras  # Or from keras.models import load_model
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
+from inference import LABELS
+from face_tracking import DetectionScheduler
+from pipeline import FramePipeline
+
+# Milliseconds between checks of the pipeline for a new frame to show
+FRAME_POLL_MS = 10
+
+# Milliseconds between refreshes of the pipeline stats in the status bar
+STATS_INTERVAL_MS = 1000
+
 class HoverButton(tk.Button):
     """Button that changes appearance on hover"""
     def __init__(self, master, **kwargs):
@@ -51,20 +58,23 @@ class FaceEmotionRecognitionApp:
         # Initialize variables
         self.webcam = None
         self.is_running = False
-        self.thread = None
+        self.pipeline = None
         self.current_frame = None
-        self.emotion_counts = {emotion: 0 for emotion in ['angry', 'disgust', 'fear', 'happy', 'neutral', 'sad', 'surprise']}
+        self.video_image = None
+        self.display_size = (0, 0)
+        self.chart_total = 0
+        self.stats_time = 0.0
+        self.emotion_counts = {emotion: 0 for emotion in LABELS}
         self.emotion_colors = config.EMOTION_COLORS
 
-        # Emotion labels
-        self.labels = {0: 'angry', 1: 'disgust', 2: 'fear', 3: 'happy', 4: 'neutral', 5: 'sad', 6: 'surprise'}
-
         # Setup the UI
         self.setup_ui()
 
         # Load face cascade
         haar_file = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
         self.face_cascade = cv2.CascadeClassifier(haar_file)
+        # Cascade every few frames on a downscaled frame, trackers in between
+        self.face_detector = DetectionScheduler(self.face_cascade)
 
         # Bind window close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -249,6 +259,17 @@ class FaceEmotionRecognitionApp:
         )
         self.status_label.pack(side=tk.LEFT, padx=10)
 
+        # Per-stage frame rates, queue depths and dropped frames
+        self.pipeline_label = tk.Label(
+            status_frame,
+            text="",
+            font=("Helvetica", 9),
+            bg=config.CARD_BG,
+            fg=self.text_color,
+            pady=5
+        )
+        self.pipeline_label.pack(side=tk.RIGHT, padx=10)
+
     def center_window(self):
         """Center the window on the screen"""
         self.root.update_idletasks()
@@ -259,147 +280,130 @@ class FaceEmotionRecognitionApp:
         self.root.geometry(f'{width}x{height}+{x}+{y}')
 
     def load_model(self):
-        """Load the emotion recognition model"""
+        """Load the emotion recognition model for the configured inference backend"""
+        if config.FACE_INFERENCE_BACKEND == 'tflite':
+            self.load_tflite_model()
+        else:
+            self.load_keras_model()
+
+    def load_tflite_model(self):
+        """Load the converted .tflite model; TensorFlow itself is not needed"""
+        from tflite_backend import TFLiteEmotionClassifier
+        try:
+            self.classifier = TFLiteEmotionClassifier(config.FACE_TFLITE_MODEL,
+                                                      config.FACE_INFERENCE_THREADS or None)
+            self.status_label.config(text="TFLite model loaded successfully.")
+        except (ImportError, ValueError, OSError) as e:
+            messagebox.showerror("Error", f"Error loading TFLite model {config.FACE_TFLITE_MODEL}: {e}")
+            self.root.destroy()
+
+    def load_keras_model(self):
+        """Load the Keras model and trace its batched inference"""
+        from inference import EmotionClassifier, load_keras_model
         try:
-            model_path = config.FACE_EMOTION_MODEL_H5
-            self.model = keras.models.load_model(model_path)
-            self.status_label.config(text="Model loaded successfully from .h5 file.")
+            # Tries the .h5 file, then the JSON architecture with the .h5 weights
+            self.model = load_keras_model(config.FACE_EMOTION_MODEL_H5, config.FACE_EMOTION_MODEL_JSON)
+            self.status_label.config(text="Model loaded successfully.")
+        except FileNotFoundError as fe:
+            messagebox.showerror("Error", f"Error loading model files: {fe}")
+            self.root.destroy()
+            return
         except Exception as e:
-            self.status_label.config(text=f"Error loading model from .h5: {e}")
-            try:
-                json_path = config.FACE_EMOTION_MODEL_JSON
-                with open(json_path, "r") as json_file:
-                    model_json = json_file.read()
-                self.model = keras.models.model_from_json(model_json)
-                self.model.load_weights(model_path)
-                self.status_label.config(text="Model loaded successfully from JSON and weights.")
-            except FileNotFoundError as fe:
-                messagebox.showerror("Error", f"Error loading model files: {fe}")
-                self.root.destroy()
-            except Exception as e2:
-                messagebox.showerror("Error", f"Error loading model architecture or weights: {e2}")
-                self.root.destroy()
-
-    def extract_features(self, image):
-        """Extract features from the image for model prediction"""
-        feature = np.array(image)
-        feature = feature.reshape(1, 48, 48, 1)
-        return feature / 255.0
+            messagebox.showerror("Error", f"Error loading model architecture or weights: {e}")
+            self.root.destroy()
+            return
+
+        # All faces of a frame are classified in one traced call instead of a predict() per face
+        self.classifier = EmotionClassifier(self.model)
 
     def toggle_camera(self):
         """Start or stop the camera feed"""
         if self.is_running:
-            self.is_running = False
-            self.start_button.config(text="Start Camera", bg=config.SUCCESS_BTN_COLOR)
-            self.start_button.default_bg = config.SUCCESS_BTN_COLOR  # Update default_bg for HoverButton
+            self.stop_camera()
             self.status_label.config(text="Camera stopped.")
-            if self.webcam is not None:
-                self.webcam.release()
-                self.webcam = None
         else:
             self.webcam = cv2.VideoCapture(config.DEFAULT_CAMERA_INDEX)
             if not self.webcam.isOpened():
                 messagebox.showerror("Error", "Could not open webcam.")
                 return
+            # Backends that honour it hand over the newest frame instead of a queued one
+            self.webcam.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
             self.is_running = True
             self.start_button.config(text="Stop Camera", bg=config.DANGER_BTN_COLOR)
             self.start_button.default_bg = config.DANGER_BTN_COLOR  # Update default_bg for HoverButton
             self.status_label.config(text="Camera started. Detecting emotions...")
 
-            # Start video processing in a separate thread
-            self.thread = threading.Thread(target=self.process_video)
-            self.thread.daemon = True
-            self.thread.start()
-
-    def process_video(self):
-        """Process video frames in a separate thread"""
-        while self.is_running:
-            success, frame = self.webcam.read()
-            if not success:
-                self.status_label.config(text="Error: Could not read frame from webcam.")
-                break
-
-            # Process the frame
-            self.process_frame(frame)
-
-            # Small delay to reduce CPU usage
-            time.sleep(0.01)
-
-    def process_frame(self, frame):
-        """Process a single frame for emotion detection"""
-        # Convert to RGB for display
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        # Convert to grayscale for face detection
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        # Detect faces
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-
-        # Store current emotion for display
-        current_emotion = "No face detected"
-
+            # Capture, detection, inference and drawing run in their own threads
+            self.face_detector.reset()
+            # The capture thread owns the webcam and releases it once it is out of read()
+            webcam = self.webcam
+            self.pipeline = FramePipeline(lambda: self.read_frame(webcam), self.detect_faces,
+                                          self.classify_faces, self.render_frame, release=webcam.release)
+            self.pipeline.start()
+            self.root.after(FRAME_POLL_MS, self.show_frame)
+
+    def stop_camera(self):
+        """Stop the pipeline; its capture thread releases the webcam when it leaves read()"""
+        self.is_running = False
+        if self.pipeline is not None:
+            # Releasing a capture while another thread is inside read() can crash the backend
+            self.pipeline.stop()
+            self.pipeline = None
+        elif self.webcam is not None:
+            self.webcam.release()
+        self.webcam = None
+        self.start_button.config(text="Start Camera", bg=config.SUCCESS_BTN_COLOR)
+        self.start_button.default_bg = config.SUCCESS_BTN_COLOR  # Update default_bg for HoverButton
+        self.pipeline_label.config(text="")
+
+    def read_frame(self, webcam):
+        """Capture stage: the next camera frame, read as soon as it arrives to keep the buffer empty"""
+        success, frame = webcam.read()
+        if not success:
+            raise IOError("Could not read frame from webcam.")
+        return frame
+
+    def detect_faces(self, frame):
+        """Detection stage: grayscale image for inference and face boxes from the scheduler"""
+        frame.gray = cv2.cvtColor(frame.image, cv2.COLOR_BGR2GRAY)
+        frame.faces = self.face_detector.update(frame.image)
+        return frame
+
+    def classify_faces(self, frame):
+        """Inference stage: the emotion of every face with one batched call"""
         try:
-            for (x, y, w, h) in faces:
-                # Extract face region
-                face_roi = gray[y:y + h, x:x + w].copy()
-
-                # Resize for the model
-                resized_face = cv2.resize(face_roi, (48, 48))
-
-                # Extract features
-                img = self.extract_features(resized_face)
-
-                # Predict emotion
-                pred = self.model.predict(img)
-                predicted_label_index = np.argmax(pred)
-                prediction_label = self.labels[predicted_label_index]
-
-                # Update emotion counts
-                self.emotion_counts[prediction_label] += 1
-
-                # Get color for the emotion
-                emotion_color = self.emotion_colors.get(prediction_label, "#FFFFFF")
-
-                # Convert hex color to BGR
-                r, g, b = tuple(int(emotion_color[i:i+2], 16) for i in (1, 3, 5))
-                color_bgr = (b, g, r)
-
-                # Draw rectangle and label
-                cv2.rectangle(frame_rgb, (x, y), (x + w, y + h), color_bgr, 2)
-                cv2.putText(frame_rgb, prediction_label, (x, y - 10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.9, color_bgr, 2)
-
-                # Update current emotion
-                current_emotion = prediction_label
-
-            # Update the current emotion label
-            self.current_emotion_label.config(text=current_emotion.capitalize())
-
-            # If an emotion was detected, update its color
-            if current_emotion in self.emotion_colors:
-                self.current_emotion_label.config(fg=self.emotion_colors[current_emotion])
-            else:
-                self.current_emotion_label.config(fg=self.text_color)
-
-            # Update the pie chart every 10 frames (to avoid excessive updates)
-            if sum(self.emotion_counts.values()) % 10 == 0 and sum(self.emotion_counts.values()) > 0:
-                self.update_pie_chart()
-
+            frame.labels = self.classifier.classify(frame.gray, frame.faces)
         except Exception as e:
             print(f"An error occurred during prediction: {e}")
-
-        # Convert to PhotoImage for display
-        h, w = frame_rgb.shape[:2]
-        self.current_frame = frame_rgb.copy()  # Store for snapshot
+            frame.labels = []
+
+        # Counted here so frames dropped before display still add to the statistics
+        for label in frame.labels:
+            self.emotion_counts[label] += 1
+        return frame
+
+    def render_frame(self, frame):
+        """Render stage: RGB image with labelled boxes, scaled to fit the canvas"""
+        frame_rgb = cv2.cvtColor(frame.image, cv2.COLOR_BGR2RGB)
+        for (x, y, w, h), prediction_label in zip(frame.faces, frame.labels):
+            # Get color for the emotion
+            emotion_color = self.emotion_colors.get(prediction_label, "#FFFFFF")
+
+            # Convert hex color to BGR
+            r, g, b = tuple(int(emotion_color[i:i+2], 16) for i in (1, 3, 5))
+            color_bgr = (b, g, r)
+
+            # Draw rectangle and label
+            cv2.rectangle(frame_rgb, (x, y), (x + w, y + h), color_bgr, 2)
+            cv2.putText(frame_rgb, prediction_label, (x, y - 10),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.9, color_bgr, 2)
+        frame.image = frame_rgb
 
         # Resize if needed to fit the canvas
-        canvas_width = self.video_canvas.winfo_width()
-        canvas_height = self.video_canvas.winfo_height()
-
+        canvas_width, canvas_height = self.display_size
         if canvas_width > 1 and canvas_height > 1:  # Ensure canvas has been drawn
-            # Calculate aspect ratio
+            h, w = frame_rgb.shape[:2]
             img_ratio = w / h
             canvas_ratio = canvas_width / canvas_height
 
@@ -413,17 +417,59 @@ class FaceEmotionRecognitionApp:
                 new_width = int(canvas_height * img_ratio)
 
             frame_rgb = cv2.resize(frame_rgb, (new_width, new_height))
+        frame.display = frame_rgb
+        return frame
+
+    def show_frame(self):
+        """Show the newest rendered frame; runs on the Tk main loop while the camera is on"""
+        if not self.is_running:
+            return
+        error = self.pipeline.error
+        if error is not None:
+            self.stop_camera()
+            self.status_label.config(text=f"Error: {error}")
+            return
+
+        # Widgets are only read and updated here, on the main thread
+        self.display_size = (self.video_canvas.winfo_width(), self.video_canvas.winfo_height())
+        frame = self.pipeline.latest()
+        if frame is not None:
+            self.draw_frame(frame)
+
+        now = time.perf_counter()
+        if now - self.stats_time >= STATS_INTERVAL_MS / 1000:
+            self.stats_time = now
+            self.pipeline_label.config(text=self.pipeline.summary())
+        self.root.after(FRAME_POLL_MS, self.show_frame)
+
+    def draw_frame(self, frame):
+        """Put a rendered frame on the canvas and update the current emotion and chart"""
+        self.current_frame = frame.image  # Store for snapshot
+        imgtk = ImageTk.PhotoImage(image=Image.fromarray(frame.display))
+
+        # Reuse one canvas image item instead of adding one per frame
+        canvas_width, canvas_height = self.display_size
+        if self.video_image is None:
+            self.video_image = self.video_canvas.create_image(0, 0, anchor=tk.CENTER)
+        self.video_canvas.coords(self.video_image, canvas_width // 2, canvas_height // 2)
+        self.video_canvas.itemconfigure(self.video_image, image=imgtk)
+        self.video_canvas.image = imgtk  # Keep a reference
 
-        # Convert to PhotoImage
-        img = Image.fromarray(frame_rgb)
-        imgtk = ImageTk.PhotoImage(image=img)
+        # Store current emotion for display
+        current_emotion = frame.labels[-1] if frame.labels else "No face detected"
+        self.current_emotion_label.config(text=current_emotion.capitalize())
 
-        # Update the canvas
-        self.video_canvas.create_image(
-            canvas_width // 2, canvas_height // 2,
-            image=imgtk, anchor=tk.CENTER
-        )
-        self.video_canvas.image = imgtk  # Keep a reference
+        # If an emotion was detected, update its color
+        if current_emotion in self.emotion_colors:
+            self.current_emotion_label.config(fg=self.emotion_colors[current_emotion])
+        else:
+            self.current_emotion_label.config(fg=self.text_color)
+
+        # Update the pie chart every 10 detections (to avoid excessive updates)
+        total = sum(self.emotion_counts.values())
+        if total - self.chart_total >= 10:
+            self.chart_total = total
+            self.update_pie_chart()
 
     def update_pie_chart(self):
         """Update the emotion statistics pie chart"""
@@ -463,14 +509,13 @@ class FaceEmotionRecognitionApp:
     def reset_stats(self):
         """Reset the emotion statistics"""
         self.emotion_counts = {emotion: 0 for emotion in self.emotion_counts}
+        self.chart_total = 0
         self.update_pie_chart()
         self.status_label.config(text="Statistics reset.")
 
     def on_closing(self, event=None):
         """Handle window closing"""
-        self.is_running = False
-        if self.webcam is not None:
-            self.webcam.release()
+        self.stop_camera()
         self.root.destroy()
         # Exit with a special code to signal return to main menu
         import sys
@@ -0,0 +1,289 @@
+"""
+Face detection scheduler for the realtime emotion app.
+Running the Haar cascade over every full-resolution frame is the most
+expensive part of the detect stage. DetectionScheduler runs it on a
+downscaled frame every N frames only, and follows the faces in between
+with OpenCV contrib trackers, which cost a fraction of a cascade pass.
+A tracked face is checked against its appearance at detection time; when
+a tracker loses it or the match drops below a threshold, the cascade runs
+again on that frame. The cascade is also told the range of face sizes
+seen recently (minSize/maxSize), so it skips scales that cannot match,
+with a periodic full-range pass to pick up people at other distances.
+
+Settings come from config.py: FACE_DETECT_INTERVAL, FACE_DETECT_SCALE,
+FACE_TRACKER, FACE_TRACK_MIN_CONFIDENCE and FACE_SIZE_HISTORY.
+
+Usage:
+    python face_tracking.py --video clip.mp4
+    python face_tracking.py --camera 0 --frames 300
+Runs every-frame full-resolution detection and several scheduler settings
+over the same frames, and prints detection FPS with precision, recall and
+mean IoU against the every-frame boxes.
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+# Cascade settings the app has always used
+SCALE_FACTOR = 1.3
+MIN_NEIGHBORS = 5
+
+# minSize/maxSize are the recent face size range widened by these factors
+MIN_SIZE_MARGIN = 0.7
+MAX_SIZE_MARGIN = 1.4
+
+# Every this many cascade passes searches all sizes, to find faces at new distances
+FULL_RANGE_EVERY = 4
+
+# Side of the grayscale patches compared to score tracking confidence
+TEMPLATE_SIZE = 24
+
+# Tracker factory names, looked up in cv2 first and then in cv2.legacy
+TRACKERS = {
+    'KCF': 'TrackerKCF_create',
+    'CSRT': 'TrackerCSRT_create',
+    'MOSSE': 'TrackerMOSSE_create',
+    'MIL': 'TrackerMIL_create',
+}
+
+
+def create_tracker(name):
+    """New OpenCV tracker by name (KCF, CSRT, MOSSE or MIL)"""
+    factory_name = TRACKERS.get(name.upper())
+    if factory_name is None:
+        raise ValueError(f"Unknown tracker {name!r}, expected one of {', '.join(TRACKERS)} or none")
+    factory = getattr(cv2, factory_name, None) or getattr(getattr(cv2, 'legacy', None), factory_name, None)
+    if factory is None:
+        raise ValueError(f"This OpenCV build has no {name} tracker; install opencv-contrib-python")
+    return factory()
+
+
+def patch(gray, box):
+    """Fixed-size grayscale patch of a box, for appearance comparison"""
+    x, y, w, h = box
+    return cv2.resize(gray[y:y + h, x:x + w], (TEMPLATE_SIZE, TEMPLATE_SIZE))
+
+
+def similarity(template, current):
+    """Normalized cross-correlation of two patches, from -1 to 1"""
+    return float(cv2.matchTemplate(current, template, cv2.TM_CCOEFF_NORMED)[0, 0])
+
+
+class TrackedFace:
+    """One face followed by a tracker, with its appearance when last detected"""
+    def __init__(self, tracker, box, template):
+        self.tracker = tracker
+        self.box = box
+        self.template = template
+
+
+class DetectionScheduler:
+    """Cascade every N frames on a downscaled frame, trackers in between"""
+    def __init__(self, cascade, interval=None, scale=None, tracker=None, min_confidence=None,
+                 size_history=None):
+        self.cascade = cascade
+        self.interval = max(1, interval or config.FACE_DETECT_INTERVAL)
+        self.scale = scale or config.FACE_DETECT_SCALE
+        self.tracker_name = (tracker or config.FACE_TRACKER).upper()
+        self.min_confidence = config.FACE_TRACK_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        # Widths, at detection scale, of the faces found by recent cascade passes
+        self.sizes = deque(maxlen=size_history or config.FACE_SIZE_HISTORY)
+        if self.tracker_name != 'NONE':
+            # Fail at start-up rather than on the first frame with a face
+            create_tracker(self.tracker_name)
+        self.reset()
+
+    def reset(self):
+        """Forget tracked faces and statistics, e.g. when the camera restarts"""
+        self.faces = []
+        self.sizes.clear()
+        self.since_detection = 0
+        self.frames = 0
+        self.detections = 0
+        self.redetections = 0
+
+    def update(self, image):
+        """Face boxes (N, 4) in full-resolution coordinates for a BGR frame"""
+        self.frames += 1
+        small = image if self.scale == 1 else cv2.resize(
+            image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        small_gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        due = not self.faces or self.since_detection >= self.interval or self.tracker_name == 'NONE'
+        if not due and not self._track(small, small_gray):
+            # A face was lost or no longer looks like itself
+            self.redetections += 1
+            due = True
+        if due:
+            self._detect(small, small_gray)
+        else:
+            self.since_detection += 1
+
+        boxes = np.array([face.box for face in self.faces], dtype=np.float64).reshape(-1, 4)
+        return np.round(boxes / self.scale).astype(np.int32)
+
+    def _track(self, small, small_gray):
+        """Move every face with its tracker; False if any of them is lost"""
+        height, width = small_gray.shape
+        for face in self.faces:
+            ok, box = face.tracker.update(small)
+            if not ok:
+                return False
+            x, y, w, h = (int(round(value)) for value in box)
+            if w < 2 or h < 2 or x < 0 or y < 0 or x + w > width or y + h > height:
+                return False
+            if similarity(face.template, patch(small_gray, (x, y, w, h))) < self.min_confidence:
+                return False
+            face.box = (x, y, w, h)
+        return True
+
+    def _size_range(self):
+        """minSize and maxSize for the cascade, or None to search every size"""
+        if not self.sizes or self.detections % FULL_RANGE_EVERY == 0:
+            return None
+        low = int(min(self.sizes) * MIN_SIZE_MARGIN)
+        high = int(max(self.sizes) * MAX_SIZE_MARGIN) + 1
+        return (low, low), (high, high)
+
+    def _detect(self, small, small_gray):
+        """Run the cascade and start a tracker on every face found"""
+        size_range = self._size_range()
+        self.detections += 1
+        if size_range is None:
+            found = self.cascade.detectMultiScale(small_gray, SCALE_FACTOR, MIN_NEIGHBORS)
+        else:
+            found = self.cascade.detectMultiScale(small_gray, SCALE_FACTOR, MIN_NEIGHBORS,
+                                                  minSize=size_range[0], maxSize=size_range[1])
+            if not len(found) and self.faces:
+                # The faces being tracked left the size range; look at every size
+                found = self.cascade.detectMultiScale(small_gray, SCALE_FACTOR, MIN_NEIGHBORS)
+
+        self.faces = []
+        for box in found:
+            box = tuple(int(value) for value in box)
+            self.sizes.append(box[2])
+            tracker = None
+            if self.tracker_name != 'NONE':
+                tracker = create_tracker(self.tracker_name)
+                tracker.init(small, box)
+            self.faces.append(TrackedFace(tracker, box, patch(small_gray, box)))
+        self.since_detection = 0
+
+    def stats(self):
+        """Frames seen, cascade passes, and passes forced by lost tracking"""
+        return {'frames': self.frames, 'detections': self.detections, 'redetections': self.redetections}
+
+
+class EveryFrameDetector:
+    """The old detection: full-resolution cascade on every frame"""
+    def __init__(self, cascade):
+        self.cascade = cascade
+
+    def update(self, image):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return np.asarray(self.cascade.detectMultiScale(gray, SCALE_FACTOR, MIN_NEIGHBORS)).reshape(-1, 4)
+
+
+def iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    union = a[2] * a[3] + b[2] * b[3] - intersection
+    return intersection / union if union else 0.0
+
+
+def match_boxes(reference, boxes, threshold=0.5):
+    """IoUs of greedy one-to-one matches between reference and boxes above threshold"""
+    pairs = sorted(((iou(r, b), i, j) for i, r in enumerate(reference) for j, b in enumerate(boxes)),
+                   reverse=True)
+    used_reference, used_boxes, matches = set(), set(), []
+    for overlap, i, j in pairs:
+        if overlap < threshold:
+            break
+        if i not in used_reference and j not in used_boxes:
+            used_reference.add(i)
+            used_boxes.add(j)
+            matches.append(overlap)
+    return matches
+
+
+def read_frames(source, limit):
+    """Up to limit BGR frames from a video file or camera index"""
+    capture = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    frames = []
+    while len(frames) < limit:
+        success, frame = capture.read()
+        if not success:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def evaluate(detector, frames, reference):
+    """Detection FPS and precision, recall and mean IoU against reference boxes per frame"""
+    start = time.perf_counter()
+    results = [detector.update(frame) for frame in frames]
+    elapsed = time.perf_counter() - start
+
+    matched = found = expected = 0
+    overlaps = []
+    for boxes, reference_boxes in zip(results, reference):
+        matches = match_boxes(reference_boxes, boxes)
+        matched += len(matches)
+        found += len(boxes)
+        expected += len(reference_boxes)
+        overlaps.extend(matches)
+    return {
+        'fps': len(frames) / elapsed,
+        'precision': matched / found if found else 1.0,
+        'recall': matched / expected if expected else 1.0,
+        'mean_iou': float(np.mean(overlaps)) if overlaps else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detection FPS against accuracy for scheduler settings")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--video', help="video file to read frames from")
+    source.add_argument('--camera', type=int, default=config.DEFAULT_CAMERA_INDEX, help="camera index")
+    parser.add_argument('--frames', type=int, default=300, help="frames to evaluate")
+    parser.add_argument('--tracker', default=config.FACE_TRACKER, help="tracker for the scheduler runs")
+    args = parser.parse_args()
+
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    if cascade.empty():
+        sys.exit("Could not load the Haar cascade")
+    frames = read_frames(args.video or args.camera, args.frames)
+    if not frames:
+        sys.exit("No frames could be read")
+
+    baseline = EveryFrameDetector(cascade)
+    reference = [baseline.update(frame) for frame in frames]
+    settings = [
+        ('every frame, full size', lambda: baseline),
+        ('every frame, 0.5x', lambda: DetectionScheduler(cascade, 1, 0.5, 'none')),
+        (f'every 5, 0.5x, {args.tracker}', lambda: DetectionScheduler(cascade, 5, 0.5, args.tracker)),
+        (f'every 10, 0.5x, {args.tracker}', lambda: DetectionScheduler(cascade, 10, 0.5, args.tracker)),
+        (f'every 10, 0.25x, {args.tracker}', lambda: DetectionScheduler(cascade, 10, 0.25, args.tracker)),
+    ]
+
+    print(f"{len(frames)} frames, {sum(len(boxes) for boxes in reference)} faces found by every-frame detection")
+    print(f"{'setting':<26} {'fps':>7} {'precision':>10} {'recall':>7} {'IoU':>5} {'cascade runs':>13}")
+    for name, make in settings:
+        detector = make()
+        result = evaluate(detector, frames, reference)
+        runs = detector.stats()['detections'] if isinstance(detector, DetectionScheduler) else len(frames)
+        print(f"{name:<26} {result['fps']:>7.1f} {result['precision']:>10.2%} {result['recall']:>7.2%} "
+              f"{result['mean_iou']:>5.2f} {runs:>13}")
@@ -0,0 +1,176 @@
+"""
+Batched emotion inference for the face CNN.
+model.predict() builds a data adapter, wraps a step function and runs
+callbacks on every call, so calling it once per face makes a frame with
+five faces pay that overhead five times. EmotionClassifier stacks every
+face crop of a frame into one (N, 48, 48, 1) batch and runs it through the
+model wrapped in a tf.function whose input signature leaves the batch size
+open, so it is traced once and reused for any number of faces.
+
+Usage:
+    python inference.py --max-faces 8
+Times per-frame inference for 1 to 8 faces with one predict() per face and
+with one batched call. Without the trained model file the architecture from
+trainmodel.ipynb is built with random weights, which is enough for timing.
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import cv2
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+# Emotion labels in model output order
+LABELS = ['angry', 'disgust', 'fear', 'happy', 'neutral', 'sad', 'surprise']
+
+# Side of the square grayscale crop the model takes
+INPUT_SIZE = 48
+
+
+def face_batch(gray, faces, size=INPUT_SIZE):
+    """Crop, resize and scale every face of a grayscale frame into one float32 (N, 48, 48, 1) batch"""
+    batch = np.empty((len(faces), size, size, 1), dtype=np.float32)
+    for index, (x, y, w, h) in enumerate(faces):
+        batch[index, :, :, 0] = cv2.resize(gray[y:y + h, x:x + w], (size, size))
+    batch /= 255.0
+    return batch
+
+
+def build_model():
+    """The CNN from trainmodel.ipynb, untrained"""
+    from tensorflow import keras
+    layers = keras.layers
+
+    model = keras.Sequential([
+        keras.Input(shape=(INPUT_SIZE, INPUT_SIZE, 1)),
+        layers.Conv2D(128, kernel_size=(3, 3), activation='relu'),
+        layers.MaxPooling2D(pool_size=(2, 2)),
+        layers.Dropout(0.4),
+        layers.Conv2D(256, kernel_size=(3, 3), activation='relu'),
+        layers.MaxPooling2D(pool_size=(2, 2)),
+        layers.Dropout(0.4),
+        layers.Conv2D(512, kernel_size=(3, 3), activation='relu'),
+        layers.MaxPooling2D(pool_size=(2, 2)),
+        layers.Dropout(0.4),
+        layers.Conv2D(512, kernel_size=(3, 3), activation='relu'),
+        layers.MaxPooling2D(pool_size=(2, 2)),
+        layers.Dropout(0.4),
+        layers.Flatten(),
+        layers.Dense(512, activation='relu'),
+        layers.Dropout(0.4),
+        layers.Dense(256, activation='relu'),
+        layers.Dropout(0.3),
+        layers.Dense(len(LABELS), activation='softmax'),
+    ])
+    return model
+
+
+def load_keras_model(model_path=None, json_path=None):
+    """Load the trained model from .h5, or from its JSON architecture plus weights"""
+    from tensorflow import keras
+
+    model_path = model_path or config.FACE_EMOTION_MODEL_H5
+    try:
+        return keras.models.load_model(model_path)
+    except Exception:
+        with open(json_path or config.FACE_EMOTION_MODEL_JSON, "r") as json_file:
+            model = keras.models.model_from_json(json_file.read())
+        model.load_weights(model_path)
+        return model
+
+
+class EmotionClassifier:
+    """Classifies all faces of a frame with one traced model call"""
+    def __init__(self, model):
+        import tensorflow as tf
+
+        self.model = model
+        # A None batch dimension keeps one trace for every batch size
+        self._infer = tf.function(
+            lambda batch: model(batch, training=False),
+            input_signature=[tf.TensorSpec([None, INPUT_SIZE, INPUT_SIZE, 1], tf.float32)])
+
+        # Trace now so the first frame with a face does not stall
+        self.predict(np.zeros((1, INPUT_SIZE, INPUT_SIZE, 1), dtype=np.float32))
+
+    def predict(self, batch):
+        """Class probabilities, shape (N, 7), for a batch of face crops"""
+        if not len(batch):
+            return np.zeros((0, len(LABELS)), dtype=np.float32)
+        return self._infer(batch).numpy()
+
+    def classify(self, gray, faces):
+        """Emotion label of every face in a grayscale frame"""
+        if not len(faces):
+            return []
+        probabilities = self.predict(face_batch(gray, faces))
+        return [LABELS[index] for index in probabilities.argmax(axis=1)]
+
+
+def synthetic_frame(face_count, seed=0, shape=(480, 640), face_size=96):
+    """Random grayscale frame and face boxes laid out on a grid"""
+    rng = np.random.default_rng(seed)
+    gray = rng.integers(0, 256, size=shape, dtype=np.uint8)
+    columns = shape[1] // face_size
+    faces = [((index % columns) * face_size, (index // columns) * face_size, face_size, face_size)
+             for index in range(face_count)]
+    return gray, np.array(faces, dtype=np.int32).reshape(-1, 4)
+
+
+def time_frames(classify, gray, faces, frames):
+    """Median milliseconds per frame"""
+    times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        classify(gray, faces)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def per_face_predict(model):
+    """The old inference: one model.predict() per face"""
+    def classify(gray, faces):
+        labels = []
+        for (x, y, w, h) in faces:
+            face = cv2.resize(gray[y:y + h, x:x + w], (INPUT_SIZE, INPUT_SIZE))
+            pred = model.predict(np.array(face).reshape(1, INPUT_SIZE, INPUT_SIZE, 1) / 255.0, verbose=0)
+            labels.append(LABELS[np.argmax(pred)])
+        return labels
+    return classify
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-frame inference latency against the number of faces")
+    parser.add_argument('--model', default=config.FACE_EMOTION_MODEL_H5, help="trained .h5 model")
+    parser.add_argument('--max-faces', type=int, default=8, help="largest number of faces per frame")
+    parser.add_argument('--frames', type=int, default=30, help="timed frames per face count")
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore', category=UserWarning)
+    if os.path.exists(args.model):
+        model = load_keras_model(args.model)
+        print(f"Model: {args.model}")
+    else:
+        model = build_model()
+        print(f"Model: {args.model} not found, timing the untrained architecture")
+
+    before = per_face_predict(model)
+    after = EmotionClassifier(model).classify
+
+    print(f"{'faces':>5} {'predict() per face':>19} {'batched':>9} {'speedup':>8}")
+    for face_count in range(1, args.max_faces + 1):
+        gray, faces = synthetic_frame(face_count)
+        # Warm up both paths for this batch size
+        before(gray, faces)
+        after(gray, faces)
+        before_ms = time_frames(before, gray, faces, args.frames)
+        after_ms = time_frames(after, gray, faces, args.frames)
+        print(f"{face_count:>5} {before_ms:>16.1f} ms {after_ms:>6.1f} ms {before_ms / after_ms:>7.1f}x")
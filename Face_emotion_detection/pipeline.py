@@ -0,0 +1,311 @@
+"""
+Staged video pipeline for the realtime emotion app.
+Capture, face detection, emotion inference and render preparation each run
+in their own thread, joined by small queues that keep only the newest
+frames: when a stage falls behind, the frame waiting for it is replaced by
+a fresher one and counted as dropped, so a slow model lowers the frame rate
+instead of adding lag. The capture thread reads the camera continuously,
+which keeps the driver's buffer empty, so every frame shown is recent. The
+Tk main loop takes the newest rendered frame with FramePipeline.latest().
+
+Usage:
+    python pipeline.py --infer-ms 60
+Runs a simulated 30 fps camera with a 4-frame driver buffer through the old
+serial loop and through the pipeline, and prints displayed FPS, capture to
+display latency and per-stage drops for both.
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from collections import deque
+
+# Frames each queue between two stages may hold
+QUEUE_DEPTH = 1
+
+# Seconds a stage waits for input before checking whether it should stop
+POLL_SECONDS = 0.1
+
+# Stage names in order; each stage after capture reads from the queue of the same name
+STAGES = ['capture', 'detect', 'infer', 'render']
+
+
+class LatestQueue:
+    """Bounded queue where putting into a full queue drops the oldest item"""
+    def __init__(self, maxsize=QUEUE_DEPTH):
+        self.items = deque()
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, item):
+        """Add an item, replacing the oldest one if the queue is full"""
+        with self.condition:
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Oldest item, or None if the queue is closed or nothing arrives in time"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.items or self.closed, timeout)
+            return self.items.popleft() if self.items else None
+
+    def close(self):
+        """Wake every waiting get(); later gets return None once the queue is empty"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class Frame:
+    """One camera frame and what the stages found in it"""
+    def __init__(self, index, image):
+        self.index = index
+        self.image = image
+        self.captured = time.perf_counter()
+        self.gray = None
+        self.faces = ()
+        self.labels = []
+        self.display = None
+
+
+class Stage(threading.Thread):
+    """Thread that applies work to every item of its source queue and passes the result on"""
+    def __init__(self, name, work, source, sink, on_exit=None):
+        super().__init__(name=f"pipeline-{name}", daemon=True)
+        self.stage = name
+        self.work = work
+        self.source = source
+        self.sink = sink
+        self.on_exit = on_exit
+        self.running = True
+        self.processed = 0
+        self.error = None
+
+    def run(self):
+        try:
+            while self.running:
+                if self.source is None:
+                    item = None
+                else:
+                    item = self.source.get(POLL_SECONDS)
+                    if item is None:
+                        if self.source.closed:
+                            break
+                        continue
+                try:
+                    result = self.work(item)
+                except Exception as e:
+                    self.error = e
+                    break
+                self.processed += 1
+                if result is not None:
+                    self.sink.put(result)
+        finally:
+            self.sink.close()
+            if self.on_exit is not None:
+                self.on_exit()
+
+
+class FramePipeline:
+    """capture -> detect -> infer -> render threads joined by latest-frame-wins queues"""
+    def __init__(self, read, detect, infer, render, depth=QUEUE_DEPTH, release=None):
+        # read() returns a BGR image; detect, infer and render fill in a Frame and return it.
+        # release() is called by the capture thread once it is out of read() for good
+        self.frame_count = 0
+        self.queues = {name: LatestQueue(depth) for name in STAGES[1:] + ['display']}
+
+        def capture(_):
+            self.frame_count += 1
+            return Frame(self.frame_count, read())
+
+        sinks = STAGES[1:] + ['display']
+        works = [capture, detect, infer, render]
+        self.stages = [Stage(name, work, self.queues.get(name), self.queues[sink])
+                       for name, work, sink in zip(STAGES, works, sinks)]
+        self.stages[0].on_exit = release
+        self.displayed = 0
+        self.latency = 0.0
+        self._last_stats = None
+
+    def start(self):
+        """Start every stage thread"""
+        self._last_stats = (time.perf_counter(), self._counts())
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self, timeout=2.0):
+        """Stop every stage and wait for them; True if they all exited in time
+
+        A capture stage still blocked in read() keeps running until read()
+        returns, and releases the camera itself on the way out.
+        """
+        for stage in self.stages:
+            stage.running = False
+        for queue in self.queues.values():
+            queue.close()
+        for stage in self.stages:
+            if stage.is_alive():
+                stage.join(timeout)
+        return not any(stage.is_alive() for stage in self.stages)
+
+    @property
+    def error(self):
+        """First exception raised by a stage, which stops that stage"""
+        return next((stage.error for stage in self.stages if stage.error is not None), None)
+
+    def latest(self):
+        """Newest rendered frame not shown yet, or None"""
+        display = self.queues['display']
+        with display.condition:
+            if not display.items:
+                return None
+            frame = display.items.pop()
+            # Older rendered frames were never shown, so they count as dropped
+            display.dropped += len(display.items)
+            display.items.clear()
+        self.displayed += 1
+        self.latency = time.perf_counter() - frame.captured
+        return frame
+
+    def _counts(self):
+        """Frames processed by every stage, then frames displayed"""
+        return [stage.processed for stage in self.stages] + [self.displayed]
+
+    def stats(self):
+        """Per-stage fps since the previous call, input queue depth and dropped frames"""
+        now = time.perf_counter()
+        counts = self._counts()
+        then, previous = self._last_stats or (now, counts)
+        elapsed = max(now - then, 1e-9)
+        self._last_stats = (now, counts)
+
+        rows = []
+        for name, count, before in zip(STAGES + ['display'], counts, previous):
+            # Drops are counted on the queue a stage reads from
+            queue = self.queues.get(name)
+            rows.append({
+                'stage': name,
+                'fps': (count - before) / elapsed,
+                'depth': len(queue) if queue is not None else 0,
+                'dropped': queue.dropped if queue is not None else 0,
+            })
+        return rows
+
+    def summary(self):
+        """One-line stats for a status bar"""
+        parts = [f"{row['stage']} {row['fps']:.0f} fps" + (f" q{row['depth']} drop {row['dropped']}"
+                                                          if row['stage'] != 'capture' else "")
+                 for row in self.stats()]
+        return " | ".join(parts) + f" | latency {self.latency * 1000:.0f} ms"
+
+
+class SimulatedCamera:
+    """Camera producing frames at a fixed rate into a driver buffer that holds the oldest frames"""
+    def __init__(self, fps=30, buffer=4):
+        self.period = 1.0 / fps
+        self.buffer = buffer
+        self.frames = deque()
+        self.condition = threading.Condition()
+        self.running = True
+        threading.Thread(target=self._produce, daemon=True).start()
+
+    def _produce(self):
+        index = 0
+        next_time = time.perf_counter()
+        while self.running:
+            next_time += self.period
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+            index += 1
+            with self.condition:
+                # A full driver buffer drops the new frame, as V4L2 does
+                if len(self.frames) < self.buffer:
+                    self.frames.append((index, time.perf_counter()))
+                    self.condition.notify()
+
+    def read(self):
+        """Oldest buffered frame as (index, timestamp), waiting for one if needed"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.frames)
+            return self.frames.popleft()
+
+    def release(self):
+        self.running = False
+
+
+def simulated_stages(detect_ms, infer_ms, render_ms):
+    """detect/infer/render work functions that only take time, like blocking OpenCV or model calls"""
+    def stage(milliseconds):
+        def work(frame):
+            time.sleep(milliseconds / 1000)
+            return frame
+        return work
+    return stage(detect_ms), stage(infer_ms), stage(render_ms)
+
+
+def run_serial(camera, stages, seconds):
+    """The old loop: read, detect, infer and render one frame at a time; returns latencies"""
+    latencies = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        _, captured = camera.read()
+        frame = Frame(0, None)
+        for work in stages:
+            work(frame)
+        latencies.append(time.perf_counter() - captured)
+        time.sleep(0.01)
+    return latencies, None
+
+
+def run_pipelined(camera, stages, seconds, poll_ms=10):
+    """The staged pipeline, polled like the Tk loop; returns latencies and the final stats"""
+    def read():
+        _, captured = camera.read()
+        return captured
+
+    pipeline = FramePipeline(read, *stages)
+    pipeline.start()
+    latencies = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        frame = pipeline.latest()
+        if frame is not None:
+            # Latency from the moment the camera produced the frame
+            latencies.append(time.perf_counter() - frame.image)
+        time.sleep(poll_ms / 1000)
+    stats = pipeline.stats()
+    pipeline.stop()
+    return latencies, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serial loop against the staged pipeline on a simulated camera")
+    parser.add_argument('--fps', type=int, default=30, help="camera frame rate")
+    parser.add_argument('--buffer', type=int, default=4, help="frames the camera driver buffers")
+    parser.add_argument('--detect-ms', type=float, default=15, help="simulated face detection time")
+    parser.add_argument('--infer-ms', type=float, default=40, help="simulated emotion inference time")
+    parser.add_argument('--render-ms', type=float, default=5, help="simulated drawing and conversion time")
+    parser.add_argument('--seconds', type=float, default=5, help="run time per mode")
+    args = parser.parse_args()
+
+    stages = simulated_stages(args.detect_ms, args.infer_ms, args.render_ms)
+    print(f"{'mode':<10} {'shown fps':>9} {'median latency':>15} {'p95 latency':>12}")
+    for mode, run in (('serial', run_serial), ('pipelined', run_pipelined)):
+        camera = SimulatedCamera(args.fps, args.buffer)
+        latencies, stats = run(camera, stages, args.seconds)
+        camera.release()
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95)]
+        print(f"{mode:<10} {len(latencies) / args.seconds:>9.1f} {statistics.median(latencies) * 1000:>12.0f} ms "
+              f"{p95 * 1000:>9.0f} ms")
+        if stats:
+            for row in stats:
+                print(f"  {row['stage']:<8} {row['fps']:>5.1f} fps  queue {row['depth']}  dropped {row['dropped']}")
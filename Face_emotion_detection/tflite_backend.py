@@ -0,0 +1,287 @@
+"""
+TFLite inference backend for the emotion CNN, for CPU-only machines.
+The Keras model is converted offline to a .tflite flat buffer, optionally
+quantized, and run with the TFLite interpreter, which hands the graph to
+the XNNPACK delegate for optimized CPU kernels (float32, float16 and
+quantized int8 alike).
+
+Quantization modes:
+    none     float32 weights and activations
+    float16  float16 weights, computed in float32
+    dynamic  int8 weights, activations quantized on the fly
+    int8     int8 weights and activations, calibrated on sample face crops
+
+Usage:
+    python tflite_backend.py convert --quantization float16
+    python tflite_backend.py convert --quantization int8 --calibration images/train
+    python tflite_backend.py compare --calibration images/train --evaluation images/test
+`compare` converts every mode, then reports model size, top-1 agreement and
+probability drift against the Keras model on held-out evaluation images,
+and per-frame latency for each backend. Without --evaluation the
+--calibration images are split in two halves; without any images only
+size and latency are reported.
+Set FACE_INFERENCE_BACKEND=tflite (and FACE_TFLITE_MODEL) in .env to use
+the converted model in MainRealTimeEmotion.py.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+from inference import INPUT_SIZE, LABELS, face_batch, synthetic_frame, time_frames
+
+# Quantization modes accepted by convert()
+QUANTIZATIONS = ['none', 'float16', 'dynamic', 'int8']
+
+# Face crops used to calibrate int8 activation ranges
+CALIBRATION_SAMPLES = 300
+
+# Image files accepted as calibration and evaluation crops
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def load_interpreter_class():
+    """The TFLite Interpreter class of whichever runtime is installed"""
+    # The standalone runtimes are much smaller than TensorFlow on a kiosk
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+def load_crops(directory, limit=None, seed=0):
+    """Grayscale 48x48 float crops, shape (N, 48, 48, 1), from the images under a directory"""
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+    paths.sort()
+    if limit and len(paths) > limit:
+        # A sample across every class folder rather than the first ones alphabetically
+        paths = random.Random(seed).sample(paths, limit)
+
+    crops = []
+    for path in paths:
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is not None:
+            crops.append(cv2.resize(image, (INPUT_SIZE, INPUT_SIZE)))
+    if not crops:
+        raise ValueError(f"No images found under {directory}")
+    return np.asarray(crops, dtype=np.float32).reshape(-1, INPUT_SIZE, INPUT_SIZE, 1) / 255.0
+
+
+def convert(model, output_path, quantization='none', calibration=None):
+    """Convert a Keras model to a .tflite file; int8 needs calibration crops"""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantization == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'dynamic':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif quantization == 'int8':
+        if calibration is None or not len(calibration):
+            raise ValueError("int8 quantization needs calibration crops")
+
+        def representative_dataset():
+            for crop in calibration:
+                yield [crop[np.newaxis]]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        # Integer-only kernels, with int8 input and output so no float ops remain
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    elif quantization != 'none':
+        raise ValueError(f"Unknown quantization {quantization!r}, expected one of {', '.join(QUANTIZATIONS)}")
+
+    flatbuffer = converter.convert()
+    with open(output_path, 'wb') as file:
+        file.write(flatbuffer)
+    return len(flatbuffer)
+
+
+class TFLiteEmotionClassifier:
+    """Drop-in replacement for inference.EmotionClassifier running a .tflite model"""
+    def __init__(self, model_path, num_threads=None):
+        Interpreter = load_interpreter_class()
+        # The default op resolver applies the XNNPACK delegate to every supported op
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads or os.cpu_count())
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = None
+
+    def _resize(self, batch_size):
+        """Reshape the input for a new number of faces; the graph is only re-planned when it changes"""
+        if batch_size != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input['index'], [batch_size, INPUT_SIZE, INPUT_SIZE, 1])
+            self.interpreter.allocate_tensors()
+            self.input = self.interpreter.get_input_details()[0]
+            self.output = self.interpreter.get_output_details()[0]
+            self.batch_size = batch_size
+
+    def predict(self, batch):
+        """Class probabilities, shape (N, 7), for a batch of face crops"""
+        if not len(batch):
+            return np.zeros((0, len(LABELS)), dtype=np.float32)
+        self._resize(len(batch))
+
+        if self.input['dtype'] == np.int8:
+            scale, zero_point = self.input['quantization']
+            batch = np.clip(np.round(batch / scale + zero_point), -128, 127).astype(np.int8)
+        self.interpreter.set_tensor(self.input['index'], batch)
+        self.interpreter.invoke()
+        probabilities = self.interpreter.get_tensor(self.output['index'])
+
+        if self.output['dtype'] == np.int8:
+            scale, zero_point = self.output['quantization']
+            probabilities = (probabilities.astype(np.float32) - zero_point) * scale
+        return probabilities
+
+    def classify(self, gray, faces):
+        """Emotion label of every face in a grayscale frame"""
+        if not len(faces):
+            return []
+        probabilities = self.predict(face_batch(gray, faces))
+        return [LABELS[index] for index in probabilities.argmax(axis=1)]
+
+
+def split_crops(crops, seed=0):
+    """Shuffle crops and split them into calibration and evaluation halves"""
+    crops = crops[np.random.default_rng(seed).permutation(len(crops))]
+    half = len(crops) // 2
+    return crops[:half], crops[half:]
+
+
+def check_drift(reference, candidate, crops, batch_size=32):
+    """Top-1 agreement and mean/max absolute probability difference of candidate against reference"""
+    agree = 0
+    differences = []
+    for start in range(0, len(crops), batch_size):
+        batch = crops[start:start + batch_size]
+        expected = reference.predict(batch)
+        actual = candidate.predict(batch)
+        agree += int(np.sum(expected.argmax(axis=1) == actual.argmax(axis=1)))
+        differences.append(np.abs(expected - actual))
+    differences = np.concatenate(differences)
+    return {
+        'top1_agreement': agree / len(crops),
+        'mean_abs_diff': float(differences.mean()),
+        'max_abs_diff': float(differences.max()),
+    }
+
+
+def compare(model, calibration, evaluation, directory, face_counts=(1, 4), frames=30):
+    """Convert every quantization mode; return rows of size, drift and latency against Keras
+
+    Drift is measured on the evaluation crops, which must not overlap the
+    calibration crops; pass None to skip it.
+    """
+    from inference import EmotionClassifier
+
+    keras_classifier = EmotionClassifier(model)
+    frames_by_count = {count: synthetic_frame(count) for count in face_counts}
+
+    def latencies(classifier):
+        result = {}
+        for count, (gray, faces) in frames_by_count.items():
+            classifier.classify(gray, faces)
+            result[count] = time_frames(classifier.classify, gray, faces, frames)
+        return result
+
+    rows = [{'backend': 'keras', 'size_kb': None, 'drift': None, 'latency_ms': latencies(keras_classifier)}]
+    for quantization in QUANTIZATIONS:
+        path = os.path.join(directory, f'emotion_{quantization}.tflite')
+        size = convert(model, path, quantization, calibration)
+        classifier = TFLiteEmotionClassifier(path)
+        rows.append({
+            'backend': f'tflite-{quantization}',
+            'size_kb': size / 1024,
+            'drift': check_drift(keras_classifier, classifier, evaluation) if evaluation is not None else None,
+            'latency_ms': latencies(classifier),
+        })
+    return rows
+
+
+def main(argv=None):
+    """Command line entry point"""
+    import config
+    from inference import build_model, load_keras_model
+
+    parser = argparse.ArgumentParser(description="Convert the emotion CNN to TFLite and compare backends")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = commands.add_parser('convert', help="write a .tflite model")
+    convert_parser.add_argument('--quantization', choices=QUANTIZATIONS, default='float16')
+    convert_parser.add_argument('-o', '--output', default=config.FACE_TFLITE_MODEL, help="output .tflite file")
+
+    compare_parser = commands.add_parser('compare', help="drift and latency of every backend")
+    compare_parser.add_argument('--frames', type=int, default=30, help="timed frames per case")
+
+    for command in (convert_parser, compare_parser):
+        command.add_argument('--model', default=config.FACE_EMOTION_MODEL_H5, help="trained Keras .h5 model")
+        command.add_argument('--calibration', help="folder of face images for int8 calibration")
+        command.add_argument('--samples', type=int, default=CALIBRATION_SAMPLES, help="images used from each folder")
+    compare_parser.add_argument('--evaluation', help="folder of held-out face images for the drift check")
+    args = parser.parse_args(argv)
+    if args.command == 'convert' and args.quantization == 'int8' and not args.calibration:
+        convert_parser.error("--quantization int8 needs --calibration images")
+
+    if os.path.exists(args.model):
+        model = load_keras_model(args.model)
+    elif args.command == 'compare':
+        # Latency does not depend on the weights; drift on random weights says little
+        print(f"{args.model} not found, comparing the untrained architecture")
+        model = build_model()
+    else:
+        print(f"{args.model} not found", file=sys.stderr)
+        return 1
+    calibration = load_crops(args.calibration, args.samples) if args.calibration else None
+
+    if args.command == 'convert':
+        size = convert(model, args.output, args.quantization, calibration)
+        print(f"Wrote {args.output} ({args.quantization}, {size / 1024:.0f} KB)")
+        return 0
+
+    if args.evaluation:
+        evaluation = load_crops(args.evaluation, args.samples)
+    elif calibration is not None:
+        # Never measure drift on the images int8 was calibrated on
+        calibration, evaluation = split_crops(calibration)
+    else:
+        print("No --calibration or --evaluation images: int8 is calibrated on noise and drift is not measured")
+        evaluation = None
+        calibration = np.random.default_rng(0).random(
+            (CALIBRATION_SAMPLES, INPUT_SIZE, INPUT_SIZE, 1), dtype=np.float32)
+    with tempfile.TemporaryDirectory() as directory:
+        rows = compare(model, calibration, evaluation, directory, frames=args.frames)
+
+    print(f"{'backend':<16} {'size':>8} {'top-1 agree':>12} {'mean diff':>10} {'max diff':>9} "
+          f"{'1 face':>9} {'4 faces':>9}")
+    for row in rows:
+        size = f"{row['size_kb']:.0f} KB" if row['size_kb'] is not None else "-"
+        drift = row['drift']
+        drift_columns = (f"{drift['top1_agreement']:>12.2%} {drift['mean_abs_diff']:>10.4f} "
+                         f"{drift['max_abs_diff']:>9.4f}" if drift else
+                         f"{'reference' if row['backend'] == 'keras' else '-':>12} {'-':>10} {'-':>9}")
+        latency = row['latency_ms']
+        print(f"{row['backend']:<16} {size:>8} {drift_columns} {latency[1]:>6.1f} ms {latency[4]:>6.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
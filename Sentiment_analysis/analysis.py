@@ -1,17 +1,37 @@
-
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import tkinter as tk
 from tkinter import scrolledtext
 from tkinter import messagebox
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from tkinter import filedialog
+from tkinter import simpledialog
+from tkinter import ttk
 import os
 import sys
+import threading
+import time
+
+from engine import get_engine
+from incremental import IncrementalScorer
+from longdoc import LongDocumentScorer
+from results_table import ResultRows, VirtualTable
+from scoring import aggregate_scores
+from worker import AnalysisWorker, LONG_DOCUMENT_CHARS, analyze_document, score_file, score_live
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
 
+# Milliseconds to wait after the last edit before live mode rescores
+LIVE_DEBOUNCE_MS = 250
+
+# How often worker results are pulled into the UI (about 60 Hz)
+WORKER_POLL_MS = 16
+
+# How often the chart is redrawn while a file is being scored
+FILE_CHART_MS = 250
+
+# Delay after the window is first drawn before the chart and the lexicon are loaded
+STARTUP_DELAY_MS = 50
+
 class HoverButton(tk.Button):
     """Button that changes appearance on hover"""
     def __init__(self, master, **kwargs):
@@ -38,8 +58,38 @@ class HoverButton(tk.Button):
 class SentimentAnalysisApp:
     def __init__(self, root):
         self.root = root
+
+        # Live mode state
+        self.live_scorer = IncrementalScorer()
+        self.live_job = None
+        # A worker of its own, so typing never cancels an Analyze or file run
+        self.live_worker = AnalysisWorker()
+        self.live_poll = None
+
+        # Background analysis state
+        self.worker = AnalysisWorker()
+        self.worker_poll = None
+        self.long_scorer = LongDocumentScorer()
+        self.long_segments = []
+        self.long_scores = None
+        self.long_weight = 0
+
+        # File mode state
+        self.worker_mode = None
+        self.file_rows = None
+        self.file_total = 0
+        self.file_start = 0
+        self.file_chart_time = 0
+
+        # Chart values, kept until the chart exists
+        self.chart = None
+        self.chart_values = (0, 0, 0)
+
         self.setup_ui()
 
+        # matplotlib and the VADER lexicon are loaded once the window is up
+        self.root.after(STARTUP_DELAY_MS, self.finish_startup)
+
         # Bind window close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
@@ -114,6 +164,9 @@ class SentimentAnalysisApp:
         )
         self.text_area.pack(fill="both", expand=True, padx=5, pady=5)
 
+        # Rescore as the user types when live mode is on
+        self.text_area.bind("<<Modified>>", self.on_text_modified)
+
         # Buttons frame
         button_frame = tk.Frame(content_frame, bg=self.bg_color)
         button_frame.pack(fill="x", pady=10)
@@ -131,6 +184,33 @@ class SentimentAnalysisApp:
         )
         self.analyze_button.pack(side=tk.LEFT, padx=5)
 
+        # Load file button
+        self.load_button = HoverButton(
+            button_frame,
+            text="Load File",
+            font=("Helvetica", 12),
+            bg=config.SUCCESS_BTN_COLOR,
+            fg="white",
+            padx=15,
+            pady=5,
+            command=self.load_file
+        )
+        self.load_button.pack(side=tk.LEFT, padx=5)
+
+        # Export button, enabled once a file has been scored
+        self.export_button = HoverButton(
+            button_frame,
+            text="Export Results",
+            font=("Helvetica", 12),
+            bg=config.PRIMARY_BTN_COLOR,
+            fg="white",
+            padx=15,
+            pady=5,
+            state=tk.DISABLED,
+            command=self.export_results
+        )
+        self.export_button.pack(side=tk.LEFT, padx=5)
+
         # Clear button
         self.clear_button = HoverButton(
             button_frame,
@@ -157,6 +237,22 @@ class SentimentAnalysisApp:
         )
         self.return_button.pack(side=tk.LEFT, padx=5)
 
+        # Live mode toggle
+        self.live_var = tk.BooleanVar(value=False)
+        self.live_check = tk.Checkbutton(
+            button_frame,
+            text="Live",
+            font=("Helvetica", 12),
+            variable=self.live_var,
+            bg=self.bg_color,
+            fg=self.text_color,
+            selectcolor=config.CARD_BG,
+            activebackground=self.bg_color,
+            activeforeground=self.text_color,
+            command=self.toggle_live
+        )
+        self.live_check.pack(side=tk.LEFT, padx=15)
+
         # Results section
         results_frame = tk.LabelFrame(
             content_frame,
@@ -234,18 +330,81 @@ class SentimentAnalysisApp:
 
             setattr(self, attr_name, result_label)
 
+        # Per-segment results for long documents
+        segments_frame = tk.Frame(text_results_frame, bg=self.bg_color)
+        segments_frame.pack(fill="both", expand=True, pady=5)
+
+        tk.Label(
+            segments_frame,
+            text="Segments:",
+            font=("Helvetica", 11),
+            anchor="w",
+            bg=self.bg_color,
+            fg=self.text_color
+        ).pack(fill="x")
+
+        segment_scrollbar = tk.Scrollbar(segments_frame)
+        segment_scrollbar.pack(side=tk.RIGHT, fill="y")
+
+        self.segment_list = tk.Listbox(
+            segments_frame,
+            font=("Courier", 10),
+            height=6,
+            bg=config.CARD_BG,
+            fg=self.text_color,
+            yscrollcommand=segment_scrollbar.set
+        )
+        self.segment_list.pack(side=tk.LEFT, fill="both", expand=True)
+        segment_scrollbar.config(command=self.segment_list.yview)
+
         # Visualization on the right
         self.viz_frame = tk.Frame(results_container, bg=self.bg_color)
         self.viz_frame.pack(side=tk.RIGHT, fill="both", expand=True)
 
-        # Create initial empty chart
-        self.create_chart()
+        # The chart is created in finish_startup, after the first paint
+
+        # File results, shown once a file is loaded
+        self.file_frame = tk.LabelFrame(
+            content_frame,
+            text="File Results",
+            font=("Helvetica", 12, "bold"),
+            bg=self.bg_color,
+            fg=self.text_color,
+            padx=10,
+            pady=10
+        )
+
+        progress_frame = tk.Frame(self.file_frame, bg=self.bg_color)
+        progress_frame.pack(fill="x", pady=5)
+
+        self.file_progress = ttk.Progressbar(progress_frame, mode="determinate")
+        self.file_progress.pack(side=tk.LEFT, fill="x", expand=True)
+
+        self.throughput_label = tk.Label(
+            progress_frame,
+            text="",
+            font=("Helvetica", 10),
+            width=40,
+            anchor="e",
+            bg=self.bg_color,
+            fg=self.text_color
+        )
+        self.throughput_label.pack(side=tk.LEFT, padx=10)
+
+        # Only the rows in view are drawn, so large files do not create a widget per record
+        self.file_table = VirtualTable(
+            self.file_frame,
+            bg=config.CARD_BG,
+            fg=self.text_color,
+            header_bg=self.bg_color
+        )
+        self.file_table.pack(fill="both", expand=True)
 
         # Footer with status information
         footer_frame = tk.Frame(self.root, bg=config.CARD_BG, height=30)
         footer_frame.pack(fill="x", side="bottom")
 
-        status_label = tk.Label(
+        self.status_label = tk.Label(
             footer_frame,
             text="Ready to analyze text sentiment",
             font=("Helvetica", 10),
@@ -253,7 +412,7 @@ class SentimentAnalysisApp:
             fg=self.text_color,
             pady=5
         )
-        status_label.pack(side=tk.LEFT, padx=10)
+        self.status_label.pack(side=tk.LEFT, padx=10)
 
         # Center window on screen
         self.center_window()
@@ -267,54 +426,36 @@ class SentimentAnalysisApp:
         y = (self.root.winfo_screenheight() // 2) - (height // 2)
         self.root.geometry(f'{width}x{height}+{x}+{y}')
 
-    def create_chart(self, pos=0, neu=0, neg=0):
-        """Create or update the sentiment visualization chart"""
-        # Clear previous chart if it exists
-        for widget in self.viz_frame.winfo_children():
-            widget.destroy()
+    def finish_startup(self):
+        """Create the chart and load the lexicon in the background, off the path to first paint"""
+        self.create_chart()
+        threading.Thread(target=get_engine().load, daemon=True).start()
 
-        # Create figure and axis
-        fig, ax = plt.subplots(figsize=(4, 3), dpi=100)
+    def create_chart(self):
+        """Create the sentiment chart once; later analyses update it in place"""
+        # matplotlib is the slowest import of the app, so it is deferred to here
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from chart import SentimentChart
 
-        # Data
-        categories = ['Positive', 'Neutral', 'Negative']
-        values = [pos, neu, neg]
         colors = [self.positive_color, self.neutral_color, self.negative_color]
-
-        # Create horizontal bar chart
-        bars = ax.barh(categories, values, color=colors)
-
-        # Add percentage labels
-        for bar in bars:
-            width = bar.get_width()
-            label_x_pos = width + 1
-            ax.text(label_x_pos, bar.get_y() + bar.get_height()/2, f'{width:.1f}%',
-                    va='center', fontsize=9)
-
-        # Customize chart
-        ax.set_title('Sentiment Distribution', fontsize=12)
-        ax.set_xlim(0, 100)
-        ax.set_xlabel('Percentage (%)')
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-
-        # Set background color
-        fig.patch.set_facecolor(self.bg_color)
-        ax.set_facecolor(self.bg_color)
-
-        # Set text color
-        ax.title.set_color(self.text_color)
-        ax.xaxis.label.set_color(self.text_color)
-        ax.yaxis.label.set_color(self.text_color)
-        ax.tick_params(colors=self.text_color)
+        self.chart = SentimentChart(colors, self.bg_color, self.text_color)
+        self.chart.update(*self.chart_values)
 
         # Embed in tkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.viz_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.chart_canvas = FigureCanvasTkAgg(self.chart.figure, master=self.viz_frame)
+        self.chart_canvas.draw()
+        self.chart_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    def update_chart(self, pos=0, neu=0, neg=0):
+        """Update the bars and labels and schedule a redraw"""
+        self.chart_values = (pos, neu, neg)
+        if self.chart is None:
+            return
+        self.chart.update(pos, neu, neg)
+        self.chart_canvas.draw_idle()
 
     def analyze_sentiment(self):
-        """Analyze the sentiment of the input text"""
+        """Analyze the sentiment of the input text in the background"""
         # Get text from the text area
         text = self.text_area.get("1.0", "end-1c").strip()
 
@@ -322,46 +463,272 @@ class SentimentAnalysisApp:
             messagebox.showinfo("Input Required", "Please enter some text to analyze.")
             return
 
-        # Create analyzer and get sentiment scores
-        analyzer = SentimentIntensityAnalyzer()
-        sentiment_dict = analyzer.polarity_scores(text)
+        # Starting a new analysis cancels the one in progress, including a file run
+        self.hide_file_results()
+        self.worker_mode = 'text'
+        self.long_segments = []
+        self.long_scores = None
+        self.long_weight = 0
+        self.segment_list.delete(0, tk.END)
+        self.status_label.config(text="Analyzing...")
+        self.worker.submit(analyze_document, text, self.long_scorer, LONG_DOCUMENT_CHARS)
+        if self.worker_poll is None:
+            self.worker_poll = self.root.after(WORKER_POLL_MS, self.poll_worker)
+
+    def poll_worker(self):
+        """Apply messages from the analysis worker and report progress"""
+        self.worker_poll = None
+        lines = []
+        new_parts = []
+        for kind, payload in self.worker.poll():
+            if kind == 'status':
+                self.status_label.config(text=payload)
+            elif kind == 'segments':
+                self.long_segments = payload
+            elif kind == 'segment':
+                index, scores, words = payload
+                segment = self.long_segments[index]
+                preview = segment if len(segment) <= 50 else segment[:47] + '...'
+                lines.append(f"#{index + 1:<5} {scores['compound']:+.3f}  {preview}")
+                new_parts.append((scores, words))
+            elif kind == 'total':
+                self.file_total = payload
+                self.file_progress.config(maximum=payload)
+            elif kind == 'rows':
+                self.file_rows.extend(payload)
+            elif kind == 'done' and self.worker_mode == 'file':
+                self.show_file_complete(payload)
+            elif kind == 'done':
+                self.show_results(payload)
+                self.show_complete()
+            elif kind == 'error':
+                self.status_label.config(text="Analysis failed")
+                messagebox.showerror("Error", f"Analysis failed: {payload}")
+
+        if lines:
+            self.segment_list.insert(tk.END, *lines)
+        if new_parts and self.worker.busy:
+            # Length-weighted aggregate of everything scored so far
+            if self.long_scores is not None:
+                new_parts.append((self.long_scores, self.long_weight))
+            self.long_scores = aggregate_scores(new_parts)
+            self.long_weight = sum(weight for _, weight in new_parts)
+            self.show_results(self.long_scores)
+            total = len(self.long_segments)
+            done = self.segment_list.size()
+            self.status_label.config(text=f"Scoring segments: {done}/{total} ({done / total:.0%})")
+
+        if self.worker_mode == 'file' and self.worker.busy:
+            self.show_file_progress()
+
+        if self.worker.busy:
+            self.worker_poll = self.root.after(WORKER_POLL_MS, self.poll_worker)
+
+    def load_file(self):
+        """Pick a CSV, JSONL or text file and score its records in the background"""
+        path = filedialog.askopenfilename(
+            title="Load File",
+            filetypes=[("Records", "*.csv *.tsv *.jsonl *.ndjson *.json *.txt"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        from bulk import detect_format
+        text_field = 'text'
+        if detect_format(path) != 'text':
+            text_field = simpledialog.askstring(
+                "Text Field", "Column or field holding the text:", initialvalue='text', parent=self.root)
+            if not text_field:
+                return
+
+        # Starting a file run cancels the analysis in progress
+        self.worker_mode = 'file'
+        self.file_rows = ResultRows()
+        self.file_total = 0
+        self.file_start = time.perf_counter()
+        self.file_chart_time = 0
+        self.file_table.set_rows(self.file_rows)
+        self.file_progress.config(value=0, maximum=1)
+        self.throughput_label.config(text="")
+        self.export_button.config(state=tk.DISABLED)
+        self.segment_list.delete(0, tk.END)
+        self.clear_results()
+        if not self.file_frame.winfo_ismapped():
+            self.file_frame.pack(fill="both", expand=True, pady=10)
+
+        self.status_label.config(text=f"Scoring {os.path.basename(path)}...")
+        self.worker.submit(score_file, path, text_field)
+        if self.worker_poll is None:
+            self.worker_poll = self.root.after(WORKER_POLL_MS, self.poll_worker)
+
+    def show_file_progress(self):
+        """Refresh the table, progress bar and throughput, and the chart a few times a second"""
+        count = len(self.file_rows)
+        elapsed = time.perf_counter() - self.file_start
+        self.file_table.refresh()
+        self.file_progress.config(value=min(count, self.file_total))
+        self.throughput_label.config(
+            text=f"{count:,} / ~{self.file_total:,} records, {count / elapsed if elapsed else 0:,.0f} records/sec")
+
+        now = time.perf_counter()
+        if count and now - self.file_chart_time >= FILE_CHART_MS / 1000:
+            self.file_chart_time = now
+            self.show_results(self.file_rows.mean_scores())
+
+    def show_file_complete(self, count):
+        """Show the final file scores and allow exporting them"""
+        elapsed = time.perf_counter() - self.file_start
+        self.file_table.refresh()
+        self.file_progress.config(maximum=max(1, count), value=max(1, count))
+        self.throughput_label.config(
+            text=f"{count:,} records in {elapsed:.1f}s, {count / elapsed if elapsed else 0:,.0f} records/sec")
+        if count:
+            self.show_results(self.file_rows.mean_scores())
+            self.export_button.config(state=tk.NORMAL)
+        self.status_label.config(text=f"File analysis complete: {count:,} records, mean scores")
+
+    def export_results(self):
+        """Save the scores of the loaded file as CSV or JSONL"""
+        if not self.file_rows:
+            return
+        path = filedialog.asksaveasfilename(
+            title="Export Results",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")]
+        )
+        if not path:
+            return
+        try:
+            self.file_rows.export(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Export failed: {e}")
+            return
+        self.status_label.config(text=f"Exported {len(self.file_rows):,} results to {os.path.basename(path)}")
+
+    def hide_file_results(self):
+        """Stop showing file results and forget them"""
+        self.file_rows = None
+        self.file_table.set_rows(None)
+        self.export_button.config(state=tk.DISABLED)
+        self.file_frame.pack_forget()
+
+    def show_complete(self):
+        """Report a finished analysis in the status bar"""
+        if self.long_segments:
+            self.status_label.config(
+                text=f"Analysis complete: {len(self.long_segments)} segments, length-weighted scores")
+            return
+
+        # Report how often repeated texts were served from the cache
+        stats = get_engine().cache_stats()
+        if stats is not None:
+            self.status_label.config(
+                text=f"Analysis complete (cache: {stats['hits']} hits, {stats['misses']} misses, "
+                     f"{stats['hit_rate']:.0%} hit rate)")
+        else:
+            self.status_label.config(text="Analysis complete")
 
+    def show_results(self, sentiment_dict):
+        """Display a set of scores in the results panel and chart"""
         # Extract scores
         neg = sentiment_dict['neg'] * 100
         neu = sentiment_dict['neu'] * 100
         pos = sentiment_dict['pos'] * 100
-        compound = sentiment_dict['compound']
+        overall = sentiment_dict['overall']
 
         # Update score labels
         self.positive_score.config(text=f"{pos:.1f}%")
         self.neutral_score.config(text=f"{neu:.1f}%")
         self.negative_score.config(text=f"{neg:.1f}%")
 
-        # Determine overall sentiment
-        if compound >= 0.05:
-            overall = "Positive"
-            self.overall_result.config(text=overall, fg=self.positive_color)
-        elif compound <= -0.05:
-            overall = "Negative"
-            self.overall_result.config(text=overall, fg=self.negative_color)
-        else:
-            overall = "Neutral"
-            self.overall_result.config(text=overall, fg=self.neutral_color)
+        # Show overall sentiment
+        overall_colors = {
+            "Positive": self.positive_color,
+            "Negative": self.negative_color,
+            "Neutral": self.neutral_color
+        }
+        self.overall_result.config(text=overall, fg=overall_colors[overall])
 
         # Update chart
-        self.create_chart(pos, neu, neg)
+        self.update_chart(pos, neu, neg)
 
-    def clear_all(self):
-        """Clear all input and results"""
-        self.text_area.delete("1.0", tk.END)
+    def clear_results(self):
+        """Reset the results panel and chart"""
         self.overall_result.config(text="")
         self.positive_score.config(text="")
         self.neutral_score.config(text="")
         self.negative_score.config(text="")
-        self.create_chart()  # Reset chart
+        self.update_chart()  # Reset chart
+
+    def on_text_modified(self, event=None):
+        """Schedule a live rescore once the user pauses typing"""
+        # Clear the flag so Tk fires <<Modified>> again on the next edit
+        self.text_area.edit_modified(False)
+        if not self.live_var.get():
+            return
+        if self.live_job is not None:
+            self.root.after_cancel(self.live_job)
+        self.live_job = self.root.after(LIVE_DEBOUNCE_MS, self.live_update)
+
+    def live_update(self):
+        """Rescore the text on the live worker; poll_live shows the result"""
+        self.live_job = None
+        text = self.text_area.get("1.0", "end-1c")
+        if not text.strip():
+            self.live_worker.cancel()
+            self.clear_results()
+            self.status_label.config(text="Live mode: waiting for text")
+            return
+
+        self.live_worker.submit(score_live, text, self.live_scorer)
+        if self.live_poll is None:
+            self.live_poll = self.root.after(WORKER_POLL_MS, self.poll_live)
+
+    def poll_live(self):
+        """Show the live worker's result once it is ready"""
+        self.live_poll = None
+        for kind, payload in self.live_worker.poll():
+            if kind == 'done' and self.live_var.get():
+                self.show_results(payload['scores'])
+                if payload['sentences'] is None:
+                    self.status_label.config(text="Live mode: whole-text scores, as Analyze gives")
+                else:
+                    # Long texts are not scored the way Analyze scores them, so say what these are
+                    self.status_label.config(
+                        text=f"Live mode: per-sentence scores of {payload['sentences']} sentences, "
+                             f"{payload['rescored']} rescored so far")
+            elif kind == 'error':
+                self.status_label.config(text=f"Live mode failed: {payload}")
+
+        if self.live_worker.busy:
+            self.live_poll = self.root.after(WORKER_POLL_MS, self.poll_live)
+
+    def toggle_live(self):
+        """Turn live mode on or off"""
+        if self.live_var.get():
+            self.live_update()
+        else:
+            if self.live_job is not None:
+                self.root.after_cancel(self.live_job)
+                self.live_job = None
+            self.live_worker.cancel()
+            self.status_label.config(text="Live mode off")
+
+    def clear_all(self):
+        """Clear all input and results"""
+        self.text_area.delete("1.0", tk.END)
+        self.live_worker.cancel()
+        self.live_scorer.reset()
+        self.worker.cancel()
+        self.segment_list.delete(0, tk.END)
+        self.hide_file_results()
+        self.clear_results()
 
     def on_closing(self, event=None):
         """Handle window closing"""
+        self.worker.cancel()
+        self.live_worker.cancel()
+        self.long_scorer.shutdown()
         self.root.destroy()
         # Exit with a special code to signal return to main menu
         import sys
@@ -0,0 +1,306 @@
+"""
+Throughput and latency benchmarks for the sentiment pipelines.
+Two paths are measured on deterministic synthetic corpora of short, medium
+and long documents:
+    vader  the analysis.py path: get_engine() on the whole text, or sentence by
+           sentence with a length-weighted aggregate for long documents
+    nltk   the main_nltk.py path: clean, word_tokenize, stop word removal,
+           lemmatization and emotion lexicon matching
+    nltk-regex  the same with the regex tokenizer backend
+
+Every (path, size) case runs in a fresh Python process so cold start and
+peak RSS are not affected by earlier cases. Each case reports import and
+load time and first-document latency (cold), then docs/sec, tokens/sec and
+p50/p95/p99 latency over repeated passes (warm). The VADER score cache is
+turned off so warm passes measure scoring, not cache lookups.
+
+Usage:
+    python benchmark.py -o results.json
+    python benchmark.py -o new.json --compare results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+PATHS = ['vader', 'nltk', 'nltk-regex']
+
+# Words per document and documents per corpus for each size
+SIZES = {
+    'short': {'words': (8, 25), 'docs': 2000},
+    'medium': {'words': (80, 200), 'docs': 300},
+    'long': {'words': (1500, 3000), 'docs': 20},
+}
+
+# Relative change in a metric that counts as a regression when comparing runs
+REGRESSION_THRESHOLD = 0.10
+
+# Metrics compared between runs: (higher is better, fails the comparison when it regresses)
+# Tail latency and cold start timings are shown but too noisy to gate on
+COMPARED_METRICS = {
+    'docs_per_sec': (True, True),
+    'tokens_per_sec': (True, True),
+    'p50_ms': (False, True),
+    'p95_ms': (False, True),
+    'p99_ms': (False, False),
+    'cold_start_ms': (False, False),
+    'peak_rss_mb': (False, True),
+}
+
+# Vocabulary for the synthetic corpora: sentiment words, emotion words and filler
+SENTIMENT_WORDS = ['good', 'great', 'love', 'excellent', 'happy', 'bad', 'terrible', 'hate',
+                   'awful', 'sad', 'not', 'very', 'extremely', 'barely', 'but', 'never']
+EMOTION_WORDS = ['angry', 'amused', 'adored', 'alarmed', 'annoyed', 'apathetic', 'awkward',
+                 'cheated', 'bored', 'fearful', 'attracted', 'lonely', 'proud', 'free']
+FILLER_WORDS = ['the', 'a', 'service', 'food', 'was', 'is', 'and', 'we', 'it', 'staff', 'price',
+                'of', 'to', 'in', 'this', 'that', 'they', 'movies', 'children', 'running', 'went']
+PUNCTUATION = ['.', '.', '.', '!', '?']
+
+
+def build_corpus(size, seed=11):
+    """Deterministic list of review-like documents of the given size"""
+    spec = SIZES[size]
+    rng = random.Random(f"{seed}-{size}")
+    vocabulary = SENTIMENT_WORDS + EMOTION_WORDS + FILLER_WORDS * 3
+    documents = []
+    for _ in range(spec['docs']):
+        remaining = rng.randint(*spec['words'])
+        sentences = []
+        while remaining > 0:
+            length = min(remaining, rng.randint(4, 18))
+            words = rng.choices(vocabulary, k=length)
+            sentences.append(' '.join(words).capitalize() + rng.choice(PUNCTUATION))
+            remaining -= length
+        documents.append(' '.join(sentences))
+    return documents
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it cannot be read"""
+    try:
+        import resource
+    except ImportError:
+        # Windows has no resource module
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def load_vader():
+    """Import and load the analysis.py scoring path; return a score function"""
+    from engine import get_engine
+    from scoring import aggregate_scores, score_text
+    from segmentation import segment_document
+    from worker import LONG_DOCUMENT_CHARS
+
+    # The engine the GUI uses (mapped lexicon); each case has its own process, so its cache can go
+    engine = get_engine()
+    engine.cache = None
+    load_start = time.perf_counter()
+    engine.load()
+    load_seconds = time.perf_counter() - load_start
+
+    def analyse(text):
+        if len(text) < LONG_DOCUMENT_CHARS:
+            return score_text(text, engine)
+        segments = segment_document(text)
+        return aggregate_scores([(score_text(segment, engine), len(segment.split()))
+                                 for segment in segments])
+
+    return analyse, load_seconds
+
+
+def load_nltk(tokenizer='punkt'):
+    """Import and load the main_nltk.py emotion path; return an analyse function"""
+    from collections import Counter
+
+    from emotion_lexicon import EmotionLexicon
+    from preprocessing import TextPreprocessor, clean_text
+    from tokenization import get_tokenizer
+
+    load_start = time.perf_counter()
+    tokenize = get_tokenizer(tokenizer)
+    preprocessor = TextPreprocessor()
+    lexicon = EmotionLexicon.load('emotions.txt', preprocessor)
+    load_seconds = time.perf_counter() - load_start
+
+    def analyse(text):
+        return lexicon.count_emotions(tokenize(clean_text(text)), Counter())
+
+    return analyse, load_seconds
+
+
+LOADERS = {'vader': load_vader, 'nltk': load_nltk, 'nltk-regex': lambda: load_nltk('regex')}
+
+
+def run_case(path, size, repeat, seed):
+    """Measure one (path, size) case in the current process and return its metrics"""
+    documents = build_corpus(size, seed)
+    tokens = sum(len(document.split()) for document in documents)
+
+    import_start = time.perf_counter()
+    analyse, load_seconds = LOADERS[path]()
+    import_seconds = time.perf_counter() - import_start - load_seconds
+
+    # Cold: the first document pays for lazy initialisation and empty caches
+    start = time.perf_counter()
+    analyse(documents[0])
+    first_doc = time.perf_counter() - start
+
+    # Warm: repeated passes over the whole corpus
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for document in documents:
+            doc_start = time.perf_counter()
+            analyse(document)
+            latencies.append(time.perf_counter() - doc_start)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    return {
+        'path': path,
+        'size': size,
+        'docs': len(documents),
+        'tokens': tokens,
+        'repeat': repeat,
+        'import_seconds': import_seconds,
+        'load_seconds': load_seconds,
+        'first_doc_ms': first_doc * 1000,
+        'cold_start_ms': (import_seconds + load_seconds + first_doc) * 1000,
+        'docs_per_sec': len(latencies) / elapsed,
+        'tokens_per_sec': tokens * repeat / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_isolated(path, size, repeat, seed):
+    """Run one case in a fresh interpreter so cold start and peak RSS are its own"""
+    command = [sys.executable, os.path.abspath(__file__), '--case', f'{path}:{size}',
+               '--repeat', str(repeat), '--seed', str(seed)]
+    process = subprocess.run(command, capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    if process.returncode != 0:
+        lines = process.stderr.strip().splitlines()
+        return {'path': path, 'size': size, 'error': lines[-1] if lines else f'exit {process.returncode}'}
+    return json.loads(process.stdout)
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Print the change of every metric against a baseline run; return the regressions"""
+    previous = {(case['path'], case['size']): case for case in baseline['results'] if 'error' not in case}
+    regressions = []
+    for case in results['results']:
+        if 'error' in case:
+            # A case that no longer runs is the worst regression of all
+            print(f"\n{case['path']}/{case['size']}: failed: {case['error']}  REGRESSION")
+            regressions.append((case['path'], case['size'], 'error', None))
+            continue
+        old = previous.get((case['path'], case['size']))
+        if old is None:
+            continue
+        print(f"\n{case['path']}/{case['size']}:")
+        for metric, (higher_is_better, gated) in COMPARED_METRICS.items():
+            if not old.get(metric) or case.get(metric) is None:
+                continue
+            change = (case[metric] - old[metric]) / old[metric]
+            worse = -change if higher_is_better else change
+            flag = ''
+            if gated and worse > threshold:
+                flag = '  REGRESSION'
+                regressions.append((case['path'], case['size'], metric, change))
+            print(f"  {metric:<15} {old[metric]:>12.3f} -> {case[metric]:>12.3f} ({change:+.1%}){flag}")
+    return regressions
+
+
+def print_table(results):
+    """Human-readable summary of a run"""
+    print(f"{'case':<16} {'docs/sec':>10} {'tokens/sec':>11} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'cold ms':>8} {'first ms':>9} {'rss MB':>7}")
+    for case in results['results']:
+        name = f"{case['path']}/{case['size']}"
+        if 'error' in case:
+            print(f"{name:<16} failed: {case['error']}")
+            continue
+        rss = f"{case['peak_rss_mb']:>7.1f}" if case['peak_rss_mb'] is not None else f"{'n/a':>7}"
+        print(f"{name:<16} {case['docs_per_sec']:>10.0f} {case['tokens_per_sec']:>11.0f} "
+              f"{case['p50_ms']:>8.3f} {case['p95_ms']:>8.3f} {case['p99_ms']:>8.3f} "
+              f"{case['cold_start_ms']:>8.1f} {case['first_doc_ms']:>9.3f} {rss}")
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark the sentiment pipelines")
+    parser.add_argument('--paths', nargs='+', choices=PATHS, default=PATHS, help="pipelines to measure")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES),
+                        help="document sizes to measure")
+    parser.add_argument('--repeat', type=int, default=3, help="warm passes over each corpus")
+    parser.add_argument('--seed', type=int, default=11, help="corpus seed")
+    parser.add_argument('-o', '--output', help="write the results as JSON to this file")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="relative change that counts as a regression")
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        # Child process: measure one case and report it on stdout
+        path, size = args.case.split(':')
+        try:
+            result = run_case(path, size, args.repeat, args.seed)
+        except (ImportError, LookupError, OSError) as e:
+            # Reported as a failed case so the other cases still run, e.g. when NLTK data is missing
+            message = next((line.strip() for line in str(e).splitlines() if line.strip('* ')), '')
+            result = {'path': path, 'size': size, 'error': f"{type(e).__name__}: {message}"}
+        print(json.dumps(result))
+        return 0
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': [run_isolated(path, size, args.repeat, args.seed)
+                    for path in args.paths for size in args.sizes],
+    }
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            failed = sum(metric == 'error' for _, _, metric, _ in regressions)
+            print(f"\n{len(regressions) - failed} metrics regressed by more than {args.threshold:.0%}, "
+                  f"{failed} cases failed")
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
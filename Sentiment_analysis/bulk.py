@@ -0,0 +1,269 @@
+"""
+Headless bulk sentiment scoring.
+Reads JSONL, CSV or plain text files and scores every record with VADER
+across a pool of worker processes.
+
+Usage:
+    python bulk.py reviews.jsonl -o scores.jsonl
+    python bulk.py tweets.csv -o scores.csv --text-field body --id-field tweet_id
+    python bulk.py lines.txt -o scores.jsonl --workers 8
+    python bulk.py reviews.jsonl -o scores.jsonl --vectorized
+    python bulk.py archive.jsonl -o scores.jsonl --store archive.db
+
+Plain text inputs are memory-mapped and split into line-aligned shards
+that each worker reads itself (see corpus.py).
+
+With --store, results are checkpointed in a SQLite database. Running the
+same command again after a crash resumes: records already stored with the
+same text are read back instead of scored.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from corpus import CorpusIndex, read_shard
+from engine import get_engine
+from scoring import SCORE_FIELDS, label_scores, score_text
+from store import ResultStore, content_hash
+
+# Batch scorer owned by each worker when --vectorized is used
+_batch_scorer = None
+
+# Result store each worker reads stored scores from when --store is used
+_store = None
+_scorer_name = 'vader'
+
+
+def detect_format(path):
+    """Guess the record format from the file extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    if ext in ('.csv', '.tsv'):
+        return 'csv'
+    return 'text'
+
+
+def read_records(path, fmt=None, text_field='text', id_field='id'):
+    """Yield (record_id, text) pairs from a JSONL, CSV or plain text file"""
+    fmt = fmt or detect_format(path)
+
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        if fmt == 'jsonl':
+            for line_number, line in enumerate(file, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                yield record.get(id_field, line_number), str(record.get(text_field) or '')
+
+        elif fmt == 'csv':
+            delimiter = '\t' if path.lower().endswith('.tsv') else ','
+            reader = csv.DictReader(file, delimiter=delimiter)
+            for row_number, row in enumerate(reader, 1):
+                yield row.get(id_field) or row_number, row.get(text_field) or ''
+
+        else:
+            # Plain text: one document per line, the line number is the id
+            for line_number, line in enumerate(file, 1):
+                text = line.rstrip('\n')
+                if text.strip():
+                    yield line_number, text
+
+
+def batched(iterable, size):
+    """Group an iterable into lists of at most size items"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ResultWriter:
+    """Write scored records as JSONL or CSV"""
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.fmt = fmt or ('csv' if detect_format(path) == 'csv' else 'jsonl')
+        self.file = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+        self.csv_writer = None
+
+        if self.fmt == 'csv':
+            self.csv_writer = csv.writer(self.file)
+            self.csv_writer.writerow(['id'] + SCORE_FIELDS)
+
+    def write(self, record_id, scores):
+        """Write one scored record"""
+        if self.csv_writer is not None:
+            self.csv_writer.writerow([record_id] + [scores[field] for field in SCORE_FIELDS])
+        else:
+            row = {'id': record_id}
+            row.update(scores)
+            self.file.write(json.dumps(row) + '\n')
+
+    def close(self):
+        """Flush and close the output file"""
+        if self.file is sys.stdout:
+            self.file.flush()
+        else:
+            self.file.close()
+
+
+def _init_worker(vectorized=False, store_path=None):
+    """Load the lexicons once per worker process"""
+    global _batch_scorer, _store, _scorer_name
+    get_engine().load()
+    if vectorized:
+        from vectorized import VectorizedScorer
+        _batch_scorer = VectorizedScorer()
+    _scorer_name = 'vectorized' if vectorized else 'vader'
+    if store_path is not None:
+        _store = ResultStore(store_path, read_only=True)
+
+
+def _score_texts(texts):
+    """Score a list of texts with the configured scorer"""
+    if _batch_scorer is not None:
+        return [label_scores(sentiment_dict) for sentiment_dict in _batch_scorer.polarity_scores_batch(texts)]
+    return [score_text(text) for text in texts]
+
+
+def _score_batch(batch):
+    """Score (record_id, text) pairs inside a worker into (record_id, scores, content hash, stored)"""
+    if _store is None:
+        scores = _score_texts([text for _, text in batch])
+        return [(record_id, result, None, False) for (record_id, _), result in zip(batch, scores)]
+
+    # Records stored earlier with the same text are read back instead of scored
+    digests = [content_hash(text) for _, text in batch]
+    keys = [(str(record_id), digest) for (record_id, _), digest in zip(batch, digests)]
+    stored = _store.lookup(keys, _scorer_name)
+    todo = [text for (_, text), key in zip(batch, keys) if key not in stored]
+    scored = iter(_score_texts(todo))
+
+    results = []
+    for (record_id, _), key in zip(batch, keys):
+        if key in stored:
+            results.append((record_id, stored[key], key[1], True))
+        else:
+            results.append((record_id, next(scored), key[1], False))
+    return results
+
+
+def _score_shard(task):
+    """Read the lines of one corpus shard inside a worker and score them"""
+    path, shard = task
+    records = [(line_number, text) for line_number, text in read_shard(path, shard) if text.strip()]
+    return _score_batch(records)
+
+
+def score_corpus(path, workers=None, vectorized=False, store_path=None):
+    """Score a plain text file shard by shard in a process pool, yielding results in line order"""
+    workers = workers or os.cpu_count() or 1
+    tasks = [(path, shard) for shard in CorpusIndex.load(path).shards(workers)]
+
+    if workers == 1:
+        _init_worker(vectorized, store_path)
+        for task in tasks:
+            yield from _score_shard(task)
+        return
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(vectorized, store_path)) as pool:
+        for results in pool.imap(_score_shard, tasks):
+            yield from results
+
+
+def score_records(records, workers=None, batch_size=500, vectorized=False, store_path=None):
+    """Score (record_id, text) pairs in a process pool, yielding results in input order"""
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        # Skip the pool entirely for single process runs
+        _init_worker(vectorized, store_path)
+        for batch in batched(records, batch_size):
+            yield from _score_batch(batch)
+        return
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(vectorized, store_path)) as pool:
+        for results in pool.imap(_score_batch, batched(records, batch_size)):
+            yield from results
+
+
+def run(input_path, output_path, fmt=None, text_field='text', id_field='id',
+        workers=None, batch_size=500, vectorized=False, report_every=5.0, store_path=None):
+    """Score a whole file and return (documents, documents reused from the store, seconds)"""
+    fmt = fmt or detect_format(input_path)
+    if fmt == 'text':
+        # Workers read their own shards of the file instead of receiving every line through a pipe
+        results = score_corpus(input_path, workers, vectorized, store_path)
+    else:
+        records = read_records(input_path, fmt, text_field, id_field)
+        results = score_records(records, workers, batch_size, vectorized, store_path)
+    writer = ResultWriter(output_path)
+    # The main process is the only writer; workers only read
+    store = ResultStore(store_path) if store_path else None
+    scorer_name = 'vectorized' if vectorized else 'vader'
+
+    count = 0
+    reused = 0
+    start = time.perf_counter()
+    last_report = start
+    try:
+        for record_id, scores, digest, stored in results:
+            writer.write(record_id, scores)
+            count += 1
+            if stored:
+                reused += 1
+            elif store is not None:
+                store.add(str(record_id), digest, scorer_name, scores)
+
+            now = time.perf_counter()
+            if report_every and now - last_report >= report_every:
+                print(f"{count} docs ({reused} from store), {count / (now - start):.0f} docs/sec",
+                      file=sys.stderr)
+                last_report = now
+    finally:
+        writer.close()
+        if store is not None:
+            store.close()
+
+    return count, reused, time.perf_counter() - start
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Score text records with VADER in bulk")
+    parser.add_argument('input', help="JSONL, CSV or plain text file (one document per line)")
+    parser.add_argument('-o', '--output', default='-', help="output .jsonl or .csv file (default: stdout)")
+    parser.add_argument('--format', choices=['jsonl', 'csv', 'text'], help="input format (default: from extension)")
+    parser.add_argument('--text-field', default='text', help="field holding the text (JSONL/CSV)")
+    parser.add_argument('--id-field', default='id', help="field holding the record id (JSONL/CSV)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--batch-size', type=int, default=500, help="records sent to a worker at a time")
+    parser.add_argument('--vectorized', action='store_true',
+                        help="use the NumPy batch scorer (matches VADER within 0.01, see vectorized.py)")
+    parser.add_argument('--store', help="SQLite file to checkpoint results in; re-runs resume and skip unchanged records")
+    args = parser.parse_args(argv)
+
+    count, reused, elapsed = run(args.input, args.output, args.format, args.text_field,
+                                 args.id_field, args.workers, args.batch_size, args.vectorized,
+                                 store_path=args.store)
+
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Scored {count} documents in {elapsed:.2f}s ({rate:.0f} docs/sec)", file=sys.stderr)
+    if args.store:
+        print(f"{reused} unchanged documents read from {args.store}, {count - reused} scored",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
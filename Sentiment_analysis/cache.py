@@ -0,0 +1,110 @@
+"""
+Bounded LRU cache for sentiment scores.
+Entries are keyed by a hash of the whitespace-normalized text so repeated
+messages skip VADER tokenization and rule evaluation entirely. The cache is
+bounded both by entry count and by an estimate of the bytes it holds.
+"""
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+# Default bounds, sized for a few hundred thousand short texts
+DEFAULT_MAX_ENTRIES = 100000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def normalize_text(text):
+    """Collapse whitespace runs, which VADER treats as a single separator"""
+    return ' '.join(text.split())
+
+
+def text_key(text):
+    """Hash the normalized text into a compact cache key"""
+    return hashlib.blake2b(normalize_text(text).encode('utf-8'), digest_size=16).digest()
+
+
+def estimate_size(key, value):
+    """Rough number of bytes held by one cache entry"""
+    size = sys.getsizeof(key) + sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    return size
+
+
+class ScoreCache:
+    """Thread-safe LRU cache with entry and byte limits plus hit statistics"""
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Store a value, evicting least recently used entries to stay in bounds"""
+        size = estimate_size(key, value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+
+            while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, text, compute):
+        """Return the cached value for text, calling compute(text) on a miss"""
+        key = text_key(text)
+        value = self.get(key)
+        if value is None:
+            value = compute(text)
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry and reset the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Return hit, miss and eviction counts along with current usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes
+            }
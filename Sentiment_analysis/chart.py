@@ -0,0 +1,51 @@
+"""
+Sentiment distribution chart that is built once and updated in place.
+The figure is created with matplotlib.figure.Figure rather than pyplot, so
+it is not registered with pyplot's global figure manager and is freed with
+the window. Updates only change bar widths and label text.
+"""
+
+from matplotlib.figure import Figure
+
+CATEGORIES = ['Positive', 'Neutral', 'Negative']
+
+
+class SentimentChart:
+    """Horizontal bar chart of positive/neutral/negative percentages"""
+    def __init__(self, colors, bg_color, text_color, figsize=(4, 3), dpi=100):
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        ax = self.figure.add_subplot(111)
+        self.ax = ax
+
+        # Create horizontal bar chart
+        self.bars = ax.barh(CATEGORIES, [0, 0, 0], color=colors)
+
+        # Add percentage labels
+        self.labels = []
+        for bar in self.bars:
+            label = ax.text(1, bar.get_y() + bar.get_height() / 2, '0.0%', va='center', fontsize=9)
+            self.labels.append(label)
+
+        # Customize chart
+        ax.set_title('Sentiment Distribution', fontsize=12)
+        ax.set_xlim(0, 100)
+        ax.set_xlabel('Percentage (%)')
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+
+        # Set background color
+        self.figure.patch.set_facecolor(bg_color)
+        ax.set_facecolor(bg_color)
+
+        # Set text color
+        ax.title.set_color(text_color)
+        ax.xaxis.label.set_color(text_color)
+        ax.yaxis.label.set_color(text_color)
+        ax.tick_params(colors=text_color)
+
+    def update(self, pos=0, neu=0, neg=0):
+        """Set the bar widths and labels; the caller schedules the redraw"""
+        for bar, label, value in zip(self.bars, self.labels, (pos, neu, neg)):
+            bar.set_width(value)
+            label.set_x(value + 1)
+            label.set_text(f'{value:.1f}%')
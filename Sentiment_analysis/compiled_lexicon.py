@@ -0,0 +1,335 @@
+"""
+Compiled, memory-mapped VADER lexicon shared by worker processes.
+SentimentIntensityAnalyzer() reads and parses vader_lexicon.txt and the
+emoji lexicon in every process and keeps both the raw files and the dicts
+in memory. This module compiles the lexicon once into a binary file:
+
+    header   magic, format version, source file sizes and mtimes, counts
+    offsets  uint32[n + 1] offsets of the sorted words in the string table
+    strings  UTF-8 words, concatenated in sorted order
+    values   float64[n] valence of each word
+    slots    int32[2^k] open-addressing hash index (crc32) into the words
+
+Every process maps the file read-only, so the OS keeps one copy of the
+pages however many workers use it. MappedLexicon is a read-only Mapping
+over it that the analyzer uses in place of its lexicon dict. Only the
+single-character emojis, the only ones polarity_scores can match, are
+kept as a small dict.
+
+Usage:
+    python compiled_lexicon.py --workers 4
+Builds the file, checks that scores are identical and compares worker
+start time and memory against building SentimentIntensityAnalyzer.
+"""
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+import zlib
+from collections.abc import Mapping
+
+import vaderSentiment.vaderSentiment as vader_module
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+# Bump when the layout changes so stale files are rebuilt
+FORMAT_VERSION = 1
+
+MAGIC = b'VADERLX1'
+HEADER = struct.Struct('<8sIQQQQIIII')
+
+# Words whose lookups each process memoizes; a workload's vocabulary is far smaller than this
+LOOKUP_CACHE_ENTRIES = 50000
+
+# Compiled file, next to this module
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vader_lexicon.bin')
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(vader_module.__file__))
+LEXICON_SOURCE = os.path.join(SOURCE_DIR, 'vader_lexicon.txt')
+EMOJI_SOURCE = os.path.join(SOURCE_DIR, 'emoji_utf8_lexicon.txt')
+
+
+def _source_stamp():
+    """Sizes and mtimes of the source lexicons, used to detect a stale compiled file"""
+    lexicon, emoji = os.stat(LEXICON_SOURCE), os.stat(EMOJI_SOURCE)
+    return lexicon.st_size, lexicon.st_mtime_ns, emoji.st_size, emoji.st_mtime_ns
+
+
+def _string_table(keys):
+    """Offsets and concatenated UTF-8 bytes of a list of strings"""
+    offsets = [0]
+    encoded = []
+    for key in keys:
+        data = key.encode('utf-8')
+        encoded.append(data)
+        offsets.append(offsets[-1] + len(data))
+    return offsets, b''.join(encoded)
+
+
+def _hash_slots(encoded_keys):
+    """Open-addressing table at most half full mapping crc32(key) to the key's index"""
+    size = 1
+    while size < 2 * max(1, len(encoded_keys)):
+        size *= 2
+    slots = [-1] * size
+    for index, data in enumerate(encoded_keys):
+        slot = zlib.crc32(data) & (size - 1)
+        while slots[slot] != -1:
+            slot = (slot + 1) & (size - 1)
+        slots[slot] = index
+    return slots
+
+
+def _section(typecode, values):
+    """Pack values as a little-endian array"""
+    return struct.pack(f'<{len(values)}{typecode}', *values)
+
+
+def compile_lexicon(path=DEFAULT_PATH):
+    """Parse the VADER lexicons the way the analyzer does and write the compiled file"""
+    # Reuse the analyzer's own parsing so the values are exactly the same
+    analyzer = SentimentIntensityAnalyzer()
+    words = sorted(analyzer.lexicon)
+    emojis = sorted(key for key in analyzer.emojis if len(key) == 1)
+
+    offsets, strings = _string_table(words)
+    slots = _hash_slots([word.encode('utf-8') for word in words])
+    emoji_offsets, emoji_strings = _string_table(emojis)
+    description_offsets, descriptions = _string_table([analyzer.emojis[key] for key in emojis])
+
+    sections = [
+        _section('I', offsets), strings,
+        _section('d', [analyzer.lexicon[word] for word in words]),
+        _section('i', slots),
+        _section('I', emoji_offsets), emoji_strings,
+        _section('I', description_offsets), descriptions,
+    ]
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, *_source_stamp(),
+                         len(words), len(slots), len(emojis), len(strings))
+
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(header)
+        for section in sections:
+            # Keep every array 8-byte aligned so memoryview casts are valid
+            file.write(section)
+            file.write(b'\0' * (-len(section) % 8))
+    os.replace(temp_path, path)
+
+
+class MappedLexicon(Mapping):
+    """Read-only word -> valence mapping over the memory-mapped compiled lexicon"""
+    def __init__(self, buffer, words, slot_count, strings_size, position):
+        self._buffer = buffer
+        self._count = words
+
+        def take(size, cast=None):
+            nonlocal position
+            view = buffer[position:position + size]
+            position += size + (-size % 8)
+            return view.cast(cast) if cast else view
+
+        self._offsets = take(4 * (words + 1), 'I')
+        self._strings = take(strings_size)
+        self._values = take(8 * words, 'd')
+        self._slots = take(4 * slot_count, 'i')
+        self._mask = slot_count - 1
+        self.end = position
+        # word -> valence, or None for a word that is not in the lexicon
+        self._memo = {}
+
+    def _index(self, key):
+        """Position of key in the sorted word table, or -1"""
+        try:
+            data = key.encode('utf-8')
+        except AttributeError:
+            return -1
+        slots, offsets, strings, mask = self._slots, self._offsets, self._strings, self._mask
+        slot = zlib.crc32(data) & mask
+        while True:
+            index = slots[slot]
+            if index < 0:
+                return -1
+            if strings[offsets[index]:offsets[index + 1]] == data:
+                return index
+            slot = (slot + 1) & mask
+
+    def _lookup(self, key):
+        """Valence of key, or None, probing the mapped table only the first time a word is seen"""
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        except TypeError:
+            return None
+        index = self._index(key)
+        value = self._values[index] if index >= 0 else None
+        if len(self._memo) < LOOKUP_CACHE_ENTRIES:
+            self._memo[key] = value
+        return value
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def __getitem__(self, key):
+        value = self._lookup(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        offsets, strings = self._offsets, self._strings
+        for index in range(self._count):
+            yield str(strings[offsets[index]:offsets[index + 1]], 'utf-8')
+
+
+def _read_strings(buffer, count, position, size):
+    """Decode a string table written by _string_table; return (strings, next position)"""
+    offsets = buffer[position:position + 4 * (count + 1)].cast('I')
+    position += 4 * (count + 1) + (-4 * (count + 1) % 8)
+    strings = [str(buffer[position + offsets[i]:position + offsets[i + 1]], 'utf-8') for i in range(count)]
+    position += size + (-size % 8)
+    return strings, position
+
+
+class CompiledLexicon:
+    """The compiled lexicon file mapped into memory"""
+    def __init__(self, path=DEFAULT_PATH):
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        (magic, version, *stamp, words, slot_count, emoji_count, strings_size) = \
+            HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a compiled VADER lexicon of format {FORMAT_VERSION}")
+        self.stamp = tuple(stamp)
+
+        self.lexicon = MappedLexicon(buffer, words, slot_count, strings_size, HEADER.size)
+
+        # The emoji tables are small, so they are decoded into the dict the analyzer expects
+        position = self.lexicon.end
+        emoji_size = struct.unpack_from(f'<{emoji_count + 1}I', buffer, position)[-1]
+        keys, position = _read_strings(buffer, emoji_count, position, emoji_size)
+        description_size = struct.unpack_from(f'<{emoji_count + 1}I', buffer, position)[-1]
+        descriptions, position = _read_strings(buffer, emoji_count, position, description_size)
+        self.emojis = dict(zip(keys, descriptions))
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        """Map the compiled lexicon, compiling it first if it is missing or out of date"""
+        try:
+            compiled = cls(path)
+            if compiled.stamp == _source_stamp():
+                return compiled
+        except (OSError, ValueError, struct.error):
+            pass
+        compile_lexicon(path)
+        return cls(path)
+
+    def analyzer(self):
+        """A SentimentIntensityAnalyzer that reads the mapped lexicon instead of parsing files"""
+        analyzer = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+        analyzer.lexicon = self.lexicon
+        analyzer.emojis = self.emojis
+        return analyzer
+
+
+def memory_mb():
+    """Resident and unique (private) set size of this process in MB; USS is None without /proc"""
+    try:
+        # Shared mapped pages count towards RSS but not towards the private lines
+        with open('/proc/self/smaps_rollup') as file:
+            fields = dict(line.split(':', 1) for line in file if ':' in line)
+        kb = {name: int(value.split()[0]) for name, value in fields.items() if value.strip().endswith('kB')}
+        return kb['Rss'] / 1024, (kb['Private_Clean'] + kb['Private_Dirty']) / 1024
+    except (OSError, KeyError, ValueError):
+        import resource
+        # No /proc (macOS, Windows): the peak RSS is the best available figure
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return (peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024), None
+
+
+def _worker_ready(mode, started, results):
+    """Build an analyzer in a fresh process and report how long it took and its memory"""
+    import_done = time.perf_counter()
+    if mode == 'mapped':
+        analyzer = CompiledLexicon.load().analyzer()
+    else:
+        analyzer = SentimentIntensityAnalyzer()
+    analyzer.polarity_scores("warm up the analyzer")
+    ready = time.time()
+    rss, uss = memory_mb()
+    results.put((mode, ready - started, (time.perf_counter() - import_done) * 1000, rss, uss))
+
+
+def measure_workers(mode, workers):
+    """Start workers together with the spawn method; return their (ready s, load ms, RSS MB, USS MB)"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    started = time.time()
+    processes = [context.Process(target=_worker_ready, args=(mode, started, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get()[1:] for _ in processes]
+    for process in processes:
+        process.join()
+    return reports
+
+
+def check_scores(texts):
+    """Number of texts whose mapped scores differ from SentimentIntensityAnalyzer's"""
+    reference = SentimentIntensityAnalyzer()
+    mapped = CompiledLexicon.load().analyzer()
+    return sum(reference.polarity_scores(text) != mapped.polarity_scores(text) for text in texts)
+
+
+def time_scoring(analyzer, texts, repeat=3):
+    """Best-of-repeat seconds to score every text"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            analyzer.polarity_scores(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    from benchmark import build_corpus
+
+    parser = argparse.ArgumentParser(description="Compile the VADER lexicon and compare it with parsing per worker")
+    parser.add_argument('--workers', type=int, default=4, help="worker processes started per mode")
+    parser.add_argument('--rebuild', action='store_true', help="recompile even if the file is current")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.rebuild:
+        compile_lexicon()
+    compiled = CompiledLexicon.load()
+    print(f"{DEFAULT_PATH}: {len(compiled.lexicon)} words, {len(compiled.emojis)} emojis, "
+          f"{os.path.getsize(DEFAULT_PATH) / 1024:.0f} KB, ready in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    texts = build_corpus('short') + build_corpus('medium')
+    mismatches = check_scores(texts)
+    print(f"Scores: {len(texts) - mismatches}/{len(texts)} texts identical")
+
+    print(f"{'mode':<8} {'ready ms':>9} {'load ms':>8} {'RSS MB':>7} {'USS MB':>7}   (mean of {args.workers} workers)")
+    for mode in ('parsed', 'mapped'):
+        reports = measure_workers(mode, args.workers)
+        ready, load, rss = (sum(column) / len(reports) for column in list(zip(*reports))[:3])
+        uss = [report[3] for report in reports]
+        uss = f"{sum(uss) / len(uss):>7.1f}" if None not in uss else f"{'-':>7}"
+        print(f"{mode:<8} {ready * 1000:>9.1f} {load:>8.1f} {rss:>7.1f} {uss}")
+
+    parsed_time = time_scoring(SentimentIntensityAnalyzer(), texts)
+    mapped_time = time_scoring(compiled.analyzer(), texts)
+    print(f"Scoring: parsed {len(texts) / parsed_time:.0f} docs/sec, mapped {len(texts) / mapped_time:.0f} docs/sec")
+
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,185 @@
+"""
+Memory-mapped reader for large newline-delimited corpora.
+The start offset of every line is found once with NumPy over a memory map
+of the file and saved next to it as <file>.idx, so later runs load the
+index instead of rescanning. The index splits the file into byte-range
+shards that begin and end on line boundaries; each worker process maps
+the file itself and decodes only the lines of its own shard, so no line is
+read twice or lost and nothing is piped through a single reader.
+
+Usage:
+    python corpus.py big.txt --shards 8
+Builds (or loads) the index and checks that the shards cover every line exactly once.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+# Index file layout: magic, file size, file mtime in ns, line count, then uint64 offsets
+INDEX_MAGIC = b'LINEIDX1'
+INDEX_HEADER = struct.Struct('<8sQQQ')
+
+# Bytes of the file scanned for newlines at a time while indexing
+SCAN_BLOCK = 64 * 1024 * 1024
+
+# Target shard size, so results stream back while other shards are still being scored
+SHARD_BYTES = 8 * 1024 * 1024
+
+
+class Shard:
+    """A byte range of the corpus holding whole lines"""
+    def __init__(self, start, end, first_line, line_count):
+        self.start = start
+        self.end = end
+        self.first_line = first_line
+        self.line_count = line_count
+
+    def __repr__(self):
+        return (f"Shard(bytes {self.start}-{self.end}, lines {self.first_line}-"
+                f"{self.first_line + self.line_count - 1})")
+
+
+def scan_line_offsets(path):
+    """Return the start offset of every line, plus the file size as a final sentinel"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return np.zeros(1, dtype=np.uint64)
+
+    parts = [np.zeros(1, dtype=np.uint64)]
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = np.frombuffer(mm, dtype=np.uint8)
+        for block_start in range(0, size, SCAN_BLOCK):
+            block = data[block_start:block_start + SCAN_BLOCK]
+            # Each newline starts the next line
+            parts.append(np.flatnonzero(block == 10).astype(np.uint64) + np.uint64(block_start + 1))
+        # Release the buffer before the map is closed
+        del data, block
+
+    offsets = np.concatenate(parts)
+    if offsets[-1] != size:
+        # Last line has no trailing newline
+        offsets = np.append(offsets, np.uint64(size))
+    return offsets
+
+
+class CorpusIndex:
+    """Line offsets of a newline-delimited file, persisted beside it"""
+    def __init__(self, path, offsets):
+        self.path = path
+        self.offsets = offsets
+
+    @property
+    def line_count(self):
+        return len(self.offsets) - 1
+
+    @property
+    def size(self):
+        return int(self.offsets[-1])
+
+    @classmethod
+    def load(cls, path, index_path=None, rebuild=False):
+        """Load the saved index, building and saving it if it is missing or stale"""
+        index_path = index_path or path + '.idx'
+        stat = os.stat(path)
+
+        if not rebuild:
+            try:
+                with open(index_path, 'rb') as file:
+                    magic, size, mtime, count = INDEX_HEADER.unpack(file.read(INDEX_HEADER.size))
+                if (magic, size, mtime) == (INDEX_MAGIC, stat.st_size, stat.st_mtime_ns):
+                    offsets = np.memmap(index_path, dtype=np.uint64, mode='r',
+                                        offset=INDEX_HEADER.size, shape=(count + 1,))
+                    return cls(path, offsets)
+            except (OSError, struct.error, ValueError):
+                pass
+
+        index = cls(path, scan_line_offsets(path))
+        try:
+            index.save(index_path, stat)
+        except OSError:
+            # A read-only directory just means scanning again next time
+            pass
+        return index
+
+    def save(self, index_path, stat):
+        """Write the index next to the corpus"""
+        temp_path = index_path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, self.line_count))
+            file.write(np.ascontiguousarray(self.offsets, dtype='<u8').tobytes())
+        os.replace(temp_path, index_path)
+
+    def shards(self, count=None, shard_bytes=SHARD_BYTES):
+        """Split the file into at least count shards of about shard_bytes, cut on line boundaries"""
+        lines = self.line_count
+        if lines == 0:
+            return []
+        count = max(count or 1, -(-self.size // shard_bytes))
+        count = min(count, lines)
+
+        # First line of each shard: the line holding the k-th equal byte split
+        targets = np.arange(count, dtype=np.uint64) * np.uint64(self.size) // np.uint64(count)
+        starts = np.unique(np.searchsorted(self.offsets[:-1], targets, side='right') - 1)
+        bounds = list(starts) + [lines]
+
+        return [Shard(int(self.offsets[first]), int(self.offsets[last]), int(first) + 1, int(last - first))
+                for first, last in zip(bounds[:-1], bounds[1:])]
+
+
+def read_shard(path, shard, encoding='utf-8'):
+    """Yield (line_number, text) for the lines of a shard, without their newline"""
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # Slices of the view share the map's memory; only the decoded lines are copied
+        view = memoryview(mm)
+        try:
+            line_number = shard.first_line
+            position = shard.start
+            while position < shard.end:
+                newline = mm.find(b'\n', position, shard.end)
+                end = shard.end if newline < 0 else newline
+                yield line_number, str(view[position:end], encoding)
+                line_number += 1
+                position = end + 1
+        finally:
+            view.release()
+
+
+def check_shards(path, shards):
+    """Verify that the shards together yield every line of the file exactly once, in order"""
+    expected = 1
+    with open(path, 'rb') as file:
+        for shard in shards:
+            for line_number, text in read_shard(path, shard):
+                raw = file.readline()
+                if line_number != expected or text != raw.decode('utf-8').rstrip('\n'):
+                    return False
+                expected += 1
+        return file.readline() == b''
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index a newline-delimited corpus and check its shards")
+    parser.add_argument('path', help="text file with one record per line")
+    parser.add_argument('--shards', type=int, default=os.cpu_count() or 1, help="minimum number of shards")
+    parser.add_argument('--rebuild', action='store_true', help="rescan even if a saved index is valid")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = CorpusIndex.load(args.path, rebuild=args.rebuild)
+    elapsed = time.perf_counter() - start
+    print(f"{index.line_count} lines, {index.size / (1024 * 1024):.1f} MB, index ready in {elapsed:.3f}s")
+
+    shards = index.shards(args.shards)
+    for shard in shards[:10]:
+        print(f"  {shard}")
+    if len(shards) > 10:
+        print(f"  ... {len(shards) - 10} more")
+
+    start = time.perf_counter()
+    ok = check_shards(args.path, shards)
+    print(f"Shards cover every line exactly once: {ok} ({time.perf_counter() - start:.2f}s)")
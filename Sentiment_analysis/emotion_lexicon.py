@@ -0,0 +1,199 @@
+"""
+Compiled, indexed emotion lexicon built from emotions.txt.
+Single-word entries live in a hash map and multi-word entries such as
+"worked up" or "ill at ease" in a phrase trie, so a token stream is matched
+in one pass and every occurrence is counted. Phrases are matched on the
+cleaned tokens before stop words are removed, since most of them are built
+around one ("left out", "in control"). A token outside a phrase is dropped
+if it is a stop word and looked up by its lemma otherwise; single-word
+entries are normalized the same way so they line up with those lemmas.
+
+The compiled form is pickled next to emotions.txt and only rebuilt when
+emotions.txt changes.
+"""
+
+import hashlib
+import os
+import pickle
+from collections import Counter, deque
+from itertools import islice
+
+from preprocessing import clean_text
+
+# Bump when the compiled layout changes so stale caches are rebuilt
+FORMAT_VERSION = 2
+
+# Trie key marking the end of a phrase
+END = ''
+
+
+def parse_emotions(path):
+    """Parse emotions.txt into a list of (word, emotion) pairs"""
+    emotions = []
+    with open(path, 'r') as file:
+        for line in file:
+            clear_line = line.replace("\n", '').replace(",", '').replace("'", '').strip()
+            if not clear_line:
+                continue
+            word, emotion = clear_line.split(':')
+            emotions.append((word.strip(), emotion.strip()))
+    return emotions
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents"""
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+class EmotionLexicon:
+    """Word map plus phrase trie over the emotion lexicon"""
+    def __init__(self, words, phrases, max_phrase_len, preprocessor=None):
+        self.words = words
+        self.phrases = phrases
+        self.max_phrase_len = max_phrase_len
+        # Stop word filter and lemmatizer for tokens outside phrases; never pickled
+        self.preprocessor = preprocessor
+
+    @classmethod
+    def compile(cls, entries, preprocessor=None):
+        """Build the index from (word, emotion) pairs"""
+        words = {}
+        phrases = {}
+        max_phrase_len = 1
+
+        for entry, emotion in entries:
+            tokens = clean_text(entry).split()
+            if len(tokens) == 1:
+                if preprocessor is not None:
+                    tokens = preprocessor.process(tokens)
+                    if not tokens:
+                        # A stop word can never match
+                        continue
+                # Duplicate lines each keep their emotion, as the original loop did
+                words[tokens[0]] = words.get(tokens[0], ()) + (emotion,)
+            elif tokens:
+                # Phrases keep every token, stop words included, and are matched before filtering
+                node = phrases
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node[END] = node.get(END, ()) + (emotion,)
+                max_phrase_len = max(max_phrase_len, len(tokens))
+
+        return cls(words, phrases, max_phrase_len, preprocessor)
+
+    @classmethod
+    def load(cls, path='emotions.txt', preprocessor=None, cache_path=None):
+        """Load the compiled lexicon from its cache, rebuilding it if emotions.txt changed"""
+        cache_path = cache_path or path + '.cache'
+        stat = os.stat(path)
+
+        cached = None
+        try:
+            with open(cache_path, 'rb') as file:
+                cached = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+        if cached is not None and cached.get('version') == FORMAT_VERSION:
+            # Cheap check on size and mtime first, then fall back to the content hash
+            if (cached['size'], cached['mtime']) == (stat.st_size, stat.st_mtime_ns):
+                return cls(cached['words'], cached['phrases'], cached['max_phrase_len'], preprocessor)
+            digest = file_digest(path)
+            if cached['digest'] == digest:
+                lexicon = cls(cached['words'], cached['phrases'], cached['max_phrase_len'], preprocessor)
+                lexicon.save(cache_path, stat, digest)
+                return lexicon
+
+        lexicon = cls.compile(parse_emotions(path), preprocessor)
+        lexicon.save(cache_path, stat, file_digest(path))
+        return lexicon
+
+    def save(self, cache_path, stat, digest):
+        """Write the compiled lexicon to disk"""
+        data = {
+            'version': FORMAT_VERSION,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'digest': digest,
+            'words': self.words,
+            'phrases': self.phrases,
+            'max_phrase_len': self.max_phrase_len
+        }
+        # Write to a temporary file first so a crash never leaves a torn cache
+        tmp_path = cache_path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as file:
+                pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            # A read-only directory just means compiling again next time
+            pass
+
+    def _match_phrase(self, window):
+        """Return (tokens consumed, emotions) for the longest phrase starting the window"""
+        best = (0, None)
+        node = self.phrases.get(window[0])
+        length = 1
+        while node is not None:
+            if END in node:
+                best = (length, node[END])
+            if length >= len(window):
+                break
+            node = node.get(window[length])
+            length += 1
+        return best
+
+    def terms(self):
+        """Return {term: emotions} for every entry, with phrase tokens joined by spaces"""
+        terms = dict(self.words)
+        stack = [((), self.phrases)]
+        while stack:
+            prefix, node = stack.pop()
+            for token, child in node.items():
+                if token == END:
+                    terms[' '.join(prefix)] = child
+                else:
+                    stack.append((prefix + (token,), child))
+        return terms
+
+    def iter_matches(self, tokens):
+        """Yield (term, emotions) for every lexicon match in a cleaned token stream, longest match first"""
+        if self.preprocessor is None:
+            stop_words, lemmatize = frozenset(), None
+        else:
+            stop_words, lemmatize = self.preprocessor.stop_words, self.preprocessor.lemmatize
+        tokens = iter(tokens)
+        window = deque()
+
+        while True:
+            # Keep just enough lookahead for the longest phrase
+            while len(window) < self.max_phrase_len:
+                token = next(tokens, None)
+                if token is None:
+                    break
+                window.append(token)
+            if not window:
+                break
+
+            consumed, emotions = self._match_phrase(window)
+            if emotions:
+                yield ' '.join(islice(window, consumed)), emotions
+                for _ in range(consumed):
+                    window.popleft()
+                continue
+
+            token = window.popleft()
+            if token in stop_words:
+                continue
+            term = lemmatize(token) if lemmatize is not None else token
+            emotions = self.words.get(term)
+            if emotions:
+                yield term, emotions
+
+    def count_emotions(self, tokens, counter=None):
+        """Count the emotions of every lexicon match in a cleaned token stream"""
+        counter = Counter() if counter is None else counter
+        for _, emotions in self.iter_matches(tokens):
+            counter.update(emotions)
+        return counter
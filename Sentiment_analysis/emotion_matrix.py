@@ -0,0 +1,190 @@
+"""
+Emotion counts for large document collections with sparse matrices.
+The emotions.txt entries form a fixed CountVectorizer vocabulary, so a
+batch of documents becomes a sparse document-term matrix. One sparse
+product with the term-emotion matrix gives the per-document emotion
+counts, and the column sums give the corpus-wide histogram. Terms are the
+same longest-match lexicon hits that main_nltk.py counts, so the totals
+agree with EmotionLexicon.count_emotions.
+
+The collection is split into shards that are counted in worker processes;
+the partial matrices are stacked and the Counters summed at the end.
+
+Usage:
+    python emotion_matrix.py reviews.txt --workers 4
+    python emotion_matrix.py articles/ --save counts.npz
+A .txt file holds one document per line; a directory holds one document per .txt file.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+
+from corpus import CorpusIndex, read_shard
+from emotion_lexicon import EmotionLexicon, parse_emotions
+from preprocessing import TextPreprocessor, clean_text
+from tokenization import DEFAULT_TOKENIZER, TOKENIZERS, get_tokenizer
+
+# Files of a directory collection counted per task
+FILES_PER_SHARD = 500
+
+# Counter owned by each worker process
+_counter = None
+
+
+class EmotionMatrix:
+    """Turns documents into document-term and document-emotion sparse matrices"""
+    def __init__(self, lexicon, preprocessor, tokenize=None):
+        self.lexicon = lexicon
+        self.preprocessor = preprocessor
+        self.tokenize = tokenize or get_tokenizer()
+
+        entries = lexicon.terms()
+        self.terms = sorted(entries)
+        self.emotions = sorted({emotion for emotions in entries.values() for emotion in emotions})
+
+        # Term x emotion counts; a term listed twice for an emotion counts twice, as in count_emotions
+        emotion_column = {emotion: column for column, emotion in enumerate(self.emotions)}
+        rows, columns = [], []
+        for row, term in enumerate(self.terms):
+            for emotion in entries[term]:
+                rows.append(row)
+                columns.append(emotion_column[emotion])
+        self.term_emotions = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, columns)),
+            shape=(len(self.terms), len(self.emotions)))
+
+        self.vectorizer = CountVectorizer(analyzer=self.analyze, vocabulary=self.terms, dtype=np.int32)
+
+    @classmethod
+    def load(cls, emotions_path='emotions.txt', tokenizer=DEFAULT_TOKENIZER):
+        """Build from the compiled emotions.txt lexicon"""
+        preprocessor = TextPreprocessor()
+        return cls(EmotionLexicon.load(emotions_path, preprocessor), preprocessor, get_tokenizer(tokenizer))
+
+    def analyze(self, document):
+        """The lexicon terms found in a document, with the main_nltk.py normalization"""
+        return [term for term, _ in self.lexicon.iter_matches(self.tokenize(clean_text(document)))]
+
+    def document_terms(self, documents):
+        """Sparse documents x terms count matrix"""
+        return self.vectorizer.transform(documents)
+
+    def document_emotions(self, documents):
+        """Sparse documents x emotions count matrix"""
+        return (self.document_terms(documents) @ self.term_emotions).tocsr()
+
+    def totals(self, document_emotions):
+        """Corpus-wide Counter of a documents x emotions matrix"""
+        sums = np.asarray(document_emotions.sum(axis=0)).ravel()
+        return Counter({emotion: int(count) for emotion, count in zip(self.emotions, sums) if count})
+
+
+def collection_tasks(path, workers):
+    """Split a collection into shard tasks: line ranges of a file or groups of files"""
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.txt'))
+        return [('files', files[start:start + FILES_PER_SHARD])
+                for start in range(0, len(files), FILES_PER_SHARD)]
+    return [('lines', path, shard) for shard in CorpusIndex.load(path).shards(workers)]
+
+
+def read_task(task):
+    """The documents of one shard task, in collection order"""
+    if task[0] == 'files':
+        documents = []
+        for file_path in task[1]:
+            # Undecodable bytes become U+FFFD so one bad file neither stops the run nor shifts the rows
+            with open(file_path, encoding='utf-8', errors='replace') as file:
+                documents.append(file.read())
+        return documents
+    _, path, shard = task
+    # Blank lines stay as empty documents so row numbers match line numbers
+    return [text for _, text in read_shard(path, shard)]
+
+
+def _init_worker(emotions_path, tokenizer):
+    """Build the lexicon and vectorizer once per worker process"""
+    global _counter
+    _counter = EmotionMatrix.load(emotions_path, tokenizer)
+
+
+def _count_task(task):
+    """Count one shard inside a worker: (emotion names, documents x emotions matrix, Counter)"""
+    matrix = _counter.document_emotions(read_task(task))
+    return _counter.emotions, matrix, _counter.totals(matrix)
+
+
+def count_collection(path, workers=None, emotions_path='emotions.txt', tokenizer=DEFAULT_TOKENIZER):
+    """Return (emotion names, documents x emotions matrix, corpus Counter) for a collection"""
+    workers = workers or os.cpu_count() or 1
+    tasks = collection_tasks(path, workers)
+
+    if not tasks:
+        partials = []
+    elif workers == 1:
+        _init_worker(emotions_path, tokenizer)
+        partials = [_count_task(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  initargs=(emotions_path, tokenizer)) as pool:
+            partials = pool.map(_count_task, tasks)
+
+    if not partials:
+        # Nothing was counted, so the column names come straight from the lexicon file
+        emotions = sorted({emotion for _, emotion in parse_emotions(emotions_path)})
+        return emotions, sparse.csr_matrix((0, len(emotions)), dtype=np.int32), Counter()
+
+    # Every worker built the same lexicon, so any of them gives the column order
+    emotions = partials[0][0]
+    matrix = sparse.vstack([partial for _, partial, _ in partials], format='csr')
+    totals = Counter()
+    for _, _, counts in partials:
+        totals.update(counts)
+    return emotions, matrix, totals
+
+
+def save_counts(path, emotions, matrix):
+    """Save a documents x emotions matrix and its column names to an .npz file"""
+    np.savez_compressed(path, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+                        shape=np.array(matrix.shape), emotions=np.array(emotions))
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Per-document and corpus-wide emotion counts")
+    parser.add_argument('path', help="text file with one document per line, or a directory of .txt files")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--emotions', default='emotions.txt', help="emotion lexicon")
+    parser.add_argument('--top', type=int, default=10, help="most common emotions to print")
+    parser.add_argument('--save', help="write the per-document counts to this .npz file")
+    parser.add_argument('--tokenizer', choices=list(TOKENIZERS), default=DEFAULT_TOKENIZER,
+                        help="word tokenizer; regex is faster and equivalent on cleaned text")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    emotions, matrix, totals = count_collection(args.path, args.workers, args.emotions, args.tokenizer)
+    elapsed = time.perf_counter() - start
+
+    documents = matrix.shape[0]
+    with_emotions = int(np.count_nonzero(matrix.getnnz(axis=1)))
+    print(f"{documents} documents in {elapsed:.2f}s ({documents / elapsed if elapsed else 0:.0f} docs/sec), "
+          f"{with_emotions} with at least one emotion word")
+    for emotion, count in totals.most_common(args.top):
+        print(f"  {emotion:<15} {count}")
+
+    if args.save:
+        save_counts(args.save, emotions, matrix)
+        print(f"Per-document counts written to {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Long-lived VADER sentiment engine.
+Building a SentimentIntensityAnalyzer re-reads and re-parses the VADER
+lexicon and emoji files, so the engine does it once and shares the
+analyzer between every caller and thread in the process. Scores are
+memoized in a bounded LRU cache so repeated texts are not re-scored.
+The process-wide engine reads the compiled, memory-mapped lexicon from
+compiled_lexicon.py, so worker processes share one copy of it.
+
+Run this file directly to compare per-call latency against building a
+new analyzer for every call:
+    python engine.py
+"""
+
+import threading
+import time
+
+from cache import DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, ScoreCache
+
+# Whether get_engine() maps the compiled lexicon instead of parsing the text files
+MAPPED_LEXICON = True
+
+
+class SentimentEngine:
+    """Loads the VADER lexicons once and scores text from any thread"""
+    def __init__(self, use_cache=True, cache_entries=DEFAULT_MAX_ENTRIES, cache_bytes=DEFAULT_MAX_BYTES,
+                 mapped_lexicon=False):
+        self._analyzer = None
+        self.mapped_lexicon = mapped_lexicon
+        self._lock = threading.Lock()
+        self.cache = ScoreCache(cache_entries, cache_bytes) if use_cache else None
+
+    @property
+    def is_loaded(self):
+        """True once the lexicons have been parsed"""
+        return self._analyzer is not None
+
+    def load(self):
+        """Parse the lexicons if that has not happened yet"""
+        if self._analyzer is None:
+            with self._lock:
+                # Another thread may have finished loading while we waited
+                if self._analyzer is None:
+                    self._analyzer = self._build_analyzer()
+        return self._analyzer
+
+    def _build_analyzer(self):
+        """Analyzer over the mapped lexicon when enabled, else one that parses the files"""
+        # vaderSentiment is imported here so importing the engine stays cheap for GUI startup
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        if self.mapped_lexicon:
+            from compiled_lexicon import CompiledLexicon
+            try:
+                return CompiledLexicon.load().analyzer()
+            except (OSError, ValueError):
+                # e.g. the compiled file cannot be written next to the module
+                self.mapped_lexicon = False
+        return SentimentIntensityAnalyzer()
+
+    def polarity_scores(self, text):
+        """Return the VADER neg/neu/pos/compound scores for a text"""
+        # polarity_scores only reads the lexicon dicts, so no lock is needed here
+        if self.cache is None:
+            return self.load().polarity_scores(text)
+        # Hand out a copy so callers cannot modify the cached entry
+        return dict(self.cache.get_or_compute(text, self.load().polarity_scores))
+
+    def cache_stats(self):
+        """Return the result cache statistics, or None when caching is off"""
+        return self.cache.stats() if self.cache is not None else None
+
+
+# Engine shared by everything in this process
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the process-wide sentiment engine"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = SentimentEngine(mapped_lexicon=MAPPED_LEXICON)
+    return _engine
+
+
+def measure_latency(texts, repeat=3):
+    """Time per-call scoring with a fresh analyzer versus the warm engine"""
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+    # Before: a new analyzer for every call, as the GUI used to do
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            SentimentIntensityAnalyzer().polarity_scores(text)
+    cold = (time.perf_counter() - start) / (repeat * len(texts))
+
+    # After: one engine loaded up front and reused (cache off to time real scoring)
+    engine = SentimentEngine(use_cache=False)
+    engine.load()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            engine.polarity_scores(text)
+    warm = (time.perf_counter() - start) / (repeat * len(texts))
+
+    return cold, warm
+
+
+if __name__ == "__main__":
+    sample_texts = [
+        "I love this!",
+        "The service was slow and the food was cold.",
+        "It arrived on Tuesday.",
+        "Not bad at all, but the battery life could be better.",
+        "Absolutely terrible experience, never again!!!"
+    ]
+    cold, warm = measure_latency(sample_texts, repeat=20)
+    print(f"New analyzer per call: {cold * 1000:.3f} ms/call")
+    print(f"Shared engine:         {warm * 1000:.3f} ms/call")
+    print(f"Speedup:               {cold / warm:.0f}x")
@@ -0,0 +1,128 @@
+"""
+Import-time budget check for the entry points.
+Each module is imported in a fresh interpreter with -X importtime and the
+cumulative time of its own import line is compared against a budget. The
+import tree is also searched for heavy packages that must stay deferred
+until first use (matplotlib, NLTK, NumPy, vaderSentiment), and the chain
+of modules that pulled one in is reported, since that is what has to be
+fixed. Run it after changing imports; it exits with 1 on any regression.
+
+Usage:
+    python import_budget.py
+    python import_budget.py --repeat 7 --json importtime.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Median milliseconds each module may take to import, with headroom for slower machines
+BUDGETS = {
+    'analysis': 250,
+    'main_nltk': 100,
+}
+
+# Packages that must not be imported at module import time
+DEFERRED = {
+    'analysis': ['matplotlib', 'nltk', 'numpy', 'vaderSentiment', 'sqlite3'],
+    'main_nltk': ['matplotlib', 'nltk', 'numpy', 'vaderSentiment'],
+}
+
+
+def parse_importtime(stderr):
+    """(depth, module, self_us, cumulative_us) for every line of -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # Header line
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, name.strip(), int(fields[0]), int(fields[1])))
+    return entries
+
+
+def import_chain(entries, index):
+    """Module names from the top-level import down to entries[index]"""
+    # Children are printed before their parent, one level deeper
+    chain = [entries[index][1]]
+    depth = entries[index][0]
+    for entry_depth, name, _, _ in entries[index + 1:]:
+        if entry_depth < depth:
+            chain.append(name)
+            depth = entry_depth
+    return list(reversed(chain))
+
+
+def measure_import(module, cwd=None):
+    """Import module in a fresh interpreter; return its -X importtime entries"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def check_module(module, budget_ms, deferred, repeat=5, cwd=None):
+    """Return a report dict with the median import time and any deferred packages imported"""
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    # The first run compiles bytecode, so it is not timed
+    measure_import(module, cwd)
+
+    times = []
+    for _ in range(repeat):
+        entries = measure_import(module, cwd)
+        times.append(next(cumulative for depth, name, _, cumulative in entries
+                          if depth == 0 and name == module) / 1000)
+
+    violations = {}
+    for index, (_, name, _, _) in enumerate(entries):
+        package = name.split('.')[0]
+        if package in deferred and package not in violations:
+            violations[package] = ' -> '.join(import_chain(entries, index))
+
+    median = statistics.median(times)
+    return {
+        'module': module,
+        'median_ms': median,
+        'min_ms': min(times),
+        'budget_ms': budget_ms,
+        'over_budget': median > budget_ms,
+        'deferred_imported': violations,
+    }
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Check entry point import times against their budgets")
+    parser.add_argument('modules', nargs='*', default=list(BUDGETS), help="modules to check")
+    parser.add_argument('--repeat', type=int, default=5, help="timed imports per module")
+    parser.add_argument('--json', help="also write the reports to this file")
+    args = parser.parse_args(argv)
+
+    reports = [check_module(module, BUDGETS.get(module, float('inf')), DEFERRED.get(module, []), args.repeat)
+               for module in args.modules]
+
+    failed = False
+    for report in reports:
+        status = "OVER BUDGET" if report['over_budget'] else "ok"
+        print(f"{report['module']:<12} median {report['median_ms']:7.1f} ms  min {report['min_ms']:7.1f} ms  "
+              f"budget {report['budget_ms']:g} ms  {status}")
+        for package, chain in report['deferred_imported'].items():
+            print(f"  {package} is imported eagerly: {chain}")
+        failed = failed or report['over_budget'] or bool(report['deferred_imported'])
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(reports, file, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Incremental sentiment scoring for text that is being edited.
+Each update finds the edited region by comparing the new buffer with the
+previous one, re-splits only the sentences around it and rescores only
+those whose content hash changed. The document scores are running
+word-weighted totals of the per-sentence scores, re-added exactly every
+RESUM_EVERY updates so rounding cannot build up over a long session.
+Sentence offsets after an edit are not rewritten on every keystroke: one
+pending shift applies to every sentence from an index on, and is only
+folded into the stored offsets between the previous edit and the next, so
+typing in one place costs the same in a short and a long document.
+Updates run on the GUI's live worker thread while the text box can be
+cleared from the main thread, so update() and reset() hold a lock.
+"""
+
+import math
+import threading
+from bisect import bisect_left, bisect_right
+
+from cache import text_key
+from engine import get_engine
+from scoring import label_scores
+from segmentation import sentence_spans
+
+SCORE_KEYS = ('neg', 'neu', 'pos', 'compound')
+
+# Updates between exact recomputations of the running totals
+RESUM_EVERY = 1000
+
+
+def common_prefix_length(a, b):
+    """Length of the common prefix of two strings"""
+    # Binary search on slice equality; each comparison is a C-level memcmp
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[low:mid] == b[low:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def common_suffix_length(a, b, limit):
+    """Length of the common suffix of two strings, at most limit"""
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[len(a) - mid:len(a) - low] == b[len(b) - mid:len(b) - low]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+class IncrementalScorer:
+    """Rescores only the sentences that changed since the last update"""
+    def __init__(self, engine=None):
+        self.engine = engine or get_engine()
+        self.rescored = 0
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget the buffer and every scored sentence"""
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self.text = ''
+        self.starts = []
+        self.ends = []
+        self.entries = []
+        self.totals = dict.fromkeys(SCORE_KEYS, 0.0)
+        self.weight = 0
+        self.updates = 0
+        # Sentences from index shift_from on are really shift characters later than stored
+        self.shift_from = 0
+        self.shift = 0
+
+    def _add(self, entry, sign):
+        """Add or remove one sentence from the running totals"""
+        scores, words = entry
+        for key in SCORE_KEYS:
+            self.totals[key] += sign * scores[key] * words
+        self.weight += sign * words
+
+    def _resum(self):
+        """Recompute the running totals exactly from the per-sentence entries"""
+        for key in SCORE_KEYS:
+            self.totals[key] = math.fsum(scores[key] * words for scores, words in self.entries)
+        self.weight = sum(words for _, words in self.entries)
+
+    def _bisect(self, bisect, offsets, position):
+        """bisect over offsets as they really are, with the pending shift applied"""
+        index = bisect(offsets, position, 0, self.shift_from)
+        if index < self.shift_from:
+            return index
+        return bisect(offsets, position - self.shift, self.shift_from, len(offsets))
+
+    def _move_shift(self, index):
+        """Fold the pending shift into the stored offsets between shift_from and index"""
+        shift, old = self.shift, self.shift_from
+        if not shift or index == old:
+            self.shift_from = index
+            return
+        if index > old:
+            self.starts[old:index] = [start + shift for start in self.starts[old:index]]
+            self.ends[old:index] = [end + shift for end in self.ends[old:index]]
+        else:
+            self.starts[index:old] = [start - shift for start in self.starts[index:old]]
+            self.ends[index:old] = [end - shift for end in self.ends[index:old]]
+        self.shift_from = index
+
+    def update(self, text):
+        """Score the current buffer, reusing the results of unchanged sentences"""
+        with self._lock:
+            return self._update(text)
+
+    def _update(self, text):
+        old = self.text
+        if text == old:
+            return self.scores()
+
+        # Locate the edit: everything before prefix and after suffix is unchanged
+        prefix = common_prefix_length(old, text)
+        suffix = common_suffix_length(old, text, min(len(old), len(text)) - prefix)
+        delta = len(text) - len(old)
+
+        # Old sentences touching the edit, plus one neighbour each side for merged boundaries
+        count = len(self.entries)
+        first = max(0, self._bisect(bisect_left, self.ends, prefix) - 1)
+        last = min(count, self._bisect(bisect_right, self.starts, len(old) - suffix) + 1)
+        # Offsets before last are now stored as they really are
+        self._move_shift(last)
+        region_start = self.starts[first] if first < count else (self.ends[-1] if count else 0)
+        region_end = self.ends[last - 1] if last < count else len(old)
+        region_start = min(region_start, prefix)
+
+        # Re-split the region in the new buffer
+        removed = {}
+        for index in range(first, last):
+            entry = self.entries[index]
+            removed[text_key(old[self.starts[index]:self.ends[index]])] = entry
+            self._add(entry, -1)
+
+        new_starts = []
+        new_ends = []
+        new_entries = []
+        for start, end in sentence_spans(text, region_start, region_end + delta):
+            sentence = text[start:end]
+            entry = removed.get(text_key(sentence))
+            if entry is None:
+                entry = (self.engine.polarity_scores(sentence), len(sentence.split()))
+                self.rescored += 1
+            self._add(entry, 1)
+            new_starts.append(start)
+            new_ends.append(end)
+            new_entries.append(entry)
+
+        # Splice the region in; the sentences after it move by delta on top of the pending shift
+        self.starts[first:last] = new_starts
+        self.ends[first:last] = new_ends
+        self.entries[first:last] = new_entries
+        self.shift_from = first + len(new_entries)
+        self.shift += delta
+
+        self.updates += 1
+        if self.updates % RESUM_EVERY == 0:
+            self._resum()
+        self.text = text
+        return self.scores()
+
+    def scores(self):
+        """Word-weighted neg/neu/pos/compound of the buffer, with its overall label"""
+        if self.weight <= 0:
+            return label_scores(dict.fromkeys(SCORE_KEYS, 0.0))
+        return label_scores({key: self.totals[key] / self.weight for key in SCORE_KEYS})
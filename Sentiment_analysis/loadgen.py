@@ -0,0 +1,158 @@
+"""
+Load generator for the sentiment HTTP service.
+Opens keep-alive connections to a running server.py, sends /score (or
+/batch) requests as fast as each connection allows, and reports p50/p99
+latency and requests/sec.
+
+Usage:
+    python loadgen.py --spawn --concurrency 64 --duration 10
+    python loadgen.py --port 8765 --endpoint batch --batch-size 50
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+from server import DEFAULT_HOST, DEFAULT_PORT
+
+SAMPLE_TEXTS = [
+    "I love this product, it works perfectly!",
+    "Terrible support, I waited three hours for nothing.",
+    "The package arrived on Tuesday.",
+    "Not bad at all, but the battery could be better.",
+    "Absolutely fantastic experience, highly recommended!!!",
+    "Meh. It's okay I guess.",
+    "Worst purchase I have ever made.",
+    "Thanks for the quick reply :)",
+]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+async def send(reader, writer, host, path, payload):
+    """Send one request on an open connection and return (status, body)"""
+    body = json.dumps(payload).encode('utf-8')
+    writer.write((f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def connection_loop(host, port, deadline, endpoint, batch_size, rng, latencies, statuses):
+    """Keep one connection busy until the deadline"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            if endpoint == 'batch':
+                path, payload = '/batch', {'texts': rng.choices(SAMPLE_TEXTS, k=batch_size)}
+            else:
+                path, payload = '/score', {'text': rng.choice(SAMPLE_TEXTS)}
+
+            start = time.perf_counter()
+            status, _ = await send(reader, writer, host, path, payload)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, concurrency, duration, endpoint='score', batch_size=20, seed=1):
+    """Drive the server and return a summary dict"""
+    latencies = []
+    statuses = {}
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        connection_loop(host, port, deadline, endpoint, batch_size, random.Random(seed + i),
+                        latencies, statuses)
+        for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    requests = len(latencies)
+    texts_per_request = batch_size if endpoint == 'batch' else 1
+    return {
+        'requests': requests,
+        'seconds': elapsed,
+        'requests_per_sec': requests / elapsed,
+        'texts_per_sec': requests * texts_per_request / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'statuses': statuses
+    }
+
+
+async def wait_for_server(host, port, timeout=30.0):
+    """Poll until the server accepts connections"""
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Load test the sentiment HTTP service")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--concurrency', type=int, default=32, help="open connections")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds to run")
+    parser.add_argument('--endpoint', choices=['score', 'batch'], default='score')
+    parser.add_argument('--batch-size', type=int, default=20, help="texts per /batch request")
+    parser.add_argument('--spawn', action='store_true', help="start server.py on the given port for the run")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes for a spawned server")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.spawn:
+        command = [sys.executable, 'server.py', '--host', args.host, '--port', str(args.port)]
+        if args.workers:
+            command += ['--workers', str(args.workers)]
+        server = subprocess.Popen(command)
+
+    try:
+        asyncio.run(wait_for_server(args.host, args.port))
+        summary = asyncio.run(run_load(args.host, args.port, args.concurrency, args.duration,
+                                       args.endpoint, args.batch_size))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(f"Requests:     {summary['requests']} in {summary['seconds']:.1f}s")
+    print(f"Throughput:   {summary['requests_per_sec']:.0f} req/sec ({summary['texts_per_sec']:.0f} texts/sec)")
+    print(f"Latency p50:  {summary['p50_ms']:.2f} ms")
+    print(f"Latency p99:  {summary['p99_ms']:.2f} ms")
+    print(f"Status codes: {summary['statuses']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
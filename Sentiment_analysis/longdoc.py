@@ -0,0 +1,116 @@
+"""
+Long-document sentiment scoring.
+Scoring a whole report in one polarity_scores call is slow (VADER's cost
+grows faster than the text) and the result is flattened by normalization.
+Instead the document is segmented into sentences or paragraphs, segments
+are scored in parallel worker processes, and the document scores are the
+length-weighted aggregate of the segment scores.
+
+Usage:
+    python longdoc.py report.txt --by paragraph
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from engine import get_engine
+from scoring import aggregate_scores, score_text
+from segmentation import segment_document
+
+# Segments sent to a worker per task
+SEGMENT_BATCH = 64
+
+
+def _init_worker():
+    """Load the lexicons once per worker process"""
+    get_engine().load()
+
+
+def _score_segment_batch(batch):
+    """Score (index, segment) pairs inside a worker"""
+    return [(index, score_text(segment), len(segment.split())) for index, segment in batch]
+
+
+class LongDocumentScorer:
+    """Scores document segments in a process pool and aggregates them"""
+    def __init__(self, workers=None, batch_size=SEGMENT_BATCH):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.executor = None
+
+    def _pool(self):
+        """Start the worker pool on first use"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+        return self.executor
+
+    def iter_scores(self, segments):
+        """Yield (index, scores, words) for each segment as soon as its batch completes"""
+        indexed = list(enumerate(segments))
+        batches = [indexed[start:start + self.batch_size]
+                   for start in range(0, len(indexed), self.batch_size)]
+
+        if len(batches) <= 1:
+            # Not worth a round trip to the pool
+            for batch in batches:
+                yield from _score_segment_batch(batch)
+            return
+
+        pool = self._pool()
+        futures = [pool.submit(_score_segment_batch, batch) for batch in batches]
+        try:
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            # Drop batches nobody is waiting for any more
+            for future in futures:
+                future.cancel()
+
+    def score(self, text, mode='sentence'):
+        """Return (segments, per-segment scores, length-weighted document scores)"""
+        segments = segment_document(text, mode)
+        results = [None] * len(segments)
+        parts = []
+        for index, scores, words in self.iter_scores(segments):
+            results[index] = scores
+            parts.append((scores, words))
+        return segments, results, aggregate_scores(parts)
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Segment-level sentiment for long documents")
+    parser.add_argument('path', help="text file to analyse")
+    parser.add_argument('--by', choices=['sentence', 'paragraph'], default='sentence',
+                        help="segment size")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    with open(args.path, encoding='utf-8') as file:
+        text = file.read()
+
+    scorer = LongDocumentScorer(args.workers)
+    try:
+        segments, results, overall = scorer.score(text, args.by)
+    finally:
+        scorer.shutdown()
+
+    for index, (segment, scores) in enumerate(zip(segments, results)):
+        preview = segment if len(segment) <= 60 else segment[:57] + '...'
+        print(f"{index:>5}  {scores['compound']:+.4f}  {scores['overall']:<8}  {preview}")
+    print(f"\n{len(segments)} {args.by}s, length-weighted: neg={overall['neg']:.3f} "
+          f"neu={overall['neu']:.3f} pos={overall['pos']:.3f} "
+          f"compound={overall['compound']:+.4f} ({overall['overall']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,103 @@
-import string
-from collections import Counter
-
-import matplotlib.pyplot as plt
-from nltk.corpus import stopwords
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from nltk.stem import WordNetLemmatizer
-from nltk.tokenize import word_tokenize
-
-text = open('read.txt', encoding='utf-8').read()
-lower_case = text.lower()
-cleaned_text = lower_case.translate(str.maketrans('', '', string.punctuation))
-
-# Using word_tokenize because it's faster than split()
-tokenized_words = word_tokenize(cleaned_text, "english")
-
-# Removing Stop Words
-final_words = []
-for word in tokenized_words:
-    if word not in stopwords.words('english'):
-        final_words.append(word)
-
-# Lemmatization - From plural to single + Base form of a word (example better-> good)
-lemma_words = []
-for word in final_words:
-    word = WordNetLemmatizer().lemmatize(word)
-    lemma_words.append(word)
-
-emotion_list = []
-with open('emotions.txt', 'r') as file:
-    for line in file:
-        clear_line = line.replace("\n", '').replace(",", '').replace("'", '').strip()
-        word, emotion = clear_line.split(':')
-
-        if word in lemma_words:
-            emotion_list.append(emotion)
-
-print(emotion_list)
-w = Counter(emotion_list)
-print(w)
-
-
-def sentiment_analyse(sentiment_text):
-    score = SentimentIntensityAnalyzer().polarity_scores(sentiment_text)
+import argparse
+
+from emotion_lexicon import EmotionLexicon
+from engine import get_engine
+from preprocessing import TextPreprocessor, clean_text
+from tokenization import DEFAULT_TOKENIZER, TOKENIZERS, get_tokenizer
+
+# Characters read from the input file at a time
+CHUNK_SIZE = 1024 * 1024
+
+# Words scored by VADER at a time
+SENTIMENT_WINDOW = 200
+
+
+def read_chunks(path, chunk_size=CHUNK_SIZE):
+    """Yield the file in chunks that are cut on whitespace, never inside a token"""
+    carry = ''
+    with open(path, encoding='utf-8') as file:
+        while True:
+            block = file.read(chunk_size)
+            if not block:
+                break
+            buffer = carry + block
+
+            # Hold back the trailing partial token until the next block arrives
+            cut = max(buffer.rfind(' '), buffer.rfind('\n'), buffer.rfind('\t'))
+            if cut < 0:
+                carry = buffer
+                continue
+            carry = buffer[cut + 1:]
+            yield buffer[:cut + 1]
+    if carry:
+        yield carry
+
+
+def clean_chunks(chunks):
+    """Lowercase each chunk and strip punctuation"""
+    for chunk in chunks:
+        yield clean_text(chunk)
+
+
+def tokenize_chunks(chunks, tokenize=None):
+    """Yield the word tokens of each chunk"""
+    tokenize = tokenize or get_tokenizer()
+    for chunk in chunks:
+        yield from tokenize(chunk)
+
+
+class SentimentAccumulator:
+    """Running VADER totals over a stream of text chunks"""
+    def __init__(self):
+        self.neg = 0.0
+        self.pos = 0.0
+        self.neu = 0.0
+        self.weight = 0
+        # Words of the last, not yet full window; windows run on across chunk boundaries
+        self.pending = []
+
+    def add(self, chunk):
+        """Score the full windows of words seen so far, keeping the rest for the next chunk"""
+        # VADER's cost grows quadratically with text length, so score fixed-size windows
+        self.pending.extend(chunk.split())
+        full = len(self.pending) - len(self.pending) % SENTIMENT_WINDOW
+        for start in range(0, full, SENTIMENT_WINDOW):
+            self._score(self.pending[start:start + SENTIMENT_WINDOW])
+        del self.pending[:full]
+
+    def flush(self):
+        """Score the last, partial window once the stream has ended"""
+        if self.pending:
+            self._score(self.pending)
+            self.pending = []
+
+    def _score(self, window):
+        """Add one window's scores, weighted by its length in words"""
+        score = get_engine().polarity_scores(' '.join(window))
+        self.neg += score['neg'] * len(window)
+        self.pos += score['pos'] * len(window)
+        self.neu += score['neu'] * len(window)
+        self.weight += len(window)
+
+    def scores(self):
+        """Word-weighted average neg/neu/pos over the whole stream; call it after the last chunk"""
+        self.flush()
+        if not self.weight:
+            return {'neg': 0.0, 'neu': 0.0, 'pos': 0.0}
+        return {'neg': self.neg / self.weight,
+                'neu': self.neu / self.weight,
+                'pos': self.pos / self.weight}
+
+
+def accumulate_sentiment(chunks, accumulator):
+    """Pass chunks through while feeding them to the sentiment accumulator"""
+    for chunk in chunks:
+        accumulator.add(chunk)
+        yield chunk
+    accumulator.flush()
+
+
+def sentiment_analyse(score):
     if score['neg'] > score['pos']:
         print("Negative Sentiment")
     elif score['neg'] < score['pos']:
@@ -50,10 +106,42 @@ def sentiment_analyse(sentiment_text):
         print("Neutral Sentiment")
 
 
-sentiment_analyse(cleaned_text)
+def analyse_file(path, emotions_path='emotions.txt', chunk_size=CHUNK_SIZE, preprocessor=None,
+                 tokenizer=DEFAULT_TOKENIZER):
+    """Stream a text file through the pipeline and return (emotion counts, sentiment scores)"""
+    preprocessor = preprocessor or TextPreprocessor()
+    lexicon = EmotionLexicon.load(emotions_path, preprocessor)
+    accumulator = SentimentAccumulator()
+
+    chunks = clean_chunks(read_chunks(path, chunk_size))
+    chunks = accumulate_sentiment(chunks, accumulator)
+    # Phrases are matched first; other words lose stop words and are lemmatized by the lexicon
+    emotion_counts = lexicon.count_emotions(tokenize_chunks(chunks, get_tokenizer(tokenizer)))
+
+    return emotion_counts, accumulator.scores()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emotion and sentiment analysis of a text file")
+    parser.add_argument('path', nargs='?', default='read.txt', help="text file to analyse")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="characters read at a time")
+    parser.add_argument('--tokenizer', choices=list(TOKENIZERS), default=DEFAULT_TOKENIZER,
+                        help="word tokenizer; regex is faster and equivalent on cleaned text")
+    args = parser.parse_args()
+
+    w, score = analyse_file(args.path, chunk_size=args.chunk_size, tokenizer=args.tokenizer)
+    print(w)
+
+    sentiment_analyse(score)
+
+    # Only needed for the final plot, and slow to import
+    import matplotlib.pyplot as plt
+    fig, ax1 = plt.subplots()
+    ax1.bar(w.keys(), w.values())
+    fig.autofmt_xdate()
+    plt.savefig('graph.png')
+    plt.show()
+
 
-fig, ax1 = plt.subplots()
-ax1.bar(w.keys(), w.values())
-fig.autofmt_xdate()
-plt.savefig('graph.png')
-plt.show()
+if __name__ == "__main__":
+    main()
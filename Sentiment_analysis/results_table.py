@@ -0,0 +1,176 @@
+"""
+Scored records for the GUI's file mode and a table widget that shows them.
+ResultRows keeps the results column by column (scores in float arrays) so
+a million records stay compact. VirtualTable draws only the rows that fit
+in its window with a fixed pool of canvas text items and maps the
+scrollbar onto the row count, so the number of widgets does not grow with
+the number of rows.
+"""
+
+import tkinter as tk
+import tkinter.font as tkfont
+from array import array
+
+from scoring import label_scores
+
+# Characters of each record's text kept for the table
+PREVIEW_CHARS = 80
+
+# Columns of the file results table: title, width in characters, anchor
+COLUMNS = [
+    ("#", 8, "e"),
+    ("ID", 12, "w"),
+    ("Compound", 9, "e"),
+    ("Overall", 9, "w"),
+    ("Text", 60, "w"),
+]
+
+
+def preview(text):
+    """Single-line start of a text for the table"""
+    text = ' '.join(text[:PREVIEW_CHARS * 2].split())
+    return text if len(text) <= PREVIEW_CHARS else text[:PREVIEW_CHARS - 3] + '...'
+
+
+class ResultRows:
+    """Scored records stored column by column, with running score totals"""
+    def __init__(self):
+        self.ids = []
+        self.previews = []
+        self.labels = []
+        self.neg = array('d')
+        self.neu = array('d')
+        self.pos = array('d')
+        self.compound = array('d')
+        self.sums = {'neg': 0.0, 'neu': 0.0, 'pos': 0.0, 'compound': 0.0}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def extend(self, rows):
+        """Add (record_id, preview, scores) rows"""
+        sums = self.sums
+        for record_id, text, scores in rows:
+            self.ids.append(record_id)
+            self.previews.append(text)
+            self.labels.append(scores['overall'])
+            for key in sums:
+                getattr(self, key).append(scores[key])
+                sums[key] += scores[key]
+
+    def row(self, index):
+        """Display strings of one row, in COLUMNS order"""
+        return (str(index + 1), str(self.ids[index]), f"{self.compound[index]:+.3f}",
+                self.labels[index], self.previews[index])
+
+    def scores(self, index):
+        """Scores of one row"""
+        return {'neg': self.neg[index], 'neu': self.neu[index], 'pos': self.pos[index],
+                'compound': self.compound[index], 'overall': self.labels[index]}
+
+    def mean_scores(self):
+        """Mean neg/neu/pos/compound of every row so far, with its label"""
+        count = len(self.ids) or 1
+        return label_scores({key: total / count for key, total in self.sums.items()})
+
+    def export(self, path):
+        """Write every row's scores to a .jsonl or .csv file, as bulk.py does"""
+        from bulk import ResultWriter
+        writer = ResultWriter(path)
+        try:
+            for index, record_id in enumerate(self.ids):
+                writer.write(record_id, self.scores(index))
+        finally:
+            writer.close()
+
+
+class VirtualTable(tk.Frame):
+    """Table that only creates canvas items for the rows in view"""
+    def __init__(self, master, columns=COLUMNS, font=("Courier", 10), bg="white", fg="black",
+                 header_bg="#dddddd", **kwargs):
+        super().__init__(master, bg=bg, **kwargs)
+        self.columns = columns
+        self.rows = None
+        self.first = 0
+        self.visible = 0
+        self.fg = fg
+
+        measure = tkfont.Font(font=font)
+        self.row_height = measure.metrics("linespace") + 4
+        char_width = measure.measure("0")
+        self.column_x = []
+        x = 4
+        for _, width, anchor in columns:
+            width *= char_width
+            self.column_x.append((x + width if anchor == "e" else x, anchor))
+            x += width + 2 * char_width
+
+        self.header = tk.Canvas(self, height=self.row_height, bg=header_bg, highlightthickness=0)
+        self.header.pack(fill="x")
+        for (title, _, _), (x, anchor) in zip(columns, self.column_x):
+            self.header.create_text(x, self.row_height // 2, text=title, anchor=anchor, font=font, fill=fg)
+
+        self.scrollbar = tk.Scrollbar(self, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill="y")
+        self.canvas = tk.Canvas(self, bg=bg, highlightthickness=0)
+        self.canvas.pack(side=tk.LEFT, fill="both", expand=True)
+        self.font = font
+        # One list of canvas text items per visible row
+        self.items = []
+
+        self.canvas.bind("<Configure>", self._on_resize)
+        for widget in (self.canvas, self.header):
+            widget.bind("<MouseWheel>", self._on_wheel)
+            widget.bind("<Button-4>", lambda event: self.yview("scroll", -3, "units"))
+            widget.bind("<Button-5>", lambda event: self.yview("scroll", 3, "units"))
+
+    def set_rows(self, rows):
+        """Show a ResultRows (or anything with len() and row(index)), scrolled to the top"""
+        self.rows = rows
+        self.first = 0
+        self.refresh()
+
+    def _on_resize(self, event):
+        """Grow or shrink the pool of row items to fill the new height"""
+        visible = max(1, event.height // self.row_height)
+        while len(self.items) < visible:
+            y = len(self.items) * self.row_height + self.row_height // 2
+            self.items.append([self.canvas.create_text(x, y, anchor=anchor, font=self.font, fill=self.fg)
+                               for x, anchor in self.column_x])
+        while len(self.items) > visible:
+            for item in self.items.pop():
+                self.canvas.delete(item)
+        self.visible = visible
+        self.refresh()
+
+    def _on_wheel(self, event):
+        """Scroll three rows per wheel notch"""
+        self.yview("scroll", -3 if event.delta > 0 else 3, "units")
+
+    def _scroll_to(self, first):
+        """Make row first the top row, keeping the last page full"""
+        total = len(self.rows) if self.rows is not None else 0
+        self.first = max(0, min(first, total - self.visible))
+        self.refresh()
+
+    def yview(self, *args):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", count, "units" | "pages")"""
+        total = len(self.rows) if self.rows is not None else 0
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * total))
+        elif args[0] == "scroll":
+            step = self.visible if args[2] == "pages" else 1
+            self._scroll_to(self.first + int(args[1]) * step)
+
+    def refresh(self):
+        """Redraw the visible rows and the scrollbar; call after rows are added"""
+        total = len(self.rows) if self.rows is not None else 0
+        for offset, items in enumerate(self.items):
+            index = self.first + offset
+            values = self.rows.row(index) if index < total else ("",) * len(items)
+            for item, value in zip(items, values):
+                self.canvas.itemconfigure(item, text=value)
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + self.visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
@@ -0,0 +1,55 @@
+"""
+Sentiment scoring helpers shared by the GUI and the headless tools.
+Wraps VADER polarity scores and the Positive/Negative/Neutral decision.
+"""
+
+from engine import get_engine
+
+# Compound score thresholds used to label a text
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+# Column order used by every tool that writes scores
+SCORE_FIELDS = ['neg', 'neu', 'pos', 'compound', 'overall']
+
+
+def classify_sentiment(compound):
+    """Map a compound score to Positive, Negative or Neutral"""
+    if compound >= POSITIVE_THRESHOLD:
+        return "Positive"
+    elif compound <= NEGATIVE_THRESHOLD:
+        return "Negative"
+    return "Neutral"
+
+
+def score_text(text, analyzer=None):
+    """Score a text with VADER and add the overall sentiment label"""
+    if analyzer is None:
+        analyzer = get_engine()
+    return label_scores(analyzer.polarity_scores(text))
+
+
+def label_scores(sentiment_dict):
+    """Add the overall sentiment label to a VADER polarity_scores dict"""
+    return {
+        'neg': sentiment_dict['neg'],
+        'neu': sentiment_dict['neu'],
+        'pos': sentiment_dict['pos'],
+        'compound': sentiment_dict['compound'],
+        'overall': classify_sentiment(sentiment_dict['compound'])
+    }
+
+
+def aggregate_scores(parts):
+    """Combine (scores, weight) pairs into weighted neg/neu/pos/compound and a label"""
+    totals = {'neg': 0.0, 'neu': 0.0, 'pos': 0.0, 'compound': 0.0}
+    total_weight = 0
+    for scores, weight in parts:
+        for key in totals:
+            totals[key] += scores[key] * weight
+        total_weight += weight
+
+    if total_weight:
+        for key in totals:
+            totals[key] /= total_weight
+    return label_scores(totals)
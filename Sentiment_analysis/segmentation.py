@@ -0,0 +1,53 @@
+"""
+Text segmentation used to score long or changing documents piece by piece.
+"""
+
+import re
+
+# A sentence ends at . ! or ? followed by whitespace, or at a line break
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+
+# Paragraphs are separated by blank lines
+PARAGRAPH_BOUNDARY = re.compile(r'\n\s*\n')
+
+
+def _stripped_span(text, start, end):
+    """Offsets of text[start:end] without surrounding whitespace, or None if blank"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
+
+
+def sentence_spans(text, start=0, end=None):
+    """Return (start, end) offsets of the sentences in text[start:end]"""
+    end = len(text) if end is None else end
+    spans = []
+    position = start
+    for match in SENTENCE_BOUNDARY.finditer(text, start, end):
+        span = _stripped_span(text, position, match.start())
+        if span:
+            spans.append(span)
+        position = match.end()
+    span = _stripped_span(text, position, end)
+    if span:
+        spans.append(span)
+    return spans
+
+
+def split_sentences(text):
+    """Split text into non-empty, stripped sentences"""
+    return [text[start:end] for start, end in sentence_spans(text)]
+
+
+def split_paragraphs(text):
+    """Split text into non-empty, stripped paragraphs"""
+    return [paragraph.strip() for paragraph in PARAGRAPH_BOUNDARY.split(text) if paragraph.strip()]
+
+
+def segment_document(text, mode='sentence'):
+    """Split a document into sentences or paragraphs"""
+    if mode == 'paragraph':
+        return split_paragraphs(text)
+    return split_sentences(text)
@@ -0,0 +1,379 @@
+"""
+Local asyncio HTTP service around the sentiment scoring.
+Concurrent requests are coalesced into micro-batches that are flushed when
+they reach a size limit or a deadline, and each batch is scored in a pool
+of worker processes so the event loop never blocks on VADER.
+
+Endpoints:
+    POST /score   {"text": "..."}            -> scores for one text
+    POST /batch   {"texts": ["...", "..."]}  -> {"results": [...]}
+    GET  /stats                              -> batching and backpressure counters
+    GET  /health                             -> {"status": "ok"}
+
+Usage:
+    python server.py --port 8765 --workers 4
+    python loadgen.py --port 8765 --concurrency 64 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import get_engine
+from scoring import label_scores, score_text
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Micro-batching: flush at this many texts, or this long after the first one arrived
+MAX_BATCH_SIZE = 256
+MAX_BATCH_DELAY = 0.005
+
+# Backpressure: texts waiting or being scored before new work is refused with 503
+MAX_PENDING = 10000
+
+# Largest request body accepted, and most texts in one /batch call
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_BATCH_TEXTS = 5000
+
+# Batch scorer owned by each worker process when --vectorized is used
+_batch_scorer = None
+
+
+def _init_worker(vectorized=False):
+    """Load the lexicons once per worker process"""
+    global _batch_scorer
+    get_engine().load()
+    if vectorized:
+        from vectorized import VectorizedScorer
+        _batch_scorer = VectorizedScorer()
+
+
+def _score_texts(texts):
+    """Score a micro-batch inside a worker process"""
+    if _batch_scorer is not None:
+        return [label_scores(scores) for scores in _batch_scorer.polarity_scores_batch(texts)]
+    return [score_text(text) for text in texts]
+
+
+class Overloaded(Exception):
+    """Raised when accepting more work would exceed the pending limit"""
+
+
+class BadRequest(Exception):
+    """Raised when a request body is not the JSON object an endpoint expects"""
+
+
+def parse_object(body):
+    """The JSON object in a request body"""
+    try:
+        request = json.loads(body or b'{}')
+    except ValueError:
+        # JSONDecodeError, and bodies that are not UTF-8
+        raise BadRequest('body is not valid JSON')
+    if not isinstance(request, dict):
+        raise BadRequest('body must be a JSON object')
+    return request
+
+
+async def read_headers(reader):
+    """Read header lines up to the blank line; ValueError if one is longer than the stream limit"""
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            return headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+
+class MicroBatcher:
+    """Coalesces single texts into batches that are scored in an executor"""
+    def __init__(self, executor, max_batch_size=MAX_BATCH_SIZE, max_delay=MAX_BATCH_DELAY,
+                 max_pending=MAX_PENDING, max_in_flight=None):
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.queue = asyncio.Queue()
+        self.in_flight = asyncio.Semaphore(max_in_flight or os.cpu_count() or 1)
+        self.pending = 0
+        self.task = None
+
+        # Statistics
+        self.batches = 0
+        self.texts = 0
+        self.rejected = 0
+        self.flushed_full = 0
+        self.flushed_deadline = 0
+
+    def start(self):
+        """Start the background task that forms batches"""
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop forming batches"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    def reserve(self, count):
+        """Account for count new texts, refusing them if the service is saturated"""
+        if self.pending + count > self.max_pending:
+            self.rejected += count
+            raise Overloaded()
+        self.pending += count
+
+    async def submit_many(self, texts):
+        """Queue texts for scoring and wait for their results"""
+        self.reserve(len(texts))
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self.queue.put_nowait((text, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def submit(self, text):
+        """Queue one text and wait for its scores"""
+        results = await self.submit_many([text])
+        return results[0]
+
+    async def _run(self):
+        """Collect queued texts into batches and dispatch them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+
+            while len(batch) < self.max_batch_size:
+                # Take whatever is already queued without waiting
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            if len(batch) >= self.max_batch_size:
+                self.flushed_full += 1
+            else:
+                self.flushed_deadline += 1
+
+            # Limit batches in flight to the pool size so queued work keeps coalescing
+            await self.in_flight.acquire()
+            loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        """Score one batch in the executor and resolve its futures"""
+        loop = asyncio.get_running_loop()
+        texts = [text for text, _ in batch]
+        try:
+            results = await loop.run_in_executor(self.executor, _score_texts, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.in_flight.release()
+            self.pending -= len(batch)
+            self.batches += 1
+            self.texts += len(batch)
+
+    def stats(self):
+        """Batching and backpressure counters"""
+        return {
+            'batches': self.batches,
+            'texts': self.texts,
+            'mean_batch_size': self.texts / self.batches if self.batches else 0.0,
+            'flushed_full': self.flushed_full,
+            'flushed_deadline': self.flushed_deadline,
+            'pending': self.pending,
+            'rejected': self.rejected
+        }
+
+
+class SentimentServer:
+    """Minimal HTTP/1.1 server with keep-alive in front of a MicroBatcher"""
+    def __init__(self, batcher, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.batcher = batcher
+        self.host = host
+        self.port = port
+        self.started = time.time()
+        self.server = None
+
+    async def start(self):
+        """Start listening"""
+        self.batcher.start()
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        # Port 0 means the OS picked one
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop listening and stop the batcher"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until the client closes it"""
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except ValueError:
+                    # LimitOverrunError: the line is longer than the StreamReader limit
+                    await self.respond(writer, 431, {'error': 'request line too long'}, keep_alive=False)
+                    break
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.respond(writer, 400, {'error': 'bad request line'}, keep_alive=False)
+                    break
+
+                try:
+                    headers = await read_headers(reader)
+                except ValueError:
+                    await self.respond(writer, 431, {'error': 'header line too long'}, keep_alive=False)
+                    break
+
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.respond(writer, 400, {'error': 'invalid Content-Length'}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, {'error': 'request body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                status, payload, extra = await self.route(method, path, body)
+                await self.respond(writer, status, payload, keep_alive, extra)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        """Dispatch a request and return (status, payload, extra headers)"""
+        path = path.split('?', 1)[0]
+        try:
+            if method == 'POST' and path == '/score':
+                request = parse_object(body)
+                text = request.get('text')
+                if not isinstance(text, str):
+                    return 400, {'error': '"text" must be a string'}, None
+                return 200, await self.batcher.submit(text), None
+
+            if method == 'POST' and path == '/batch':
+                request = parse_object(body)
+                texts = request.get('texts')
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    return 400, {'error': '"texts" must be a list of strings'}, None
+                if len(texts) > MAX_BATCH_TEXTS:
+                    return 413, {'error': f'at most {MAX_BATCH_TEXTS} texts per batch'}, None
+                return 200, {'results': await self.batcher.submit_many(texts)}, None
+
+            if method == 'GET' and path == '/stats':
+                return 200, {'uptime': time.time() - self.started, 'batching': self.batcher.stats()}, None
+
+            if method == 'GET' and path == '/health':
+                return 200, {'status': 'ok'}, None
+
+            return 404, {'error': 'not found'}, None
+
+        except Overloaded:
+            return 503, {'error': 'server busy, retry later'}, {'Retry-After': '1'}
+        except BadRequest as e:
+            return 400, {'error': str(e)}, None
+        except Exception as e:
+            # Scoring failed in the executor, e.g. a BrokenProcessPool after a worker died
+            return 500, {'error': f'scoring failed: {type(e).__name__}'}, None
+
+    async def respond(self, writer, status, payload, keep_alive=True, extra=None):
+        """Write a JSON response"""
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                   413: 'Payload Too Large', 431: 'Request Header Fields Too Large',
+                   500: 'Internal Server Error', 503: 'Service Unavailable'}
+        body = json.dumps(payload).encode('utf-8')
+        head = [f"HTTP/1.1 {status} {reasons.get(status, 'Error')}",
+                "Content-Type: application/json",
+                f"Content-Length: {len(body)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        for name, value in (extra or {}).items():
+            head.append(f"{name}: {value}")
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(host, port, workers, vectorized=False, max_batch_size=MAX_BATCH_SIZE,
+                max_delay=MAX_BATCH_DELAY, max_pending=MAX_PENDING):
+    """Run the service until cancelled"""
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(vectorized,)) as executor:
+        batcher = MicroBatcher(executor, max_batch_size, max_delay, max_pending, workers)
+        server = SentimentServer(batcher, host, port)
+        await server.start()
+        print(f"Sentiment service listening on http://{server.host}:{server.port}", flush=True)
+
+        # Shut down cleanly on SIGTERM so the worker processes exit with the server
+        stopping = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+        except (NotImplementedError, AttributeError):
+            # Windows has no SIGTERM handler support in asyncio
+            pass
+        try:
+            await stopping.wait()
+        finally:
+            await server.stop()
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Local sentiment scoring HTTP service")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="scoring processes")
+    parser.add_argument('--batch-size', type=int, default=MAX_BATCH_SIZE, help="texts per micro-batch")
+    parser.add_argument('--batch-delay', type=float, default=MAX_BATCH_DELAY * 1000,
+                        help="milliseconds to wait for a micro-batch to fill")
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING,
+                        help="texts queued or in flight before requests get 503")
+    parser.add_argument('--vectorized', action='store_true', help="score batches with the NumPy scorer")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.vectorized,
+                          args.batch_size, args.batch_delay / 1000, args.max_pending))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Memory soak test for the sentiment chart.
+Renders the persistent SentimentChart through many analyses with the
+headless Agg canvas and checks that resident memory stays flat. For
+comparison it also runs the old approach, a new pyplot figure per
+analysis, which pyplot keeps alive forever.
+
+Usage:
+    python soak_chart.py --iterations 10000
+Exits with status 1 if the persistent chart grows by more than --max-growth MB.
+"""
+
+import argparse
+import random
+import resource
+import sys
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from chart import SentimentChart
+
+COLORS = ['#27ae60', '#f39c12', '#e74c3c']
+
+
+def rss_mb():
+    """Current resident set size in MB"""
+    try:
+        with open('/proc/self/statm') as file:
+            pages = int(file.read().split()[1])
+        return pages * resource.getpagesize() / (1024 * 1024)
+    except OSError:
+        # No /proc (macOS, Windows): fall back to the peak, which still shows growth
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def random_scores(rng):
+    """Random pos/neu/neg percentages that add up to 100"""
+    pos = rng.uniform(0, 100)
+    neg = rng.uniform(0, 100 - pos)
+    return pos, 100 - pos - neg, neg
+
+
+def soak_persistent(iterations, rng, report_every):
+    """Update one chart in place and render it every iteration"""
+    chart = SentimentChart(COLORS, '#2c3e50', '#ecf0f1')
+    canvas = FigureCanvasAgg(chart.figure)
+    canvas.draw()
+
+    # Let caches and the font system warm up before taking the baseline
+    for _ in range(100):
+        chart.update(*random_scores(rng))
+        canvas.draw()
+    baseline = rss_mb()
+
+    samples = []
+    for i in range(1, iterations + 1):
+        chart.update(*random_scores(rng))
+        canvas.draw()
+        if i % report_every == 0:
+            samples.append((i, rss_mb()))
+    return baseline, samples
+
+
+def soak_legacy(iterations, rng, report_every):
+    """The old create_chart: a new pyplot figure per analysis, never closed"""
+    # The warning about many open figures is exactly the leak being shown
+    plt.rcParams['figure.max_open_warning'] = 0
+    baseline = rss_mb()
+    samples = []
+    for i in range(1, iterations + 1):
+        fig, ax = plt.subplots(figsize=(4, 3), dpi=100)
+        ax.barh(['Positive', 'Neutral', 'Negative'], random_scores(rng), color=COLORS)
+        fig.canvas.draw()
+        if i % report_every == 0:
+            samples.append((i, rss_mb()))
+    plt.close('all')
+    return baseline, samples
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the sentiment chart does not leak memory")
+    parser.add_argument('--iterations', type=int, default=10000, help="analyses to simulate")
+    parser.add_argument('--legacy-iterations', type=int, default=500,
+                        help="analyses to simulate with the old figure-per-analysis code (0 to skip)")
+    parser.add_argument('--max-growth', type=float, default=5.0, help="allowed RSS growth in MB")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+
+    baseline, samples = soak_persistent(args.iterations, rng, max(1, args.iterations // 10))
+    print(f"Persistent chart: baseline {baseline:.1f} MB")
+    for i, rss in samples:
+        print(f"  after {i:>6} analyses: {rss:.1f} MB ({rss - baseline:+.1f})")
+    growth = samples[-1][1] - baseline if samples else 0.0
+
+    if args.legacy_iterations:
+        legacy_baseline, legacy_samples = soak_legacy(args.legacy_iterations, rng,
+                                                      max(1, args.legacy_iterations // 5))
+        print(f"Figure per analysis (old code): baseline {legacy_baseline:.1f} MB")
+        for i, rss in legacy_samples:
+            print(f"  after {i:>6} analyses: {rss:.1f} MB ({rss - legacy_baseline:+.1f})")
+
+    if growth > args.max_growth:
+        print(f"FAIL: persistent chart grew {growth:.1f} MB (limit {args.max_growth} MB)")
+        sys.exit(1)
+    print(f"OK: persistent chart grew {growth:.1f} MB over {args.iterations} analyses")
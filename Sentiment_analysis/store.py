@@ -0,0 +1,103 @@
+"""
+SQLite store for bulk sentiment results.
+Every scored record is saved under its record id together with a hash of
+its text and the scorer that produced it, so an interrupted bulk run can
+resume and a re-run only scores records that are new or changed. Writes are
+buffered and committed in batches; the database uses WAL mode so worker
+processes can look up stored results while the main process writes.
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+
+from cache import text_key
+from scoring import SCORE_FIELDS
+
+# Rows written per transaction
+COMMIT_SIZE = 2000
+
+# Bound on host parameters in one lookup query (SQLite allows 999 in old builds)
+LOOKUP_CHUNK = 400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    record_id TEXT NOT NULL,
+    scorer TEXT NOT NULL,
+    content_hash BLOB NOT NULL,
+    neg REAL NOT NULL,
+    neu REAL NOT NULL,
+    pos REAL NOT NULL,
+    compound REAL NOT NULL,
+    overall TEXT NOT NULL,
+    scored_at REAL NOT NULL,
+    PRIMARY KEY (record_id, scorer)
+)
+"""
+
+
+def content_hash(text):
+    """Hash of a record's text; whitespace-only edits do not change VADER scores"""
+    return text_key(text)
+
+
+class ResultStore:
+    """Scores keyed by record id, reusable while the text and scorer are unchanged"""
+    def __init__(self, path, commit_size=COMMIT_SIZE, read_only=False):
+        self.path = path
+        self.commit_size = commit_size
+        self.pending = []
+        if read_only:
+            # Workers only look results up; a read-only connection never takes the write lock
+            self.connection = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True, timeout=60)
+            return
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+
+    def lookup(self, keys, scorer):
+        """Return {(record_id, content_hash): scores} for the keys stored by scorer"""
+        found = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            # A record id may repeat in a batch, with the same text or a different one
+            chunk = set(keys[start:start + LOOKUP_CHUNK])
+            record_ids = list({record_id for record_id, _ in chunk})
+            placeholders = ','.join('?' * len(record_ids))
+            rows = self.connection.execute(
+                f"SELECT record_id, content_hash, neg, neu, pos, compound, overall FROM results "
+                f"WHERE scorer = ? AND record_id IN ({placeholders})",
+                [scorer] + record_ids)
+            for record_id, digest, *values in rows:
+                # A changed text has a different hash and must be scored again
+                if (record_id, digest) in chunk:
+                    found[record_id, digest] = dict(zip(SCORE_FIELDS, values))
+        return found
+
+    def add(self, record_id, digest, scorer, scores):
+        """Queue a result for writing, committing once a full batch is queued"""
+        self.pending.append((record_id, digest, scorer) +
+                            tuple(scores[field] for field in SCORE_FIELDS) + (time.time(),))
+        if len(self.pending) >= self.commit_size:
+            self.flush()
+
+    def flush(self):
+        """Write queued results in one transaction"""
+        if not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO results "
+                "(record_id, content_hash, scorer, neg, neu, pos, compound, overall, scored_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self.pending)
+        self.pending = []
+
+    def count(self):
+        """Number of stored results"""
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        """Commit anything queued and close the database"""
+        self.flush()
+        self.connection.close()
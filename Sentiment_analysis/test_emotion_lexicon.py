@@ -0,0 +1,63 @@
+"""
+Tests for emotion_lexicon.py phrase matching: multi-word entries match only
+as whole phrases, and never turn into matches on one of their words.
+
+Usage:
+    python -m pytest test_emotion_lexicon.py
+"""
+
+import os
+import tempfile
+import unittest
+
+from emotion_lexicon import EmotionLexicon, parse_emotions
+from preprocessing import clean_text
+
+
+def stopwords_available():
+    """True if the NLTK stop word list is installed"""
+    try:
+        from nltk.corpus import stopwords
+        stopwords.words('english')
+    except (ImportError, LookupError):
+        return False
+    return True
+
+
+class PhraseMatchingTest(unittest.TestCase):
+    def count(self, lexicon, text):
+        return lexicon.count_emotions(clean_text(text).split())
+
+    def check_phrases(self, lexicon):
+        for text in ("I left the room", "set the table", "the key turned", "the pain in my leg"):
+            with self.subTest(text=text):
+                self.assertEqual(self.count(lexicon, text), {})
+        self.assertEqual(self.count(lexicon, "She felt left out."), {'hated': 1})
+        self.assertEqual(self.count(lexicon, "Let down again, and let down twice"), {'hated': 2})
+        self.assertEqual(self.count(lexicon, "He was out of control"), {'powerless': 1})
+
+    def test_phrases_without_preprocessor(self):
+        self.check_phrases(EmotionLexicon.compile(parse_emotions('emotions.txt')))
+
+    @unittest.skipUnless(stopwords_available(), "NLTK stop words are not installed")
+    def test_phrases_keep_their_stop_words(self):
+        from preprocessing import TextPreprocessor
+        preprocessor = TextPreprocessor()
+        lexicon = EmotionLexicon.compile(parse_emotions('emotions.txt'), preprocessor)
+        # No multi-word entry may collapse into a single-word key
+        for word in ('left', 'let', 'set', 'cut', 'turned', 'worked', 'put', 'control', 'pain', 'ease'):
+            self.assertNotIn(word, lexicon.words)
+        self.check_phrases(lexicon)
+        # Words outside phrases still lose stop words and are lemmatized
+        self.assertEqual(self.count(lexicon, "the angry dogs"), {'angry': 1})
+
+    def test_cache_keeps_phrases(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = os.path.join(directory, 'emotions.cache')
+            EmotionLexicon.load('emotions.txt', cache_path=cache_path)
+            cached = EmotionLexicon.load('emotions.txt', cache_path=cache_path)
+        self.check_phrases(cached)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Tests for incremental.py: after any sequence of edits the scorer must agree
+with scoring the final text from scratch, and the cost of a keystroke must
+not grow with the length of the document.
+
+Usage:
+    python -m pytest test_incremental.py
+"""
+
+import random
+import time
+import unittest
+
+from incremental import RESUM_EVERY, IncrementalScorer
+from segmentation import sentence_spans
+
+SENTENCES = ["The food was great and the staff were lovely.", "I hated the wait, it was terrible.",
+             "We will come back next week!", "Nothing special about the decor?", "Not bad at all."]
+
+# Characters a random edit inserts, including sentence and line breaks
+INSERTIONS = ['x', ' ', '. ', '\n', 'good ', 'awful. ', '\n\n', 'Really? ']
+
+
+def document(sentences, seed=1):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(SENTENCES) for _ in range(sentences))
+
+
+def offsets(scorer):
+    """Sentence offsets of a scorer with its pending shift applied"""
+    return [(start + (scorer.shift if index >= scorer.shift_from else 0),
+             end + (scorer.shift if index >= scorer.shift_from else 0))
+            for index, (start, end) in enumerate(zip(scorer.starts, scorer.ends))]
+
+
+class IncrementalScorerTest(unittest.TestCase):
+    def assert_matches_fresh(self, scorer, text):
+        self.assertEqual(offsets(scorer), sentence_spans(text))
+        fresh = IncrementalScorer(scorer.engine).update(text)
+        actual = scorer.scores()
+        for key in ('neg', 'neu', 'pos', 'compound'):
+            self.assertAlmostEqual(actual[key], fresh[key], places=9)
+
+    def test_random_edits(self):
+        rng = random.Random(7)
+        scorer = IncrementalScorer()
+        text = document(40)
+        scorer.update(text)
+        for step in range(400):
+            position = rng.randrange(len(text) + 1)
+            if rng.random() < 0.6 or len(text) < 20:
+                text = text[:position] + rng.choice(INSERTIONS) + text[position:]
+            else:
+                text = text[:position] + text[position + rng.randint(1, 30):]
+            scorer.update(text)
+            if step % 25 == 0:
+                self.assert_matches_fresh(scorer, text)
+        self.assert_matches_fresh(scorer, text)
+
+    def test_totals_are_resummed(self):
+        scorer = IncrementalScorer()
+        text = document(20)
+        for _ in range(RESUM_EVERY):
+            text += 'x'
+            scorer.update(text)
+        fresh = IncrementalScorer(scorer.engine)
+        fresh.update(text)
+        fresh._resum()
+        self.assertEqual(scorer.totals, fresh.totals)
+        self.assertEqual(scorer.weight, fresh.weight)
+
+    def keystroke_seconds(self, sentences, keystrokes=100):
+        """Fastest update while typing near the top of a document"""
+        scorer = IncrementalScorer()
+        text = document(sentences)
+        scorer.update(text)
+        position = 200
+        fastest = float('inf')
+        for _ in range(keystrokes):
+            text = text[:position] + 'x' + text[position:]
+            position += 1
+            start = time.perf_counter()
+            scorer.update(text)
+            fastest = min(fastest, time.perf_counter() - start)
+        return fastest
+
+    def test_keystroke_latency_is_flat(self):
+        short = self.keystroke_seconds(100)
+        long = self.keystroke_seconds(10000)
+        # Only comparing the buffers grows with the document; rewriting every offset took 9x longer
+        self.assertLess(long, short * 4, f"{short * 1e6:.0f} us at 100 sentences, {long * 1e6:.0f} us at 10000")
+
+
+if __name__ == "__main__":
+    unittest.main()
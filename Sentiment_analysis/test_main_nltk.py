@@ -0,0 +1,56 @@
+"""
+Tests for main_nltk.py streaming: the sentiment result must not depend on
+how the file is cut into chunks.
+
+Usage:
+    python -m pytest test_main_nltk.py
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+from main_nltk import SENTIMENT_WINDOW, SentimentAccumulator, accumulate_sentiment, clean_chunks, read_chunks
+
+WORDS = ['good', 'great', 'love', 'bad', 'terrible', 'hate', 'not', 'very', 'but', 'the', 'food',
+         'was', 'service', 'and', 'we', 'it', 'staff', 'price', 'happy', 'sad', 'never', 'amazing']
+
+
+def stream_scores(path, chunk_size):
+    """Sentiment scores of a file streamed in chunks of chunk_size characters"""
+    accumulator = SentimentAccumulator()
+    for _ in accumulate_sentiment(clean_chunks(read_chunks(path, chunk_size)), accumulator):
+        pass
+    return accumulator.scores()
+
+
+class ChunkInvarianceTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(5)
+        # Several windows' worth of words, with lines of varying length and a partial last window
+        lines = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 40)))
+                 for _ in range(SENTIMENT_WINDOW // 4)]
+        handle, self.path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(handle, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_chunk_size_does_not_change_sentiment(self):
+        single_pass = stream_scores(self.path, 1024 * 1024)
+        for chunk_size in (17, 500, 4096):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(stream_scores(self.path, chunk_size), single_pass)
+
+    def test_partial_window_is_scored(self):
+        accumulator = SentimentAccumulator()
+        accumulator.add('i love this')
+        self.assertEqual(accumulator.weight, 0)
+        self.assertGreater(accumulator.scores()['pos'], 0)
+        self.assertEqual(accumulator.weight, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Tests for server.py request handling: malformed requests and scoring
+failures get an error response and leave the service running.
+
+Usage:
+    python -m pytest test_server.py
+"""
+
+import asyncio
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from server import MAX_BODY_BYTES, MicroBatcher, SentimentServer
+
+
+class ServerTestCase(unittest.IsolatedAsyncioTestCase):
+    """Runs a server on a free port with a thread pool instead of worker processes"""
+    async def asyncSetUp(self):
+        self.executor = ThreadPoolExecutor(1)
+        self.server = SentimentServer(MicroBatcher(self.executor), port=0)
+        await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+        self.executor.shutdown()
+
+    async def request(self, method, path, body=b'', content_length=None, headers=''):
+        """Send one raw request; return (status, decoded JSON body)"""
+        if content_length is None:
+            content_length = len(body)
+        return await self.send(f"{method} {path} HTTP/1.1\r\nContent-Length: {content_length}\r\n"
+                               f"{headers}Connection: close\r\n\r\n".encode('latin-1') + body)
+
+    async def send(self, data):
+        """Send raw bytes; return (status, decoded JSON body) of the response"""
+        reader, writer = await asyncio.open_connection(self.server.host, self.server.port)
+        writer.write(data)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        head, _, payload = response.partition(b'\r\n\r\n')
+        self.assertTrue(head, "connection closed without a response")
+        return int(head.split()[1]), json.loads(payload)
+
+    async def assert_serving(self):
+        status, _ = await self.request('GET', '/health')
+        self.assertEqual(status, 200)
+
+
+class BadRequestTest(ServerTestCase):
+    async def assert_bad_request(self, method, path, body=b'', content_length=None):
+        status, payload = await self.request(method, path, body, content_length)
+        self.assertEqual(status, 400)
+        self.assertIn('error', payload)
+        await self.assert_serving()
+
+    async def test_body_not_an_object(self):
+        for path in ('/score', '/batch'):
+            for body in (b'[1, 2]', b'"x"', b'3', b'null'):
+                with self.subTest(path=path, body=body):
+                    await self.assert_bad_request('POST', path, body)
+
+    async def test_invalid_json(self):
+        await self.assert_bad_request('POST', '/score', b'{"text": ')
+        await self.assert_bad_request('POST', '/score', b'\xff\xfe{}')
+
+    async def test_wrong_field_types(self):
+        await self.assert_bad_request('POST', '/score', b'{"text": 5}')
+        await self.assert_bad_request('POST', '/batch', b'{"texts": "not a list"}')
+        await self.assert_bad_request('POST', '/batch', b'{"texts": ["ok", 5]}')
+
+    async def test_bad_content_length(self):
+        await self.assert_bad_request('POST', '/score', b'{}', content_length='abc')
+        await self.assert_bad_request('POST', '/score', b'{}', content_length=-5)
+
+    async def test_body_too_large(self):
+        status, _ = await self.request('POST', '/score', content_length=MAX_BODY_BYTES + 1)
+        self.assertEqual(status, 413)
+
+    async def test_line_too_long(self):
+        long_value = 'x' * (2 ** 16 + 10)
+        status, payload = await self.send(f"GET /{long_value} HTTP/1.1\r\n\r\n".encode('latin-1'))
+        self.assertEqual(status, 431)
+        status, payload = await self.request('GET', '/health', headers=f"X-Long: {long_value}\r\n")
+        self.assertEqual(status, 431)
+        self.assertIn('error', payload)
+        await self.assert_serving()
+
+    async def test_valid_request(self):
+        status, payload = await self.request('POST', '/score', b'{"text": "I love this"}')
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['overall'], 'Positive')
+
+
+class ScoringFailureTest(ServerTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        # Every batch now fails in the executor, as with a broken process pool
+        self.executor.shutdown()
+
+    async def test_scoring_failure(self):
+        for path, body in (('/score', b'{"text": "I love this"}'), ('/batch', b'{"texts": ["a", "b"]}')):
+            with self.subTest(path=path):
+                status, payload = await self.request('POST', path, body)
+                self.assertEqual(status, 500)
+                self.assertIn('error', payload)
+                await self.assert_serving()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Tests for tokenization.py: the regex backend must split cleaned text exactly
+as nltk.word_tokenize does.
+
+Usage:
+    python -m pytest test_tokenization.py
+"""
+
+import unittest
+
+from preprocessing import clean_text
+from tokenization import build_corpus, check_equivalence, regex_tokenize
+
+# Text the two backends have to agree on once clean_text has run
+TRICKY_CASES = [
+    # Contractions, including word_tokenize's MacIntyre ones
+    "I cannot believe it, don't you? It's gonna be fine, I gotta go, wanna come? Gimme that, lemme see.",
+    "Cannots and scannot are not contractions, CanNot is. wannabe, gonnas",
+    # Quotes
+    '"Quoted" and \'single\' words, “curly” and ‘single’ quotes, «chevrons» and „low“ ones.',
+    "He said “no”—then left.",
+    # Ellipses and dashes
+    "Wait... what? Well… done… ok‒ok, wait—what – and — alone.",
+    # Trailing punctuation
+    "Great!", "Really?!", "The end.", "Ends with a comma,", "(in brackets)", "[note]", "done;",
+    # URLs, e-mail addresses, handles and numbers
+    "See https://example.com/path?q=1&x=2 or www.example.org, mail me@example.com, @user #tag",
+    "It cost $5.99 (50% off) at 10:30 on 2024-01-02, x2 faster, a&b x*y",
+    # Accents, emoji, full-width letters and odd whitespace
+    "café naïve résumé über ß ｆｕｌｌ 😀 smile😀",
+    "multi\nline\ttext  with\r\n  odd \t spacing",
+    "",
+]
+
+
+def nltk_tokenizer(preserve_line=False):
+    """word_tokenize, or None if NLTK or the data it needs is missing"""
+    try:
+        from nltk.tokenize import word_tokenize
+        word_tokenize("probe text", "english", preserve_line=preserve_line)
+    except (ImportError, LookupError):
+        return None
+    return lambda text: word_tokenize(text, "english", preserve_line=preserve_line)
+
+
+class RegexTokenizerTest(unittest.TestCase):
+    def assert_equivalent(self, reference):
+        for case in TRICKY_CASES:
+            text = clean_text(case)
+            with self.subTest(text=text):
+                self.assertEqual(regex_tokenize(text), reference(text))
+        chunks, mismatches = check_equivalence(build_corpus(20000), reference)
+        self.assertEqual(mismatches, [], f"{len(mismatches)}/{chunks} generated chunks differ")
+
+    @unittest.skipIf(nltk_tokenizer() is None, "NLTK punkt data is not installed")
+    def test_matches_word_tokenize(self):
+        self.assert_equivalent(nltk_tokenizer())
+
+    @unittest.skipIf(nltk_tokenizer(preserve_line=True) is None, "NLTK is not installed")
+    def test_matches_treebank_stage(self):
+        # Cleaned text has no sentence ends, so punkt passes it to the Treebank stage whole
+        self.assert_equivalent(nltk_tokenizer(preserve_line=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Conformance tests for vectorized.py against vaderSentiment. Documents that
+hit one of the deviations documented in vectorized.py are skipped by name;
+every other document must agree within SCORE_TOLERANCE on every score and
+have the same overall label, so a new divergence fails.
+
+Usage:
+    python -m pytest test_vectorized.py
+"""
+
+import re
+import unittest
+
+from vaderSentiment.vaderSentiment import BOOSTER_DICT, SPECIAL_CASES, SentimentIntensityAnalyzer
+
+from scoring import classify_sentiment
+from vectorized import MIN_AGREEMENT, SCORE_TOLERANCE, VectorizedScorer, build_conformance_corpus, check_conformance
+
+SCORE_KEYS = ('neg', 'neu', 'pos', 'compound')
+
+# Idioms and multi-word boosters the batch scorer does not model
+UNMODELLED_PHRASES = sorted(set(SPECIAL_CASES) | {word for word in BOOSTER_DICT if ' ' in word})
+
+
+class ButQuirkProbe(SentimentIntensityAnalyzer):
+    """vaderSentiment that records whether _but_check rescaled other tokens than it meant to"""
+    quirk = False
+
+    def _but_check(self, words_and_emoticons, sentiments):
+        lower = [str(word).lower() for word in words_and_emoticons]
+        intended = list(sentiments)
+        if 'but' in lower:
+            but_index = lower.index('but')
+            intended = [value * 0.5 if index < but_index else value * 1.5 if index > but_index else value
+                        for index, value in enumerate(sentiments)]
+        result = super()._but_check(words_and_emoticons, sentiments)
+        # sentiments.index() finds the first of equal valences, so later ones keep their value
+        self.quirk = result != intended
+        return result
+
+
+def documented_deviation(probe, text):
+    """Name of the documented deviation a text hits, or None"""
+    words = ' '.join(re.findall(r'\S+', text.lower()))
+    for phrase in UNMODELLED_PHRASES:
+        if re.search(rf'(?<!\S){re.escape(phrase)}(?!\S)', words):
+            return f'unmodelled phrase {phrase!r}'
+    probe.polarity_scores(text)
+    return 'but quirk' if probe.quirk else None
+
+
+class ConformanceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.scorer = VectorizedScorer()
+        cls.reference = SentimentIntensityAnalyzer()
+        cls.probe = ButQuirkProbe()
+        cls.corpus = build_conformance_corpus(size=3000)
+
+    def test_agrees_outside_documented_deviations(self):
+        actual = self.scorer.polarity_scores_batch(self.corpus)
+        skipped = 0
+        for text, scores in zip(self.corpus, actual):
+            if documented_deviation(self.probe, text):
+                skipped += 1
+                continue
+            expected = self.reference.polarity_scores(text)
+            with self.subTest(text=text):
+                for key in SCORE_KEYS:
+                    self.assertLessEqual(abs(expected[key] - scores[key]), SCORE_TOLERANCE, key)
+                self.assertEqual(classify_sentiment(scores['compound']), classify_sentiment(expected['compound']))
+        # The deviations stay rare, or skipping them would hide too much
+        self.assertLess(skipped, len(self.corpus) * (1 - MIN_AGREEMENT) * 3)
+
+    def test_documented_agreement(self):
+        score_agreement, label_agreement = check_conformance(self.scorer, self.corpus)
+        self.assertGreaterEqual(score_agreement, MIN_AGREEMENT)
+        self.assertGreaterEqual(label_agreement, MIN_AGREEMENT)
+
+    def test_documented_deviations_are_detected(self):
+        self.assertEqual(documented_deviation(self.probe, "The food was kind of good"), "unmodelled phrase 'kind of'")
+        self.assertEqual(documented_deviation(self.probe, "That movie was the bomb"), "unmodelled phrase 'the bomb'")
+        # Halved "love" is 1.6 like "amusing", so VADER halves "love" again instead of boosting "amusing"
+        self.assertEqual(documented_deviation(self.probe, "I love it but it is amusing"), 'but quirk')
+        self.assertIsNone(documented_deviation(self.probe, "good food but bad service"))
+
+
+if __name__ == "__main__":
+    unittest.main()
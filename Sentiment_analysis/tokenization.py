@@ -0,0 +1,152 @@
+"""
+Selectable word tokenizers for the NLTK pipeline.
+main_nltk.py tokenizes text after clean_text has lowercased it and removed
+ASCII punctuation. By then punkt finds no sentence ends and most of the
+Treebank rules have nothing to act on. What still applies is splitting off
+Unicode quotes and dashes and the MacIntyre contractions ("cannot" ->
+"can not", "gonna" -> "gon na"). The regex backend does exactly that with
+two precompiled substitutions over the whole chunk and a split.
+
+Backends:
+    punkt  nltk.word_tokenize (needs the punkt_tab data)
+    regex  precompiled regular expressions, equivalent on cleaned text
+
+Usage:
+    python tokenization.py --tokens 500000
+Checks that both backends agree on representative text and compares their speed.
+test_tokenization.py runs the same check on the hard cases under pytest.
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+
+from preprocessing import clean_text
+
+DEFAULT_TOKENIZER = 'punkt'
+
+# Quotes and dashes that word_tokenize pads with spaces; ASCII ones are gone after clean_text
+SEPARATE_CHARACTERS = re.compile('([«“‘„»”’\u2012-\u2015])')
+
+# word_tokenize's MacIntyre contractions that survive punctuation removal
+CONTRACTIONS = re.compile(r'\b(?:(can)(not)|(gim)(me)|(gon)(na)|(got)(ta)|(lem)(me))\b|\b(wan)(na)(?=\s|$)')
+
+
+def _split_contraction(match):
+    """Put a space between the two halves of a matched contraction"""
+    first, second = (group for group in match.groups() if group is not None)
+    return f' {first} {second} '
+
+
+def regex_tokenize(text):
+    """Tokenize cleaned text with precompiled regular expressions"""
+    text = SEPARATE_CHARACTERS.sub(r' \1 ', text)
+    text = CONTRACTIONS.sub(_split_contraction, text)
+    return text.split()
+
+
+def punkt_tokenize(text):
+    """Tokenize with nltk.word_tokenize"""
+    from nltk.tokenize import word_tokenize
+    return word_tokenize(text, "english")
+
+
+TOKENIZERS = {
+    'punkt': punkt_tokenize,
+    'regex': regex_tokenize,
+}
+
+
+def get_tokenizer(name=DEFAULT_TOKENIZER):
+    """Return the tokenize function of a backend"""
+    try:
+        return TOKENIZERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown tokenizer {name!r}, expected one of {', '.join(TOKENIZERS)}")
+
+
+def reference_tokenizer():
+    """word_tokenize if punkt data is installed, else its Treebank stage alone, with a label"""
+    from nltk.tokenize import word_tokenize
+    try:
+        word_tokenize("probe text", "english")
+        return punkt_tokenize, 'word_tokenize'
+    except LookupError:
+        # Without sentence ends punkt returns the whole text as one sentence, so this is the same
+        return (lambda text: word_tokenize(text, "english", preserve_line=True),
+                'word_tokenize(preserve_line=True), punkt data not installed')
+
+
+def build_corpus(tokens, seed=5):
+    """Deterministic review-like text exercising the cases the backends must agree on"""
+    rng = random.Random(seed)
+    words = ['the', 'movie', 'was', 'great', 'terrible', 'i', 'loved', 'it', 'not', 'very',
+             'café', 'naïve', 'résumé', 'über', '2024', '10', 'x2', 'hello', 'world', 'okay',
+             'cannot', 'gonna', 'gotta', 'wanna', 'lemme', 'gimme', 'cannots', 'scannot',
+             'canNot', "don't", "it's", "o'clock", 'well-known', 'e-mail', 'u.s.a.', 'dr.',
+             'wow!', 'what?', 'yes...', '(really)', '[note]', '"quoted"', "'single'", '$5.99',
+             '50%', '#tag', '@user', 'a&b', 'x*y', 'one;two', 'three:four', 'five,six',
+             '“curly”', '‘single’', '«chevrons»', '„low“', '—', '–', 'wait—what', 'ok‒ok',
+             '…', 'done…', '😀', 'smile😀', '\t', '\n', 'multi\nline', 'ｆｕｌｌ', 'ß']
+    pieces = []
+    for _ in range(tokens):
+        pieces.append(rng.choice(words))
+        pieces.append(rng.choice([' ', ' ', ' ', '  ', '\n', ' \t']))
+    return ''.join(pieces)
+
+
+def check_equivalence(text, reference, chunk_words=2000):
+    """Compare the regex backend with the reference chunk by chunk; return (chunks, mismatches)"""
+    words = text.split(' ')
+    chunks = 0
+    mismatches = []
+    for start in range(0, len(words), chunk_words):
+        chunk = clean_text(' '.join(words[start:start + chunk_words]))
+        expected = reference(chunk)
+        actual = regex_tokenize(chunk)
+        chunks += 1
+        if actual != expected:
+            mismatches.append((chunk, expected, actual))
+    return chunks, mismatches
+
+
+def time_tokenizer(tokenize, chunks, repeat=3):
+    """Best-of-repeat seconds to tokenize every chunk, and the token count"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(len(tokenize(chunk)) for chunk in chunks)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and benchmark the regex tokenizer against word_tokenize")
+    parser.add_argument('--tokens', type=int, default=500000, help="corpus size in words")
+    parser.add_argument('--chunk-words', type=int, default=2000, help="words per tokenized chunk")
+    args = parser.parse_args()
+
+    reference, label = reference_tokenizer()
+    corpus = build_corpus(args.tokens)
+
+    chunk_count, mismatches = check_equivalence(corpus, reference, args.chunk_words)
+    print(f"Reference: {label}")
+    print(f"Equivalence: {chunk_count - len(mismatches)}/{chunk_count} chunks identical")
+    for chunk, expected, actual in mismatches[:3]:
+        diff = next(i for i, pair in enumerate(zip(expected + [None], actual + [None])) if pair[0] != pair[1])
+        print(f"  first difference at token {diff}: {expected[diff:diff + 5]} vs {actual[diff:diff + 5]}")
+
+    words = corpus.split(' ')
+    chunks = [clean_text(' '.join(words[start:start + args.chunk_words]))
+              for start in range(0, len(words), args.chunk_words)]
+    reference_time, token_count = time_tokenizer(reference, chunks)
+    regex_time, _ = time_tokenizer(regex_tokenize, chunks)
+    print(f"Tokens: {token_count}")
+    print(f"Reference: {reference_time:.3f}s ({token_count / reference_time:.0f} tokens/sec)")
+    print(f"Regex:     {regex_time:.3f}s ({token_count / regex_time:.0f} tokens/sec)")
+    print(f"Speedup:   {reference_time / regex_time:.1f}x")
+
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,352 @@
+"""
+NumPy-vectorized batch VADER scorer.
+Tokens of a whole batch are mapped to integer ids against an array-backed
+copy of the VADER lexicon, and the valence lookups, booster/negation/caps
+adjustments, 'but' weighting, punctuation emphasis and normalization are
+computed as array operations over every token of the batch at once.
+
+Tolerance: the scorer follows vaderSentiment 3.3.2 rule for rule except
+for two rare cases it does not model:
+  - the SPECIAL_CASES idioms ("the shit", "bad ass", "kiss of death", ...)
+    and the multi-word boosters ("kind of", "sort of", "just enough")
+  - the quirk in VADER's _but_check that rescales only the first of
+    several tokens sharing the same valence
+On the conformance corpus below at least 99% of documents agree with
+vaderSentiment within 0.01 on every score, and the overall label
+(see scoring.classify_sentiment) agrees on at least 99%.
+
+Run this file directly for the conformance check and throughput comparison:
+    python vectorized.py
+test_vectorized.py checks every document under pytest, skipping only those
+that hit one of the deviations above.
+"""
+
+import random
+import string
+import sys
+import time
+
+import numpy as np
+from vaderSentiment.vaderSentiment import (BOOSTER_DICT, C_INCR, N_SCALAR,
+                                           NEGATE)
+
+from engine import get_engine
+
+# Reserved ids: unknown words, and unknown words containing "n't" (negations)
+UNKNOWN_ID = 0
+NT_ID = 1
+
+# Words the rules compare against directly
+SPECIAL_WORDS = ['no', 'or', 'nor', 'never', 'so', 'this', 'without',
+                 'doubt', 'least', 'at', 'very', 'but', 'kind', 'of']
+
+# Bound on the raw token -> id memo
+TOKEN_CACHE_SIZE = 500000
+
+# Agreement required by the conformance check
+SCORE_TOLERANCE = 0.01
+MIN_AGREEMENT = 0.99
+
+
+class VectorizedScorer:
+    """Scores batches of texts with VADER rules as NumPy array operations"""
+    def __init__(self, lexicon=None, emojis=None):
+        if lexicon is None or emojis is None:
+            analyzer = get_engine().load()
+            lexicon = analyzer.lexicon if lexicon is None else lexicon
+            emojis = analyzer.emojis if emojis is None else emojis
+
+        # Vocabulary of every word a rule can look at; ids 0 and 1 are reserved
+        words = set(lexicon) | set(BOOSTER_DICT) | set(NEGATE) | set(SPECIAL_WORDS)
+        words = sorted(word for word in words if ' ' not in word)
+        self.vocab = {word: index + 2 for index, word in enumerate(words)}
+
+        size = len(words) + 2
+        self.valence = np.zeros(size)
+        self.in_lexicon = np.zeros(size, dtype=bool)
+        self.booster = np.zeros(size)
+        self.is_booster = np.zeros(size, dtype=bool)
+        self.negation = np.zeros(size, dtype=bool)
+        self.negation[NT_ID] = True
+
+        negate = set(NEGATE)
+        for word, index in self.vocab.items():
+            if word in lexicon:
+                self.valence[index] = lexicon[word]
+                self.in_lexicon[index] = True
+            if word in BOOSTER_DICT:
+                self.booster[index] = BOOSTER_DICT[word]
+                self.is_booster[index] = True
+            if word in negate or "n't" in word:
+                self.negation[index] = True
+
+        self.word_ids = {word: self.vocab[word] for word in SPECIAL_WORDS}
+
+        # Emojis are replaced by their descriptions, as VADER does
+        self.emoji_table = str.maketrans({emoji: ' ' + description
+                                          for emoji, description in emojis.items()
+                                          if len(emoji) == 1})
+        self._token_codes = {}
+
+    def _token_code(self, token):
+        """Pack a raw token's vocabulary id and ALL CAPS flag into one int"""
+        stripped = token.strip(string.punctuation)
+        if len(stripped) <= 2:
+            # Probably an emoticon, keep it as is
+            stripped = token
+        lower = stripped.lower()
+        word_id = self.vocab.get(lower)
+        if word_id is None:
+            word_id = NT_ID if "n't" in lower else UNKNOWN_ID
+        code = word_id * 2 + stripped.isupper()
+
+        if len(self._token_codes) >= TOKEN_CACHE_SIZE:
+            self._token_codes.clear()
+        self._token_codes[token] = code
+        return code
+
+    def _encode(self, texts):
+        """Turn a batch of texts into flat token codes plus per-document counts"""
+        codes = []
+        lengths = []
+        exclamations = []
+        questions = []
+        lookup = self._token_codes.get
+        encode = self._token_code
+        table = self.emoji_table
+
+        for text in texts:
+            text = text.translate(table)
+            tokens = text.split()
+            codes.extend([lookup(token) or encode(token) for token in tokens])
+            lengths.append(len(tokens))
+            exclamations.append(text.count('!'))
+            questions.append(text.count('?'))
+
+        return (np.array(codes, dtype=np.int64), np.array(lengths, dtype=np.int64),
+                np.array(exclamations), np.array(questions))
+
+    def score_batch(self, texts):
+        """Return a dict of neg/neu/pos/compound arrays for a batch of texts"""
+        codes, lengths, exclamations, questions = self._encode(texts)
+        n_docs = len(lengths)
+        n_tokens = len(codes)
+        ids = codes >> 1
+        upper = (codes & 1).astype(bool)
+        w = self.word_ids
+
+        # Document index and position of every token
+        doc = np.repeat(np.arange(n_docs), lengths)
+        starts = np.cumsum(lengths) - lengths
+        pos = np.arange(n_tokens) - starts[doc]
+        doc_len = lengths[doc]
+
+        # ALL CAPS emphasis only counts when some, but not all, words are capitalized
+        caps = np.bincount(doc, weights=upper, minlength=n_docs)
+        cap_diff = ((caps > 0) & (caps < lengths))[doc]
+
+        def shifted(values, k, fill):
+            """values[i - k] within the same document, fill elsewhere"""
+            out = np.full(n_tokens, fill, dtype=values.dtype)
+            if k < n_tokens:
+                if k > 0:
+                    out[k:] = values[:-k]
+                else:
+                    out[:k] = values[-k:]
+            if k > 0:
+                out[pos < k] = fill
+            else:
+                out[pos >= doc_len + k] = fill
+            return out
+
+        prev_ids = {k: shifted(ids, k, UNKNOWN_ID) for k in (1, 2, 3)}
+        prev_upper = {k: shifted(upper, k, False) for k in (1, 2, 3)}
+        next1 = shifted(ids, -1, UNKNOWN_ID)
+        prev1, prev2, prev3 = prev_ids[1], prev_ids[2], prev_ids[3]
+
+        # Lexicon words that are not boosters and not the "kind" of "kind of"
+        lexicon_valence = self.valence[ids]
+        active = (self.in_lexicon[ids] & ~self.is_booster[ids]
+                  & ~((ids == w['kind']) & (next1 == w['of'])))
+        valence = np.where(active, lexicon_valence, 0.0)
+
+        # "no" negates the next lexicon word instead of scoring itself
+        valence[active & (ids == w['no']) & self.in_lexicon[next1]] = 0.0
+        after_no = ((prev1 == w['no']) | (prev2 == w['no'])
+                    | ((prev3 == w['no']) & ((prev1 == w['or']) | (prev1 == w['nor']))))
+        mask = active & after_no
+        valence[mask] = lexicon_valence[mask] * N_SCALAR
+
+        # ALL CAPS sentiment words
+        mask = active & upper & cap_diff
+        valence = np.where(mask, np.where(valence > 0, valence + C_INCR, valence - C_INCR), valence)
+
+        # Boosters, dampeners and negations in the three preceding words
+        for k, decay in ((1, 1.0), (2, 0.95), (3, 0.9)):
+            prev = prev_ids[k]
+            applies = active & (pos >= k) & ~self.in_lexicon[prev]
+
+            scalar = np.where(valence < 0, -self.booster[prev], self.booster[prev])
+            booster_caps = self.is_booster[prev] & prev_upper[k] & cap_diff
+            scalar = np.where(booster_caps, np.where(valence > 0, scalar + C_INCR, scalar - C_INCR), scalar)
+            valence = np.where(applies, valence + scalar * decay, valence)
+
+            if k == 1:
+                emphasis = np.zeros(n_tokens, dtype=bool)
+                kept = np.zeros(n_tokens, dtype=bool)
+            elif k == 2:
+                emphasis = (prev2 == w['never']) & ((prev1 == w['so']) | (prev1 == w['this']))
+                kept = (prev2 == w['without']) & (prev1 == w['doubt'])
+            else:
+                emphasis = (((prev3 == w['never']) & ((prev2 == w['so']) | (prev2 == w['this'])))
+                            | (prev1 == w['so']) | (prev1 == w['this']))
+                kept = (prev3 == w['without']) & ((prev2 == w['doubt']) | (prev1 == w['doubt']))
+            negated = self.negation[prev] & ~emphasis & ~kept
+
+            valence = np.where(applies & emphasis, valence * 1.25, valence)
+            valence = np.where(applies & negated, valence * N_SCALAR, valence)
+
+        # "least" as a negation, except in "at least" and "very least"
+        least = (active & (prev1 == w['least']) & ~self.in_lexicon[prev1]
+                 & (prev2 != w['at']) & (prev2 != w['very']))
+        valence = np.where(least, valence * N_SCALAR, valence)
+
+        # Contrastive "but": halve what comes before, boost what comes after
+        but = ids == w['but']
+        first_but = np.full(n_docs, np.iinfo(np.int64).max)
+        np.minimum.at(first_but, doc[but], pos[but])
+        first_but = first_but[doc]
+        has_but = first_but != np.iinfo(np.int64).max
+        valence = np.where(has_but & (pos < first_but), valence * 0.5, valence)
+        valence = np.where(has_but & (pos > first_but), valence * 1.5, valence)
+
+        # Per-document sums
+        sum_s = np.bincount(doc, weights=valence, minlength=n_docs)
+        pos_sum = np.bincount(doc, weights=np.where(valence > 0, valence + 1, 0.0), minlength=n_docs)
+        neg_sum = np.bincount(doc, weights=np.where(valence < 0, valence - 1, 0.0), minlength=n_docs)
+        neu_count = np.bincount(doc, weights=(valence == 0), minlength=n_docs)
+
+        # Emphasis from exclamation points and question marks
+        amplifier = np.minimum(exclamations, 4) * 0.292
+        amplifier = amplifier + np.where(questions > 3, 0.96,
+                                         np.where(questions > 1, questions * 0.18, 0.0))
+        sum_s = sum_s + np.sign(sum_s) * amplifier
+
+        compound = np.clip(sum_s / np.sqrt(sum_s * sum_s + 15), -1.0, 1.0)
+
+        pos_sum = np.where(pos_sum > np.abs(neg_sum), pos_sum + amplifier, pos_sum)
+        neg_sum = np.where(pos_sum < np.abs(neg_sum), neg_sum - amplifier, neg_sum)
+        total = pos_sum + np.abs(neg_sum) + neu_count
+        safe_total = np.where(total > 0, total, 1.0)
+
+        empty = lengths == 0
+        return {
+            'neg': np.where(empty, 0.0, np.round(np.abs(neg_sum / safe_total), 3)),
+            'neu': np.where(empty, 0.0, np.round(np.abs(neu_count / safe_total), 3)),
+            'pos': np.where(empty, 0.0, np.round(np.abs(pos_sum / safe_total), 3)),
+            'compound': np.where(empty, 0.0, np.round(compound, 4))
+        }
+
+    def polarity_scores_batch(self, texts):
+        """Return one polarity_scores-style dict per text"""
+        scores = self.score_batch(texts)
+        return [
+            {'neg': float(neg), 'neu': float(neu), 'pos': float(pos), 'compound': float(compound)}
+            for neg, neu, pos, compound in zip(scores['neg'], scores['neu'],
+                                               scores['pos'], scores['compound'])
+        ]
+
+
+def build_conformance_corpus(size=5000, seed=7):
+    """Deterministic mix of VADER's own examples and synthetic sentences"""
+    examples = [
+        "VADER is smart, handsome, and funny.",
+        "VADER is smart, handsome, and funny!",
+        "VADER is very smart, handsome, and funny.",
+        "VADER is VERY SMART, handsome, and FUNNY.",
+        "VADER is VERY SMART, handsome, and FUNNY!!!",
+        "VADER is VERY SMART, uber handsome, and FRIGGIN FUNNY!!!",
+        "VADER is not smart, handsome, nor funny.",
+        "The book was good.",
+        "At least it isn't a horrible book.",
+        "The plot was good, but the characters are uncompelling and the dialog is not great.",
+        "Today SUX!",
+        "Make sure you :) or :D today!",
+        "Catch utf-8 emoji such as \U0001F498 and \U0001F48B and \U0001F601",
+        "Not bad at all",
+        "Sentiment analysis has never been good.",
+        "Sentiment analysis has never been this good!",
+        "Without a doubt, excellent idea.",
+        "Roger Dodger is one of the least compelling variations on this theme.",
+        "No problem at all, no worries!",
+        "",
+        "   ",
+    ]
+    vocabulary = ['good', 'bad', 'great', 'terrible', 'love', 'hate', 'happy', 'sad',
+                  'not', "don't", 'never', 'very', 'extremely', 'slightly', 'barely',
+                  'the', 'movie', 'food', 'service', 'was', 'is', 'and', 'but', 'no',
+                  'least', 'at', 'so', 'this', 'without', 'doubt', 'really', 'okay',
+                  'GREAT', 'BAD', 'VERY', 'awful', 'nice', 'boring', 'fun', ':)', ':(',
+                  'lol', 'wow', 'meh', 'kind', 'of', 'or', 'nor', 'win', 'fail']
+    punctuation = ['', '', '', '.', '!', '!!', '?', '??', '????', '...']
+
+    rng = random.Random(seed)
+    corpus = list(examples)
+    while len(corpus) < size:
+        words = rng.choices(vocabulary, k=rng.randint(1, 30))
+        corpus.append(' '.join(words) + rng.choice(punctuation))
+    return corpus
+
+
+def check_conformance(scorer, texts):
+    """Compare the scorer with vaderSentiment and return agreement rates"""
+    from scoring import classify_sentiment
+
+    analyzer = get_engine().load()
+    expected = [analyzer.polarity_scores(text) for text in texts]
+    actual = scorer.polarity_scores_batch(texts)
+
+    within = 0
+    labels = 0
+    for exp, act in zip(expected, actual):
+        if all(abs(exp[key] - act[key]) <= SCORE_TOLERANCE for key in ('neg', 'neu', 'pos', 'compound')):
+            within += 1
+        if classify_sentiment(exp['compound']) == classify_sentiment(act['compound']):
+            labels += 1
+    return within / len(texts), labels / len(texts)
+
+
+def measure_throughput(scorer, texts, batch_size=10000):
+    """Docs/sec for vaderSentiment one at a time versus the batch scorer"""
+    analyzer = get_engine().load()
+
+    start = time.perf_counter()
+    for text in texts:
+        analyzer.polarity_scores(text)
+    scalar = len(texts) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        scorer.score_batch(texts[i:i + batch_size])
+    vectorized = len(texts) / (time.perf_counter() - start)
+
+    return scalar, vectorized
+
+
+if __name__ == "__main__":
+    scorer = VectorizedScorer()
+
+    corpus = build_conformance_corpus()
+    score_agreement, label_agreement = check_conformance(scorer, corpus)
+    print(f"Conformance on {len(corpus)} documents:")
+    print(f"  scores within {SCORE_TOLERANCE}: {score_agreement:.2%}")
+    print(f"  overall label agreement: {label_agreement:.2%}")
+
+    texts = build_conformance_corpus(size=50000, seed=11)
+    scalar, vectorized = measure_throughput(scorer, texts)
+    print("Throughput:")
+    print(f"  vaderSentiment polarity_scores: {scalar:.0f} docs/sec")
+    print(f"  vectorized batch scorer:        {vectorized:.0f} docs/sec ({vectorized / scalar:.1f}x)")
+
+    if score_agreement < MIN_AGREEMENT or label_agreement < MIN_AGREEMENT:
+        sys.exit(1)
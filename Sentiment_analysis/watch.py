@@ -0,0 +1,384 @@
+"""
+Continuous sentiment and emotion scoring of a folder of text files.
+The folder is polled and every file is compared with a manifest saved next
+to it that records each file's size, mtime, how far it has been scored and
+hashes of the first and last bytes scored. New files are scored from the
+start; files that grew and still begin and end the scored part with the
+same bytes are tailed, so only the appended lines are read and scored; any
+other change rescores the file. Every line is scored with VADER and its
+emotions counted with the emotions.txt lexicon, and the running totals of
+the folder are updated with just the new lines, so old data is never
+reprocessed. A file's previous contribution is subtracted when it is
+rewritten or deleted.
+
+A trailing line without a newline is left for the next poll, and scored
+once the file has not changed for --settle seconds; text appended to that
+line afterwards is scored as a line of its own.
+
+Usage:
+    python watch.py transcripts/
+    python watch.py transcripts/ --interval 5 --output scores.jsonl
+    python watch.py transcripts/ --once
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+from emotion_lexicon import EmotionLexicon
+from preprocessing import TextPreprocessor, clean_text
+from scoring import label_scores, score_text
+from tokenization import DEFAULT_TOKENIZER, TOKENIZERS, get_tokenizer
+
+# Bump when the manifest layout changes so old manifests are rebuilt
+MANIFEST_VERSION = 1
+
+# Manifest file name inside the watched folder
+MANIFEST_NAME = '.sentiment_watch.json'
+
+# Seconds between polls
+POLL_INTERVAL = 2.0
+
+# Seconds a file must be unchanged before its unterminated last line is scored
+SETTLE_SECONDS = 5.0
+
+# Bytes at the start and at the end of the scored part that are hashed to detect rewrites
+WINDOW_BYTES = 4096
+
+# Appended bytes read from a file at a time
+READ_BLOCK = 8 * 1024 * 1024
+
+SCORE_KEYS = ('neg', 'neu', 'pos', 'compound')
+
+
+def window_hash(path, start, end):
+    """Hash of the bytes start..end of a file"""
+    with open(path, 'rb') as file:
+        file.seek(start)
+        return hashlib.blake2b(file.read(end - start), digest_size=16).hexdigest()
+
+
+def head_range(offset):
+    """Byte range hashed at the start of a scored part of offset bytes"""
+    return 0, min(offset, WINDOW_BYTES)
+
+
+def tail_range(offset):
+    """Byte range hashed at the end of a scored part of offset bytes"""
+    return max(0, offset - WINDOW_BYTES), offset
+
+
+class Aggregate:
+    """Running sentiment and emotion totals that lines can be added to and removed from"""
+    def __init__(self):
+        self.lines = 0
+        self.words = 0
+        # Word-weighted sums of the line scores
+        self.sums = dict.fromkeys(SCORE_KEYS, 0.0)
+        self.labels = Counter()
+        self.emotions = Counter()
+
+    def add_line(self, scores, words, emotions=None):
+        """Add one scored line"""
+        self.lines += 1
+        self.words += words
+        for key in SCORE_KEYS:
+            self.sums[key] += scores[key] * words
+        self.labels[scores['overall']] += 1
+        if emotions:
+            self.emotions.update(emotions)
+
+    def merge(self, other, sign=1):
+        """Add (sign=1) or subtract (sign=-1) another aggregate"""
+        self.lines += sign * other.lines
+        self.words += sign * other.words
+        for key in SCORE_KEYS:
+            self.sums[key] += sign * other.sums[key]
+        for counter, delta in ((self.labels, other.labels), (self.emotions, other.emotions)):
+            for name, count in delta.items():
+                counter[name] += sign * count
+                if counter[name] <= 0:
+                    del counter[name]
+
+    def scores(self):
+        """Word-weighted neg/neu/pos/compound of every line, with its label"""
+        if not self.words:
+            return label_scores(dict.fromkeys(SCORE_KEYS, 0.0))
+        return label_scores({key: self.sums[key] / self.words for key in SCORE_KEYS})
+
+    def to_dict(self):
+        return {'lines': self.lines, 'words': self.words, 'sums': self.sums,
+                'labels': dict(self.labels), 'emotions': dict(self.emotions)}
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregate = cls()
+        aggregate.lines = data['lines']
+        aggregate.words = data['words']
+        aggregate.sums = {key: data['sums'][key] for key in SCORE_KEYS}
+        aggregate.labels = Counter(data['labels'])
+        aggregate.emotions = Counter(data['emotions'])
+        return aggregate
+
+
+class FileEntry:
+    """What the manifest knows about one watched file"""
+    def __init__(self, size=0, mtime_ns=0, offset=0, lines=0, head='', tail='', aggregate=None):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        # Bytes scored so far; past the last newline only once the file has settled
+        self.offset = offset
+        self.lines = lines
+        self.head = head
+        self.tail = tail
+        self.aggregate = aggregate or Aggregate()
+
+    def to_dict(self):
+        return {'size': self.size, 'mtime_ns': self.mtime_ns, 'offset': self.offset, 'lines': self.lines,
+                'head': self.head, 'tail': self.tail, 'aggregate': self.aggregate.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['size'], data['mtime_ns'], data['offset'], data['lines'],
+                   data['head'], data['tail'], Aggregate.from_dict(data['aggregate']))
+
+    def is_prefix_of(self, path):
+        """True if the file still starts with the bytes that were scored"""
+        if not self.offset:
+            return True
+        return (window_hash(path, *head_range(self.offset)) == self.head and
+                window_hash(path, *tail_range(self.offset)) == self.tail)
+
+
+class EmotionCounter:
+    """Counts the emotions of a line with the main_nltk.py normalization"""
+    def __init__(self, emotions_path, tokenizer):
+        self.preprocessor = TextPreprocessor()
+        self.lexicon = EmotionLexicon.load(emotions_path, self.preprocessor)
+        self.tokenize = get_tokenizer(tokenizer)
+
+    def count(self, text):
+        """Counter of the emotions in a text"""
+        return self.lexicon.count_emotions(self.tokenize(clean_text(text)))
+
+
+class DirectoryWatcher:
+    """Scores the new and changed text in a folder and keeps running totals"""
+    def __init__(self, directory, manifest_path=None, pattern='*.txt', emotions_path='emotions.txt',
+                 tokenizer=DEFAULT_TOKENIZER, output_path=None, settle=SETTLE_SECONDS):
+        self.directory = directory
+        self.manifest_path = manifest_path or os.path.join(directory, MANIFEST_NAME)
+        self.pattern = pattern
+        self.settle = settle
+        self.emotion_counter = EmotionCounter(emotions_path, tokenizer) if emotions_path else None
+        self.output = open(output_path, 'a', encoding='utf-8') if output_path else None
+        self.files = {}
+        self.totals = Aggregate()
+        self.load_manifest()
+
+    def load_manifest(self):
+        """Restore the file entries and totals of a previous run"""
+        try:
+            with open(self.manifest_path, encoding='utf-8') as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return
+        if manifest.get('version') != MANIFEST_VERSION:
+            # Rescore everything rather than trust an unknown layout
+            return
+        self.files = {name: FileEntry.from_dict(entry) for name, entry in manifest['files'].items()}
+        self.totals = Aggregate.from_dict(manifest['totals'])
+
+    def save_manifest(self):
+        """Write the manifest atomically so a crash never leaves it half written"""
+        manifest = {'version': MANIFEST_VERSION,
+                    'files': {name: entry.to_dict() for name, entry in self.files.items()},
+                    'totals': self.totals.to_dict()}
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file)
+        os.replace(temp_path, self.manifest_path)
+
+    def list_files(self):
+        """{name: stat} of the watched files"""
+        found = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and fnmatch.fnmatch(entry.name, self.pattern):
+                        found[entry.name] = entry.stat()
+                except FileNotFoundError:
+                    # Deleted or renamed while the folder was being listed
+                    continue
+        return found
+
+    def _score_lines(self, name, entry, data):
+        """Score whole lines of bytes, add them to the file and folder totals and write them out"""
+        lines = data.decode('utf-8', errors='replace').split('\n')
+        if data.endswith(b'\n'):
+            lines.pop()
+
+        added = Aggregate()
+        for line_number, line in enumerate(lines, entry.lines + 1):
+            line = line.rstrip('\r')
+            if not line.strip():
+                continue
+            scores = score_text(line)
+            emotions = self.emotion_counter.count(line) if self.emotion_counter else None
+            added.add_line(scores, len(line.split()), emotions)
+            if self.output:
+                self.output.write(json.dumps({'file': name, 'line': line_number, **scores}) + '\n')
+
+        entry.aggregate.merge(added)
+        self.totals.merge(added)
+        entry.lines += len(lines)
+        entry.offset += len(data)
+        return added.lines
+
+    def _tail(self, name, path, entry, end, final):
+        """Score the bytes from entry.offset to end, stopping at the last newline unless final"""
+        scored = 0
+        pending = b''
+        with open(path, 'rb') as file:
+            file.seek(entry.offset)
+            remaining = end - entry.offset
+            while remaining > 0:
+                block = file.read(min(READ_BLOCK, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                data = pending + block
+                # Lines run on across blocks; only the final block may end mid-line
+                cut = len(data) if final and not remaining else data.rfind(b'\n') + 1
+                pending = data[cut:]
+                if cut:
+                    scored += self._score_lines(name, entry, data[:cut])
+
+        if entry.offset:
+            entry.head = window_hash(path, *head_range(entry.offset))
+            entry.tail = window_hash(path, *tail_range(entry.offset))
+        return scored
+
+    def poll(self, now=None):
+        """Check the folder once; return {name: (change, lines scored)} for the files that changed"""
+        now = time.time() if now is None else now
+        changes = {}
+        current = self.list_files()
+
+        for name in list(self.files):
+            if name not in current:
+                self.totals.merge(self.files.pop(name).aggregate, -1)
+                changes[name] = ('removed', 0)
+
+        for name, stat in sorted(current.items()):
+            path = os.path.join(self.directory, name)
+            entry = self.files.get(name)
+            known = entry is not None
+            settled = now - stat.st_mtime_ns / 1e9 >= self.settle
+
+            try:
+                if entry is None:
+                    change = 'new'
+                    entry = self.files[name] = FileEntry()
+                elif stat.st_size == entry.size and stat.st_mtime_ns == entry.mtime_ns:
+                    if entry.offset == entry.size or not settled:
+                        continue
+                    # Only the unterminated last line is left, and the writer seems done with it
+                    change = 'settled'
+                elif stat.st_size > entry.size and entry.is_prefix_of(path):
+                    change = 'appended'
+                else:
+                    change = 'rewritten'
+                    self.totals.merge(entry.aggregate, -1)
+                    entry = self.files[name] = FileEntry()
+                scored = self._tail(name, path, entry, stat.st_size, final=settled)
+            except FileNotFoundError:
+                # Deleted or renamed since the folder was listed; drop whatever was scored of it
+                self.totals.merge(self.files.pop(name).aggregate, -1)
+                if known:
+                    changes[name] = ('removed', 0)
+                continue
+            except PermissionError:
+                # Still locked by its writer; a new file is picked up from scratch next poll
+                if not known and not entry.offset:
+                    del self.files[name]
+                continue
+
+            # Recorded only once read, so a failed read is retried from entry.offset next poll
+            entry.size = stat.st_size
+            entry.mtime_ns = stat.st_mtime_ns
+            changes[name] = (change, scored)
+
+        if changes:
+            if self.output:
+                self.output.flush()
+            self.save_manifest()
+        return changes
+
+    def run(self, interval=POLL_INTERVAL, report=print):
+        """Poll until interrupted, reporting every change and the updated totals"""
+        try:
+            while True:
+                changes = self.poll()
+                if changes:
+                    for name, (change, lines) in changes.items():
+                        report(f"{name}: {change}, {lines} new lines")
+                    report(self.summary())
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+    def summary(self, top=5):
+        """One-line description of the running totals"""
+        scores = self.totals.scores()
+        emotions = ', '.join(f"{emotion} {count}" for emotion, count in self.totals.emotions.most_common(top))
+        return (f"Totals: {len(self.files)} files, {self.totals.lines} lines, {scores['overall']} "
+                f"(neg {scores['neg']:.3f}, neu {scores['neu']:.3f}, pos {scores['pos']:.3f}, "
+                f"compound {scores['compound']:.3f})" + (f"; emotions: {emotions}" if emotions else ""))
+
+    def close(self):
+        """Close the output file"""
+        if self.output:
+            self.output.close()
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Continuously score new and appended text in a folder")
+    parser.add_argument('directory', help="folder of text files to watch")
+    parser.add_argument('--pattern', default='*.txt', help="file name pattern to watch")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help="seconds between polls")
+    parser.add_argument('--settle', type=float, default=SETTLE_SECONDS,
+                        help="seconds without changes before an unterminated last line is scored")
+    parser.add_argument('--manifest', help=f"manifest file (default: DIRECTORY/{MANIFEST_NAME})")
+    parser.add_argument('--output', help="append every scored line to this .jsonl file")
+    parser.add_argument('--emotions', default='emotions.txt', help="emotion lexicon")
+    parser.add_argument('--no-emotions', action='store_true', help="score sentiment only")
+    parser.add_argument('--tokenizer', choices=list(TOKENIZERS), default=DEFAULT_TOKENIZER,
+                        help="word tokenizer for emotion counting")
+    parser.add_argument('--once', action='store_true', help="poll once and exit, e.g. from cron")
+    args = parser.parse_args(argv)
+
+    watcher = DirectoryWatcher(args.directory, args.manifest, args.pattern,
+                               None if args.no_emotions else args.emotions,
+                               args.tokenizer, args.output, args.settle)
+    try:
+        if args.once:
+            for name, (change, lines) in watcher.poll().items():
+                print(f"{name}: {change}, {lines} new lines")
+            print(watcher.summary())
+        else:
+            print(f"Watching {args.directory} every {args.interval:g}s, Ctrl+C to stop")
+            watcher.run(args.interval)
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
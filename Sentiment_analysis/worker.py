@@ -0,0 +1,267 @@
+"""
+Background analysis for the sentiment GUI.
+Tk widgets may only be touched from the main thread, so analysis runs on a
+worker thread that posts messages to a queue. The GUI drains the queue from
+root.after callbacks, a bounded number of messages per frame, so the window
+keeps redrawing while a large document is scored. Submitting a new analysis
+cancels the one in progress. score_file streams the results of a whole
+CSV, JSONL or text file the same way, scored by bulk.py's process pool.
+
+Usage:
+    python worker.py --size-mb 2
+Simulates a 60 Hz UI loop while a document is analysed and reports frame timing.
+"""
+
+import argparse
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+from results_table import preview
+from scoring import aggregate_scores, score_text
+from segmentation import segment_document
+
+# Texts at least this long are scored segment by segment in parallel
+LONG_DOCUMENT_CHARS = 5000
+
+# Most messages the UI applies per frame
+POLL_MAX_MESSAGES = 500
+
+# Scored records sent to the UI per message in file mode
+FILE_ROWS_PER_MESSAGE = 500
+
+
+class Cancelled(Exception):
+    """Raised inside a job once a newer analysis has superseded it"""
+
+
+class AnalysisJob:
+    """Handle a job function uses to report to the UI and to notice cancellation"""
+    def __init__(self, job_id, messages):
+        self.job_id = job_id
+        self.messages = messages
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """Ask the job to stop at its next check"""
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        """True once the job has been superseded or cancelled"""
+        return self.cancel_event.is_set()
+
+    def check(self):
+        """Raise Cancelled if the job should stop"""
+        if self.cancel_event.is_set():
+            raise Cancelled()
+
+    def post(self, kind, payload=None):
+        """Send a (kind, payload) message to the UI thread"""
+        self.check()
+        self.messages.put((self.job_id, kind, payload))
+
+
+class AnalysisWorker:
+    """Runs one analysis at a time on a background thread"""
+    def __init__(self):
+        self.messages = queue.Queue()
+        self.job = None
+        self.job_count = 0
+
+    @property
+    def busy(self):
+        """True while the current job has not reported done or error"""
+        return self.job is not None
+
+    def submit(self, func, *args):
+        """Cancel the running job and start func(job, *args) on a new thread"""
+        self.cancel()
+        self.job_count += 1
+        job = AnalysisJob(self.job_count, self.messages)
+        self.job = job
+
+        thread = threading.Thread(target=self._run, args=(job, func, args))
+        thread.daemon = True
+        thread.start()
+        return job
+
+    def _run(self, job, func, args):
+        """Worker thread: run the job and post its result or error"""
+        try:
+            job.post('done', func(job, *args))
+        except Cancelled:
+            pass
+        except Exception as e:
+            if not job.cancelled:
+                self.messages.put((job.job_id, 'error', e))
+
+    def cancel(self):
+        """Cancel the running job; its remaining messages are dropped"""
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+
+    def poll(self, max_messages=POLL_MAX_MESSAGES):
+        """Return up to max_messages (kind, payload) messages from the current job"""
+        messages = []
+        while len(messages) < max_messages:
+            try:
+                job_id, kind, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            # Messages from superseded jobs are discarded
+            if self.job is None or job_id != self.job.job_id:
+                continue
+            messages.append((kind, payload))
+            if kind in ('done', 'error'):
+                self.job = None
+                break
+        return messages
+
+
+def analyze_document(job, text, long_scorer, long_threshold=LONG_DOCUMENT_CHARS, mode='sentence'):
+    """Job: score a text, streaming per-segment results for long documents"""
+    if len(text) < long_threshold:
+        return score_text(text)
+
+    job.post('status', "Splitting document into segments...")
+    segments = segment_document(text, mode)
+    job.check()
+    job.post('segments', segments)
+
+    parts = []
+    results = long_scorer.iter_scores(segments)
+    try:
+        for index, scores, words in results:
+            job.post('segment', (index, scores, words))
+            parts.append((scores, words))
+    finally:
+        # Cancels batches that have not started yet
+        results.close()
+    return aggregate_scores(parts)
+
+
+def score_live(job, text, live_scorer, long_threshold=LONG_DOCUMENT_CHARS):
+    """Job: live-mode scores of the text being edited, as {'scores', 'sentences', 'rescored'}
+
+    Texts shorter than long_threshold are scored whole, exactly as Analyze
+    scores them. Longer ones get the incremental word-weighted per-sentence
+    scores, and 'sentences' is their sentence count (None for whole-text scores).
+    """
+    text = text.strip()
+    if len(text) < long_threshold:
+        return {'scores': score_text(text), 'sentences': None, 'rescored': live_scorer.rescored}
+    scores = live_scorer.update(text)
+    return {'scores': scores, 'sentences': len(live_scorer.entries), 'rescored': live_scorer.rescored}
+
+
+def score_file(job, path, text_field='text', id_field='id', workers=None):
+    """Job: score every record of a file, streaming (record_id, preview, scores) rows; return the count"""
+    # Imported on first use: they pull in NumPy and sqlite3, which the GUI does not need to start
+    from bulk import detect_format, read_records, score_records
+    from corpus import scan_line_offsets
+
+    fmt = detect_format(path)
+    # Lines are a cheap upper bound on the record count for the progress bar
+    lines = len(scan_line_offsets(path)) - 1
+    job.post('total', max(1, lines - 1 if fmt == 'csv' else lines))
+
+    # Pool results come back in input order, so the previews line up with them
+    previews = deque()
+
+    def records():
+        for record_id, text in read_records(path, fmt, text_field, id_field):
+            previews.append(preview(text))
+            yield record_id, text
+
+    count = 0
+    rows = []
+    results = score_records(records(), workers)
+    try:
+        for record_id, scores, _, _ in results:
+            rows.append((record_id, previews.popleft(), scores))
+            if len(rows) >= FILE_ROWS_PER_MESSAGE:
+                job.post('rows', rows)
+                count += len(rows)
+                rows = []
+    finally:
+        # Stops the process pool when the job is cancelled
+        results.close()
+    if rows:
+        job.post('rows', rows)
+        count += len(rows)
+    return count
+
+
+def build_document(size_mb, seed=1):
+    """Random review-like text of about size_mb megabytes"""
+    rng = random.Random(seed)
+    words = ["good", "bad", "great", "terrible", "okay", "the", "service", "was", "food",
+             "really", "not", "very", "love", "hate", "price", "staff", "slow", "friendly"]
+    sentences = []
+    size = 0
+    while size < size_mb * 1024 * 1024:
+        sentence = ' '.join(rng.choice(words) for _ in range(rng.randint(5, 20))).capitalize() + '.'
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    return ' '.join(sentences)
+
+
+def simulate_ui(text, workers=None, frame_rate=60):
+    """Analyse text in the background while ticking a UI loop; return frame statistics"""
+    from longdoc import LongDocumentScorer
+
+    long_scorer = LongDocumentScorer(workers)
+    worker = AnalysisWorker()
+    frame = 1.0 / frame_rate
+    gaps = []
+    segments = 0
+    try:
+        start = time.perf_counter()
+        worker.submit(analyze_document, text, long_scorer, 0)
+        last = time.perf_counter()
+        while worker.busy:
+            # Sleep to the next frame, then apply messages the way the GUI does
+            time.sleep(max(0.0, last + frame - time.perf_counter()))
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+            lines = []
+            for kind, payload in worker.poll():
+                if kind == 'segment':
+                    index, scores, _ = payload
+                    lines.append(f"#{index + 1:<5} {scores['compound']:+.3f}")
+                elif kind == 'error':
+                    raise payload
+            segments += len(lines)
+        elapsed = time.perf_counter() - start
+    finally:
+        long_scorer.shutdown()
+
+    gaps.sort()
+    return {
+        'seconds': elapsed,
+        'segments': segments,
+        'frames': len(gaps),
+        'p50_ms': gaps[len(gaps) // 2] * 1000 if gaps else 0.0,
+        'p99_ms': gaps[int(len(gaps) * 0.99)] * 1000 if gaps else 0.0,
+        'max_ms': gaps[-1] * 1000 if gaps else 0.0,
+        'late_frames': sum(1 for gap in gaps if gap > 2 * frame)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check UI responsiveness during a background analysis")
+    parser.add_argument('--size-mb', type=float, default=2.0, help="size of the generated document")
+    parser.add_argument('--workers', type=int, default=None, help="scoring processes")
+    args = parser.parse_args()
+
+    document = build_document(args.size_mb)
+    print(f"Analysing {len(document) / (1024 * 1024):.1f} MB in the background at 60 Hz...")
+    stats = simulate_ui(document, args.workers)
+    print(f"Scored {stats['segments']} segments in {stats['seconds']:.1f}s over {stats['frames']} frames")
+    print(f"Frame interval p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms, "
+          f"max {stats['max_ms']:.1f} ms, {stats['late_frames']} frames over 33 ms")
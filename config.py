@@ -32,6 +32,12 @@ SENTIMENT_ANALYSIS_PATH = APPLICATION_PATH / SENTIMENT_ANALYSIS_DIR
 # Model Files
 FACE_EMOTION_MODEL_H5 = os.getenv('FACE_EMOTION_MODEL_H5', 'facialemotionmodel.h5')
 FACE_EMOTION_MODEL_JSON = os.getenv('FACE_EMOTION_MODEL_JSON', 'facialemotionmodel.json')
+FACE_TFLITE_MODEL = os.getenv('FACE_TFLITE_MODEL', 'facialemotionmodel.tflite')
+
+# Face Inference Backend ('keras' or 'tflite')
+FACE_INFERENCE_BACKEND = os.getenv('FACE_INFERENCE_BACKEND', 'keras').lower()
+# Interpreter threads for the tflite backend, 0 for one per CPU
+FACE_INFERENCE_THREADS = int(os.getenv('FACE_INFERENCE_THREADS', 0))
 
 # UI Configuration
 WINDOW_WIDTH = int(os.getenv('WINDOW_WIDTH', 1200))
@@ -71,6 +77,18 @@ SENTIMENT_COLORS = {
 # Camera Configuration
 DEFAULT_CAMERA_INDEX = int(os.getenv('DEFAULT_CAMERA_INDEX', 0))
 
+# Face Detection Scheduling
+# Run the Haar cascade every N frames and track faces in between
+FACE_DETECT_INTERVAL = int(os.getenv('FACE_DETECT_INTERVAL', 5))
+# Fraction of the frame size the cascade and trackers work on
+FACE_DETECT_SCALE = float(os.getenv('FACE_DETECT_SCALE', 0.5))
+# OpenCV contrib tracker: KCF, CSRT, MOSSE, MIL, or none to detect on every frame
+FACE_TRACKER = os.getenv('FACE_TRACKER', 'KCF')
+# Re-detect when a tracked face matches its detected appearance less than this (-1 to 1)
+FACE_TRACK_MIN_CONFIDENCE = float(os.getenv('FACE_TRACK_MIN_CONFIDENCE', 0.5))
+# Recent face sizes kept to bound the cascade's minSize/maxSize
+FACE_SIZE_HISTORY = int(os.getenv('FACE_SIZE_HISTORY', 30))
+
 # TensorFlow Configuration
 TF_CPP_MIN_LOG_LEVEL = os.getenv('TF_CPP_MIN_LOG_LEVEL', '2')
 